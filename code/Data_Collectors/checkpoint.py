@@ -0,0 +1,119 @@
+import json
+import os
+import sqlite3
+import time
+
+# Journal of a collection run in progress: every finished profile and the
+# pagination state are written as the run goes, so a run that dies midway
+# (job killed, rate limit given up on) resumes where it stopped instead of
+# starting over. A collector's journal is cleared once its CSV is written.
+CHECKPOINT_PATH = os.environ.get(
+    'CHECKPOINT_PATH', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'checkpoints.db'))
+# Journals older than this are discarded rather than resumed
+CHECKPOINT_MAX_AGE_S = float(os.environ.get('CHECKPOINT_MAX_AGE_S', 3 * 24 * 3600))
+# CHECKPOINT_RESUME=0 discards an unfinished run and starts over
+CHECKPOINT_RESUME = os.environ.get('CHECKPOINT_RESUME', '1') != '0'
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS runs (
+    collector TEXT PRIMARY KEY,
+    started_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS cursors (
+    collector TEXT NOT NULL,
+    name TEXT NOT NULL,
+    value TEXT NOT NULL,
+    PRIMARY KEY (collector, name)
+);
+CREATE TABLE IF NOT EXISTS profiles (
+    collector TEXT NOT NULL,
+    key TEXT NOT NULL,
+    seq INTEGER NOT NULL,
+    record TEXT,
+    PRIMARY KEY (collector, key)
+);
+'''
+
+
+class Checkpoint:
+    """
+    The journal of one collector's current run. Profiles are recorded by key
+    (username / user id); a None record marks a user that was fetched but
+    yielded no row (filtered out or gone), so it isn't fetched again either.
+    """
+    def __init__(self, collector, path=CHECKPOINT_PATH, resume=CHECKPOINT_RESUME):
+        self.collector = collector
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+
+        row = self.conn.execute("SELECT started_at FROM runs WHERE collector = ?", (collector,)).fetchone()
+        if row is not None and (not resume or row[0] < time.time() - CHECKPOINT_MAX_AGE_S):
+            self._clear()
+            row = None
+        if row is None:
+            self.started_at = time.time()
+            self.conn.execute("INSERT INTO runs (collector, started_at) VALUES (?, ?)", (collector, self.started_at))
+            self.resumed = False
+        else:
+            self.started_at = row[0]
+            self.resumed = True
+        self.conn.commit()
+        self._seq = self.conn.execute(
+            "SELECT COALESCE(MAX(seq), 0) FROM profiles WHERE collector = ?", (collector,)
+        ).fetchone()[0]
+
+        if self.resumed:
+            started = time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(self.started_at))
+            print(f"Resuming the {collector} run started at {started}: "
+                  f"{len(self.done_keys())} users already done ({len(self.records())} profiles)")
+
+    def get_cursor(self, name, default=None):
+        row = self.conn.execute(
+            "SELECT value FROM cursors WHERE collector = ? AND name = ?", (self.collector, name)
+        ).fetchone()
+        return json.loads(row[0]) if row else default
+
+    def save_cursor(self, name, value):
+        """Stores pagination state (any JSON value) under a name."""
+        self.conn.execute(
+            "INSERT OR REPLACE INTO cursors (collector, name, value) VALUES (?, ?, ?)",
+            (self.collector, name, json.dumps(value))
+        )
+        self.conn.commit()
+
+    def record(self, key, record):
+        """Journals a finished user: its output row, or None if it yields none."""
+        self._seq += 1
+        self.conn.execute(
+            "INSERT OR REPLACE INTO profiles (collector, key, seq, record) VALUES (?, ?, ?, ?)",
+            (self.collector, str(key), self._seq, json.dumps(record) if record is not None else None)
+        )
+        self.conn.commit()
+
+    def done_keys(self):
+        rows = self.conn.execute("SELECT key FROM profiles WHERE collector = ?", (self.collector,))
+        return {key for (key,) in rows}
+
+    def records(self):
+        """The journaled output rows, in the order they were finished."""
+        rows = self.conn.execute(
+            "SELECT record FROM profiles WHERE collector = ? AND record IS NOT NULL ORDER BY seq", (self.collector,)
+        )
+        return [json.loads(record) for (record,) in rows]
+
+    def entries(self):
+        """{key: output row or None} for every journaled user."""
+        rows = self.conn.execute("SELECT key, record FROM profiles WHERE collector = ? ORDER BY seq", (self.collector,))
+        return {key: json.loads(record) if record is not None else None for key, record in rows}
+
+    def finish(self):
+        """Clears the journal after the run's output has been written."""
+        self._clear()
+        self.conn.commit()
+        self.conn.close()
+
+    def _clear(self):
+        for table in ("runs", "cursors", "profiles"):
+            self.conn.execute(f"DELETE FROM {table} WHERE collector = ?", (self.collector,))
@@ -0,0 +1,121 @@
+import hashlib
+import json
+import os
+import sqlite3
+import time
+
+# On-disk cache of API responses shared by the collectors, so a re-run doesn't
+# download the same GitHub, StackExchange and LeetCode payloads again.
+# A response younger than HTTP_CACHE_TTL_S is reused without a request. An
+# older one that came with an ETag or Last-Modified is revalidated with
+# If-None-Match / If-Modified-Since: GitHub answers 304 when it is unchanged,
+# and 304s don't count against the rate limit. Responses without validators
+# (StackExchange, GraphQL POSTs) are fetched again once the TTL has passed.
+HTTP_CACHE_PATH = os.environ.get(
+    'HTTP_CACHE_PATH', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'http_cache.db'))
+HTTP_CACHE_TTL_S = float(os.environ.get('HTTP_CACHE_TTL_S', 6 * 3600))
+# Entries not stored or revalidated for this long are deleted when the cache opens
+HTTP_CACHE_MAX_AGE_S = float(os.environ.get('HTTP_CACHE_MAX_AGE_S', 30 * 24 * 3600))
+# HTTP_CACHE=0 turns the cache off (every request goes to the network)
+HTTP_CACHE_ENABLED = os.environ.get('HTTP_CACHE', '1') != '0'
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY,
+    url TEXT NOT NULL,
+    body TEXT NOT NULL,
+    etag TEXT,
+    last_modified TEXT,
+    stored_at REAL NOT NULL
+)
+'''
+
+
+def request_key(method, url, params=None, body=None):
+    """Identifies a request by its method, URL, query parameters and JSON body."""
+    canonical = json.dumps([method.upper(), url, sorted((params or {}).items()), body], sort_keys=True, default=str)
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+class ResponseCache:
+    """
+    Response bodies keyed by request_key(), with the validators they came
+    with. Callers look a request up, send the conditional headers it returns,
+    and report back with store() (200) or not_modified() (304).
+    """
+    def __init__(self, path=HTTP_CACHE_PATH, ttl_s=HTTP_CACHE_TTL_S, enabled=HTTP_CACHE_ENABLED):
+        self.ttl_s = ttl_s
+        self.enabled = enabled
+        self.conn = None
+        if enabled:
+            self.conn = sqlite3.connect(path)
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.execute("PRAGMA synchronous=NORMAL")
+            self.conn.execute(SCHEMA)
+            self.conn.execute("DELETE FROM responses WHERE stored_at < ?", (time.time() - HTTP_CACHE_MAX_AGE_S,))
+            self.conn.commit()
+        # Statistics for summary()
+        self.hits = 0
+        self.misses = 0
+        self.revalidations = 0
+        self.not_modified_count = 0
+
+    def lookup(self, key):
+        """
+        Returns (data, conditional headers). data is the cached JSON payload
+        when it is fresh enough to use without a request, else None; the
+        headers then carry the stored validators, if any, for the request.
+        """
+        row = None
+        if self.enabled:
+            row = self.conn.execute(
+                "SELECT body, etag, last_modified, stored_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+        if row is None:
+            self.misses += 1
+            return None, {}
+        body, etag, last_modified, stored_at = row
+        if time.time() - stored_at < self.ttl_s:
+            self.hits += 1
+            return json.loads(body), {}
+
+        headers = {}
+        if etag:
+            headers["If-None-Match"] = etag
+        if last_modified:
+            headers["If-Modified-Since"] = last_modified
+        if headers:
+            self.revalidations += 1
+        else:
+            self.misses += 1
+        return None, headers
+
+    def store(self, key, url, body, headers):
+        """Saves a 200 response's body (JSON text) with its ETag / Last-Modified."""
+        if not self.enabled:
+            return
+        self.conn.execute(
+            "INSERT OR REPLACE INTO responses (key, url, body, etag, last_modified, stored_at) VALUES (?, ?, ?, ?, ?, ?)",
+            (key, url, body, headers.get("ETag"), headers.get("Last-Modified"), time.time())
+        )
+        self.conn.commit()
+
+    def not_modified(self, key):
+        """Handles a 304: the stored payload is current again. Returns it."""
+        self.not_modified_count += 1
+        self.conn.execute("UPDATE responses SET stored_at = ? WHERE key = ?", (time.time(), key))
+        self.conn.commit()
+        body = self.conn.execute("SELECT body FROM responses WHERE key = ?", (key,)).fetchone()[0]
+        return json.loads(body)
+
+    def close(self):
+        if self.conn is not None:
+            self.conn.close()
+            self.conn = None
+
+    def summary(self):
+        lookups = self.hits + self.misses + self.revalidations
+        rate = 100 * (self.hits + self.not_modified_count) / lookups if lookups else 0
+        return (f"[http cache] {lookups} lookups: {self.hits} fresh hits, "
+                f"{self.not_modified_count}/{self.revalidations} revalidated unchanged (304), "
+                f"{self.misses} misses ({rate:.0f}% served from cache)")
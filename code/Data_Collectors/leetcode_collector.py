@@ -1,10 +1,16 @@
+import argparse
 import os
 import asyncio
 import aiohttp
+import json
 import pandas as pd
 import time
 from dotenv import load_dotenv, find_dotenv
 
+from checkpoint import Checkpoint
+from http_cache import ResponseCache, request_key
+from refresh import REFRESH_BUDGET, record_fetches, refresh_dataset
+
 # Load environment variables (API Token)
 load_dotenv(find_dotenv())
 
@@ -14,6 +20,8 @@ TOTAL_USERS_REQUIRED = 3000
 CONCURRENCY_LIMIT = 3
 MAX_RANK = int(os.environ.get('MAX_LEETCODE_RANK', 1000000))
 print(f"ℹ Using MAX_LEETCODE_RANK: {MAX_RANK}")
+# The dataset the selection algorithm reads (and --refresh updates)
+DATASET_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Profile_Data", "leetcode_profiles.csv")
 
 HEADERS = {
     "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36",
@@ -59,29 +67,81 @@ query getUserProfile($username: String!) {
 }
 """
 
+response_cache = ResponseCache()
+
+
+async def post_graphql(session, payload):
+    """
+    POSTs a GraphQL query; returns (HTTP status, JSON response or None).
+    Answers younger than HTTP_CACHE_TTL_S come from the response cache.
+    """
+    key = request_key("POST", BASE_URL, body=payload)
+    cached, _ = response_cache.lookup(key)
+    if cached is not None:
+        return 200, cached
+    async with session.post(BASE_URL, json=payload, headers=HEADERS) as resp:
+        if resp.status != 200:
+            return resp.status, None
+        body = await resp.text()
+        data = json.loads(body)
+        if not data.get('errors'):
+            response_cache.store(key, BASE_URL, body, resp.headers)
+        return 200, data
+
 async def fetch_ranking_page(session, page):
-    """Fetch one page of rankings"""
+    """Fetch one page of rankings; None if the request failed ([] past the last page)"""
     payload = {
         "query": RANKING_QUERY,
         "variables": {"page": page}
     }
 
     try:
-        async with session.post(BASE_URL, json=payload, headers=HEADERS) as resp:
-            if resp.status == 200:
-                data = await resp.json()
-                nodes = data.get('data', {}).get('globalRanking', {}).get('rankingNodes', [])
-                usernames = [node['user']['username'] for node in nodes if node.get('user')]
-                return usernames
-            else:
-                print(f"Error fetching page {page}: Status {resp.status}")
-                return []
+        status, data = await post_graphql(session, payload)
+        if status == 200 and not data.get('errors'):
+            nodes = (data.get('data') or {}).get('globalRanking', {}).get('rankingNodes', [])
+            usernames = [node['user']['username'] for node in nodes if node.get('user')]
+            return usernames
+        elif status == 200:
+            print(f"Error fetching page {page}: {data['errors'][0].get('message')}")
+            return None
+        else:
+            print(f"Error fetching page {page}: Status {status}")
+            return None
     except Exception as e:
         print(f"Exception on page {page}: {e}")
-        return []
+        return None
+
+def profile_row(user):
+    """Output row for a matchedUser, or None if the user is filtered out"""
+    stats = user.get('submitStats', {}).get('acSubmissionNum', [])
+
+    ranking = user.get('profile', {}).get('ranking', 0)
+    
+    # Filtering Logic
+    if ranking > MAX_RANK:
+        return None
+
+    if len(stats) < 4:
+        return None
+
+    return {
+        "Username": user['username'],
+        "Ranking": ranking,
+        "Reputation": user.get('profile', {}).get('reputation', 0),
+        "All_Solved": stats[0]['count'],
+        "Easy_Solved": stats[1]['count'],
+        "Medium_Solved": stats[2]['count'],
+        "Hard_Solved": stats[3]['count']
+    }
 
-async def fetch_user_profile(session, username, semaphore):
-    """Fetch detailed profile for a user"""
+def user_not_found(data):
+    """True if a profile reply says the user doesn't exist (LeetCode answers that with an error)"""
+    errors = data.get('errors') or []
+    return (not (data.get('data') or {}).get('matchedUser') and bool(errors)
+            and all('does not exist' in (e.get('message') or '') for e in errors))
+
+async def fetch_user_profile(session, username, semaphore, checkpoint=None):
+    """Fetch detailed profile for a user (journaled to the checkpoint once answered)"""
     async with semaphore:
         payload = {
             "query": USER_PROFILE_QUERY,
@@ -89,36 +149,18 @@ async def fetch_user_profile(session, username, semaphore):
         }
 
         try:
-            async with session.post(BASE_URL, json=payload, headers=HEADERS) as resp:
-                if resp.status == 200:
-                    data = await resp.json()
-                    user = data.get('data', {}).get('matchedUser')
-
-                    if not user:
-                        return None
-
-                    stats = user.get('submitStats', {}).get('acSubmissionNum', [])
-
-                    ranking = user.get('profile', {}).get('ranking', 0)
-                    
-                    # Filtering Logic
-                    if ranking > MAX_RANK:
-                        return None
-
-                    if len(stats) < 4:
-                        return None
-
-                    return {
-                        "Username": user['username'],
-                        "Ranking": ranking,
-                        "Reputation": user.get('profile', {}).get('reputation', 0),
-                        "All_Solved": stats[0]['count'],
-                        "Easy_Solved": stats[1]['count'],
-                        "Medium_Solved": stats[2]['count'],
-                        "Hard_Solved": stats[3]['count']
-                    }
-                else:
-                    return None
+            status, data = await post_graphql(session, payload)
+            # Any other answer with errors (rate limited, server trouble) is not
+            # journaled, so the user is retried rather than dropped by a refresh
+            if status == 200 and (not data.get('errors') or user_not_found(data)):
+                user = (data.get('data') or {}).get('matchedUser')
+                row = profile_row(user) if user else None
+                # Filtered-out and unknown users are journaled too, so a resumed run skips them
+                if checkpoint is not None:
+                    checkpoint.record(username, row)
+                return row
+            else:
+                return None
         except Exception as e:
             return None
 
@@ -130,38 +172,58 @@ async def main():
     print("="*60)
 
     semaphore = asyncio.Semaphore(CONCURRENCY_LIMIT)
+    # Ranking pages and finished profiles are journaled so an interrupted run resumes
+    checkpoint = Checkpoint("leetcode")
 
     async with aiohttp.ClientSession() as session:
         # Step 1: Collect usernames
         print(f"\nStep 1: Collecting {TOTAL_USERS_REQUIRED} usernames...")
-        usernames = []
-        page = 1
-
-        while len(usernames) < TOTAL_USERS_REQUIRED:
+        ranking = checkpoint.get_cursor("ranking", {"page": 1, "usernames": [], "complete": False})
+        usernames = ranking["usernames"]
+        page = ranking["page"]
+        if ranking["complete"]:
+            print(f"Reusing the {len(usernames)} usernames collected by the interrupted run")
+        elif usernames:
+            print(f"Resuming at ranking page {page} with {len(usernames)} usernames")
+
+        complete = ranking["complete"]
+        while len(usernames) < TOTAL_USERS_REQUIRED and not complete:
             batch = await fetch_ranking_page(session, page)
 
-            if not batch:
+            if batch is None:
                 print(f"\nNo data from page {page}, waiting 2 seconds...")
                 await asyncio.sleep(2)
                 batch = await fetch_ranking_page(session, page)
 
-                if not batch:
+                if batch is None:
+                    # Not marked complete: the next run resumes the listing at this page
                     print(f"Still no data, stopping at {len(usernames)} users")
                     break
+            if not batch:
+                print(f"\nPage {page} is empty: end of the rankings")
+                complete = True
+                break
 
             usernames.extend(batch)
             print(f"Collected {len(usernames)} usernames (page {page})", end="\r")
 
             page += 1
+            checkpoint.save_cursor("ranking", {"page": page, "usernames": usernames, "complete": False})
             await asyncio.sleep(0.5)
 
-        usernames = usernames[:TOTAL_USERS_REQUIRED]
+        if complete or len(usernames) >= TOTAL_USERS_REQUIRED:
+            complete = True
+            usernames = usernames[:TOTAL_USERS_REQUIRED]
+            checkpoint.save_cursor("ranking", {"page": page, "usernames": usernames, "complete": True})
         print(f"\nCollected {len(usernames)} usernames")
 
         # Step 2: Fetch profiles
-        print(f"\nStep 2: Fetching profiles for {len(usernames)} users...")
+        done = checkpoint.done_keys()
+        pending = [username for username in usernames if username not in done]
+        print(f"\nStep 2: Fetching profiles for {len(pending)} users..."
+              + (f" ({len(usernames) - len(pending)} already done)" if done else ""))
 
-        tasks = [fetch_user_profile(session, username, semaphore) for username in usernames]
+        tasks = [fetch_user_profile(session, username, semaphore, checkpoint) for username in pending]
 
         results = []
         completed = 0
@@ -173,20 +235,51 @@ async def main():
 
             completed += 1
             if completed % 25 == 0:
-                print(f"Fetched {completed}/{len(usernames)} profiles ({len(results)} valid)", end="\r")
+                print(f"Fetched {completed}/{len(pending)} profiles ({len(results)} valid)", end="\r")
 
         print(f"\nFetched {len(results)} valid profiles")
 
-        # Step 3: Save to file
+        # Step 3: Save to file (with the profiles journaled by an interrupted run)
+        results = checkpoint.records()
         if results:
             df = pd.DataFrame(results)
             output_file = "leetcode_profiles.csv"
             df.to_csv(output_file, index=False)
+            record_fetches("leetcode", df["Username"], replace=True)
             print(f"\nSaved {len(results)} profiles to {output_file}")
             print("\nSample data:")
             print(df.head())
         else:
             print("\nNo data collected!")
+        print(response_cache.summary())
+
+        failed = len(set(usernames) - checkpoint.done_keys())
+        if failed or not complete:
+            print(f"{failed} profiles could not be fetched" + ("" if complete else " and the ranking listing is incomplete")
+                  + "; run again to retry them (the checkpoint is kept)")
+        else:
+            checkpoint.finish()
+
+async def refetch_profiles(usernames, checkpoint):
+    """Re-fetches the given users' profiles, journaling each to the checkpoint"""
+    semaphore = asyncio.Semaphore(CONCURRENCY_LIMIT)
+    async with aiohttp.ClientSession() as session:
+        await asyncio.gather(*(fetch_user_profile(session, u, semaphore, checkpoint) for u in usernames))
+    print(response_cache.summary())
+
+def refresh(budget=REFRESH_BUDGET):
+    """Re-fetches the stalest, most shortlist-worthy profiles in DATASET_PATH (one request each)"""
+    refresh_dataset("leetcode", DATASET_PATH, "Username", "Ranking",
+                    lambda usernames, checkpoint: asyncio.run(refetch_profiles(usernames, checkpoint)),
+                    cost_per_user=1, budget=budget, higher_is_better=False)
 
 if __name__ == "__main__":
-    asyncio.run(main())
\ No newline at end of file
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--refresh", action="store_true",
+                        help="re-fetch the stalest existing profiles instead of collecting from scratch")
+    parser.add_argument("--budget", type=int, default=REFRESH_BUDGET, help="API requests a refresh may spend")
+    args = parser.parse_args()
+    if args.refresh:
+        refresh(args.budget)
+    else:
+        asyncio.run(main())
\ No newline at end of file
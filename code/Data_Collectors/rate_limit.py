@@ -0,0 +1,128 @@
+import asyncio
+import os
+import time
+
+# Concurrency bounds for one GitHub rate-limit bucket (core, search, graphql).
+# GitHub's secondary limits punish bursts, so concurrency starts low, grows by
+# one per round of successful requests and is halved when a secondary limit hits.
+MAX_CONCURRENCY = int(os.environ.get('GITHUB_MAX_CONCURRENCY', 20))
+INITIAL_CONCURRENCY = int(os.environ.get('GITHUB_INITIAL_CONCURRENCY', 4))
+# GitHub asks clients to wait at least a minute after a secondary limit without Retry-After
+SECONDARY_LIMIT_WAIT_S = 60
+# Slack added to X-RateLimit-Reset, whose clock may be slightly ahead of ours
+RESET_MARGIN_S = 2
+
+
+class RateLimitScheduler:
+    """
+    Schedules requests against one rate-limit bucket from the X-RateLimit-*
+    and Retry-After headers of its responses. Requests wait for a slot in
+    acquire(); when the bucket is empty or a secondary limit hits, every
+    request is parked until the reset instead of failing.
+    """
+    def __init__(self, name, max_concurrency=MAX_CONCURRENCY, initial_concurrency=INITIAL_CONCURRENCY):
+        self.name = name
+        self.max_concurrency = max_concurrency
+        self.concurrency = max(1, min(initial_concurrency, max_concurrency))
+        self.in_flight = 0
+        # Requests left in the current window (None until a response says), and when it resets
+        self.remaining = None
+        self.reset_at = 0.0
+        # No request starts before this time
+        self.resume_at = 0.0
+        self._successes = 0
+        self._changed = asyncio.Condition()
+        # Statistics for summary()
+        self.requests = 0
+        self.retries = 0
+        self.parked_s = 0.0
+
+    async def acquire(self):
+        """Waits until a request may start (not parked, under the concurrency and remaining budget)."""
+        async with self._changed:
+            while True:
+                now = time.time()
+                if now < self.resume_at:
+                    try:
+                        await asyncio.wait_for(self._changed.wait(), self.resume_at - now)
+                    except asyncio.TimeoutError:
+                        pass
+                    continue
+                if self.remaining is not None and now >= self.reset_at:
+                    self.remaining = None  # new window; the next response tells its size
+                budget = self.concurrency if self.remaining is None else min(self.concurrency, self.remaining)
+                if self.in_flight < budget:
+                    self.in_flight += 1
+                    self.requests += 1
+                    if self.remaining is not None:
+                        self.remaining -= 1
+                    return
+                if self.in_flight == 0 and self.remaining == 0:
+                    # Budget spent without a response saying when it resets: wait for the window
+                    self._park(max(self.reset_at, now + 1) + RESET_MARGIN_S, "quota used up")
+                    continue
+                await self._changed.wait()
+
+    async def release(self, status=None, headers=None, rate_limited=False):
+        """
+        Records a finished request. Returns True if it hit a rate limit and
+        should be retried (once acquire() lets it through again).
+        rate_limited marks a 403 whose body says it is a rate limit.
+        """
+        async with self._changed:
+            self.in_flight -= 1
+            retry = self._record(status, headers or {}, rate_limited)
+            if retry:
+                self.retries += 1
+            self._changed.notify_all()
+        return retry
+
+    def _record(self, status, headers, rate_limited):
+        now = time.time()
+        remaining = headers.get("X-RateLimit-Remaining")
+        if remaining is not None:
+            # The header counts this request; the ones still in flight will use more
+            self.remaining = max(0, int(remaining) - self.in_flight)
+            self.reset_at = float(headers.get("X-RateLimit-Reset", now + 60))
+
+        if status in (403, 429):
+            retry_after = headers.get("Retry-After")
+            if retry_after is not None:
+                self._slow_down()
+                self._park(now + float(retry_after), "secondary rate limit")
+                return True
+            if remaining == "0":
+                self._park(self.reset_at + RESET_MARGIN_S, "quota used up")
+                return True
+            if rate_limited:
+                self._slow_down()
+                self._park(now + SECONDARY_LIMIT_WAIT_S, "secondary rate limit")
+                return True
+            return False
+
+        if status is not None and status < 400:
+            self._successes += 1
+            if self._successes >= self.concurrency and self.concurrency < self.max_concurrency:
+                self.concurrency += 1
+                self._successes = 0
+        if self.remaining == 0 and self.reset_at > now:
+            # Don't spend a request on a guaranteed 403: wait for the reset right away
+            self._park(self.reset_at + RESET_MARGIN_S, "quota used up")
+        return False
+
+    def _slow_down(self):
+        self.concurrency = max(1, self.concurrency // 2)
+        self._successes = 0
+
+    def _park(self, until, reason):
+        now = time.time()
+        if until <= self.resume_at:
+            return
+        self.parked_s += until - max(now, self.resume_at)
+        self.resume_at = until
+        print(f" [{self.name}] {reason}: pausing requests until "
+              f"{time.strftime('%H:%M:%S', time.localtime(until))} ({until - now:.0f}s)")
+
+    def summary(self):
+        return (f"[{self.name}] {self.requests} requests, {self.retries} retried after rate limits, "
+                f"{self.parked_s:.0f}s parked, final concurrency {self.concurrency}")
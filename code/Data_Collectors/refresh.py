@@ -0,0 +1,170 @@
+import os
+import time
+
+import pandas as pd
+
+from checkpoint import Checkpoint
+
+# Incremental refresh: instead of re-searching and re-fetching everyone, a
+# refresh run re-fetches only the profiles most worth it within a request
+# budget and merges them into the existing dataset. A profile's priority is
+# how stale it is, weighted up by how likely it is to be shortlisted.
+HERE = os.path.dirname(os.path.abspath(__file__))
+# When each profile was last fetched: one row per (source, key)
+FETCH_LOG_PATH = os.environ.get('FETCH_LOG_PATH', os.path.join(HERE, '..', 'Profile_Data', 'fetch_log.csv'))
+SHORTLIST_FILES = {
+    'github': os.path.join(HERE, '..', 'ML', 'Shortlisted_candidates', 'github_shortlisted_candidates.csv'),
+    'leetcode': os.path.join(HERE, '..', 'ML', 'Shortlisted_candidates', 'leetcode_shortlisted_candidates.csv'),
+    'stackoverflow': os.path.join(HERE, '..', 'ML', 'Shortlisted_candidates', 'stackoverflow_shortlisted_candidates.csv'),
+}
+# API requests a refresh run may spend (per collector)
+REFRESH_BUDGET = int(os.environ.get('REFRESH_BUDGET', 500))
+# Profiles fetched more recently than this are never refreshed
+REFRESH_MIN_AGE_DAYS = float(os.environ.get('REFRESH_MIN_AGE_DAYS', 1))
+# priority = age in days * (1 + REFRESH_SHORTLIST_WEIGHT * shortlist likelihood)
+REFRESH_SHORTLIST_WEIGHT = float(os.environ.get('REFRESH_SHORTLIST_WEIGHT', 3))
+# Age assumed for profiles with no fetch time on record
+UNKNOWN_AGE_DAYS = 365
+
+
+def load_profiles(path):
+    """Reads a profile CSV; returns (DataFrame, separator, encoding) so it can be written back alike."""
+    with open(path, 'rb') as f:
+        head = f.readline()
+    encoding = 'utf-8-sig' if head.startswith(b'\xef\xbb\xbf') else 'utf-8'
+    sep = ';' if head.count(b';') > head.count(b',') else ','
+    return pd.read_csv(path, sep=sep, encoding=encoding), sep, encoding
+
+
+def save_profiles(df, path, sep, encoding):
+    df.to_csv(path, index=False, sep=sep, encoding=encoding)
+
+
+def _read_fetch_log():
+    try:
+        return pd.read_csv(FETCH_LOG_PATH, dtype={'source': str, 'key': str, 'fetched_at': str})
+    except FileNotFoundError:
+        return pd.DataFrame(columns=['source', 'key', 'fetched_at'])
+
+
+def load_fetch_log(source):
+    """{key: epoch seconds} of the source's profiles with a recorded fetch time."""
+    log = _read_fetch_log()
+    log = log[log['source'] == source]
+    times = pd.to_datetime(log['fetched_at'], utc=True)
+    return dict(zip(log['key'], (times - pd.Timestamp(0, tz='UTC')).dt.total_seconds()))
+
+
+def record_fetches(source, keys, replace=False):
+    """
+    Stamps keys as fetched now. replace=True (a full collection) drops the
+    source's other entries, since its dataset was rebuilt from scratch.
+    """
+    keys = [str(k) for k in keys]
+    log = _read_fetch_log()
+    stale = (log['source'] == source) & (True if replace else log['key'].isin(keys))
+    now = time.strftime('%Y-%m-%d %H:%M:%S', time.gmtime())
+    fresh = pd.DataFrame({'source': source, 'key': keys, 'fetched_at': now})
+    log = pd.concat([log[~stale], fresh], ignore_index=True).sort_values(['source', 'key'])
+    os.makedirs(os.path.dirname(FETCH_LOG_PATH), exist_ok=True)
+    log.to_csv(FETCH_LOG_PATH, index=False)
+
+
+def shortlist_likelihood(df, key, source, metric, higher_is_better=True):
+    """
+    How likely each profile is to be shortlisted, in 0..1: the model's
+    Selection_Probability for shortlisted profiles, otherwise half the
+    profile's percentile on the source's headline metric.
+    """
+    strength = pd.to_numeric(df[metric], errors='coerce').rank(pct=True, ascending=higher_is_better).fillna(0)
+    likelihood = strength * 0.5
+    try:
+        shortlist = pd.read_csv(SHORTLIST_FILES[source])
+    except FileNotFoundError:
+        return likelihood
+    shortlist_key = next((c for c in shortlist.columns if c.lower() == key.lower()), None)
+    if shortlist_key is None or 'Selection_Probability' not in shortlist.columns:
+        return likelihood
+    probabilities = dict(zip(shortlist[shortlist_key].astype(str), shortlist['Selection_Probability']))
+    return df[key].astype(str).map(probabilities).fillna(likelihood)
+
+
+def plan_refresh(df, key, fetched, likelihood, max_users, now=None):
+    """Keys of the (at most max_users) profiles to re-fetch, highest priority first."""
+    now = now or time.time()
+    keys = df[key].astype(str)
+    age_days = keys.map(lambda k: (now - fetched[k]) / 86400 if k in fetched else UNKNOWN_AGE_DAYS)
+    priority = age_days * (1 + REFRESH_SHORTLIST_WEIGHT * likelihood)
+    due = priority[age_days >= REFRESH_MIN_AGE_DAYS].sort_values(ascending=False, kind='stable')
+    return list(dict.fromkeys(keys[due.index[:max_users]]))
+
+
+def _same(a, b):
+    if pd.isna(a) or pd.isna(b):
+        return pd.isna(a) and pd.isna(b)
+    return a == b
+
+
+def merge_profiles(df, key, entries):
+    """
+    Applies refreshed rows ({key: row, or None for a profile that is gone or
+    no longer qualifies}) to the dataset. Only the dataset's own columns are
+    updated. Returns (merged DataFrame, counts).
+    """
+    counts = {"updated": 0, "unchanged": 0, "removed": 0}
+    rows = []
+    for row in df.to_dict('records'):
+        k = str(row[key])
+        if k not in entries:
+            rows.append(row)
+            continue
+        fresh = entries[k]
+        if fresh is None:
+            counts["removed"] += 1
+            continue
+        merged = {c: fresh.get(c, row[c]) for c in df.columns}
+        counts["updated" if any(not _same(merged[c], row[c]) for c in df.columns) else "unchanged"] += 1
+        rows.append(merged)
+    return pd.DataFrame(rows, columns=df.columns), counts
+
+
+def refresh_dataset(source, path, key, metric, fetch, cost_per_user, budget=REFRESH_BUDGET, higher_is_better=True):
+    """
+    Refreshes the profiles in the CSV at path. fetch(keys, checkpoint) must
+    re-fetch the given keys and journal each one to the checkpoint (an output
+    row, or None if the profile is gone); keys it doesn't journal keep their
+    old row. cost_per_user is the API requests one profile costs on average.
+    The run is journaled like a collection run, so an interrupted refresh resumes.
+    """
+    df, sep, encoding = load_profiles(path)
+    key = next(c for c in df.columns if c.lower() == key.lower())
+
+    checkpoint = Checkpoint(f"{source}_refresh")
+    plan = checkpoint.get_cursor("plan")
+    if plan is None:
+        fetched = load_fetch_log(source)
+        likelihood = shortlist_likelihood(df, key, source, metric, higher_is_better)
+        plan = plan_refresh(df, key, fetched, likelihood, int(budget / cost_per_user))
+        checkpoint.save_cursor("plan", plan)
+        never_fetched = (~df[key].astype(str).isin(fetched.keys())).sum()
+        print(f"Refreshing {len(plan)} of {len(df)} {source} profiles "
+              f"(budget {budget} requests, {never_fetched} never fetched)")
+
+    done = checkpoint.done_keys()
+    pending = [k for k in plan if k not in done]
+    if pending:
+        fetch(pending, checkpoint)
+
+    entries = checkpoint.entries()
+    df, counts = merge_profiles(df, key, entries)
+    save_profiles(df, path, sep, encoding)
+    record_fetches(source, [k for k, row in entries.items() if row is not None])
+    print(f"Merged into {path}: {counts['updated']} updated, {counts['unchanged']} unchanged, "
+          f"{counts['removed']} removed (gone or no longer qualifying)")
+
+    failed = len(set(plan) - set(entries))
+    if failed:
+        print(f"{failed} profiles could not be fetched; run again to retry them (the checkpoint is kept)")
+    else:
+        checkpoint.finish()
+    return counts
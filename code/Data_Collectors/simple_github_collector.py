@@ -1,57 +1,204 @@
+import argparse
 import asyncio
 import aiohttp
+import json
 import pandas as pd
 import os
 import random
 from collections import defaultdict
 from dotenv import load_dotenv, find_dotenv
 
+from checkpoint import Checkpoint
+from http_cache import ResponseCache, request_key
+from rate_limit import RateLimitScheduler
+from refresh import REFRESH_BUDGET, record_fetches, refresh_dataset
+
 # Load environment variables (API Token)
 load_dotenv(find_dotenv())
 
 # Configuration
 TARGET_COUNT = 1000  # Number of profiles to collect
+MAX_RETRIES = 3  # Retries for server and network errors (rate limits are always waited out)
+MAX_RATE_LIMIT_RETRIES = 10
+# Returned by _get(..., not_found=USER_GONE) when GitHub answers 404: the user was renamed or deleted
+USER_GONE = object()
+# Users per GraphQL request (each alias also pulls up to 100 repositories)
+GRAPHQL_BATCH_SIZE = int(os.environ.get('GITHUB_GRAPHQL_BATCH_SIZE', 10))
+
+# GraphQL fetch path: profile fields and repository aggregates of many users
+# per request, via one aliased user(login: ...) sub-query per user. Users with
+# more than 100 public repositories are followed through their repository cursors.
+REPO_PAGE_FRAGMENT = """
+fragment RepoPage on RepositoryConnection {
+  pageInfo { hasNextPage endCursor }
+  nodes {
+    stargazerCount
+    forkCount
+    primaryLanguage { name }
+    repositoryTopics(first: 20) { nodes { topic { name } } }
+  }
+}
+"""
+# Same repositories as REST /users/{user}/repos: public, owned by the user, recently pushed first
+REPOS_ARGS = "first: 100, privacy: PUBLIC, ownerAffiliations: [OWNER], orderBy: {field: PUSHED_AT, direction: DESC}"
+PROFILE_FRAGMENT = """
+fragment ProfileFields on User {
+  login
+  name
+  email
+  location
+  followers { totalCount }
+  following { totalCount }
+  repositories(%s) { totalCount ...RepoPage }
+}
+""" % REPOS_ARGS
+
+
+def profiles_query(count):
+    """Query fetching `count` users, bound to variables $l0..$l{count-1}."""
+    params = ", ".join(f"$l{i}: String!" for i in range(count))
+    aliases = "\n".join(f"  u{i}: user(login: $l{i}) {{ ...ProfileFields }}" for i in range(count))
+    return f"query({params}) {{\n{aliases}\n}}\n{PROFILE_FRAGMENT}{REPO_PAGE_FRAGMENT}"
+
+
+def repos_page_query(count):
+    """Query fetching the next repository page of `count` users ($l<i> after cursor $c<i>)."""
+    params = ", ".join(f"$l{i}: String!, $c{i}: String!" for i in range(count))
+    aliases = "\n".join(
+        f"  r{i}: user(login: $l{i}) {{ repositories({REPOS_ARGS}, after: $c{i}) {{ ...RepoPage }} }}" for i in range(count)
+    )
+    return f"query({params}) {{\n{aliases}\n}}\n{REPO_PAGE_FRAGMENT}"
+
+
+def rest_repo(node):
+    """A GraphQL repository node in the shape of a REST repository."""
+    return {
+        "stargazers_count": node["stargazerCount"],
+        "forks_count": node["forkCount"],
+        "language": (node.get("primaryLanguage") or {}).get("name"),
+        "topics": [t["topic"]["name"] for t in node["repositoryTopics"]["nodes"]],
+    }
+
 
 class GitHubCollector:
     """
     Async GitHub User Collector.
     Fetches user profiles and their repository statistics concurrently.
     """
-    def __init__(self, target_count=TARGET_COUNT, output_file="../Profile_Data/Github_Profiles.csv"):
+    def __init__(self, target_count=TARGET_COUNT, output_file="../Profile_Data/Github_Profiles.csv", use_graphql=None):
         self.target_count = target_count
         self.output_file = output_file
         self.token = os.environ.get('GITHUB_TOKEN')
-        self.api_url = "https://api.github.com"
+        self.api_url = os.environ.get('GITHUB_API_URL', "https://api.github.com")
+        # GitHub limits search, the other REST endpoints and GraphQL separately
+        self.limiters = {
+            "core": RateLimitScheduler("core"),
+            "search": RateLimitScheduler("search", max_concurrency=1),
+            "graphql": RateLimitScheduler("graphql", max_concurrency=4, initial_concurrency=2),
+        }
+        # GraphQL needs a token; GITHUB_FETCH_MODE=rest forces the two-REST-calls-per-user path
+        if use_graphql is None:
+            use_graphql = bool(self.token) and os.environ.get('GITHUB_FETCH_MODE', 'graphql') != 'rest'
+        self.use_graphql = use_graphql
+        self.cache = ResponseCache()
         
         if self.token:
             print("GITHUB_TOKEN loaded successfully.")
         else:
             print("Warning: No GITHUB_TOKEN found. Rate limits will be strict (60/hour).")
 
-    async def _get(self, session, endpoint, params=None):
+    async def _get(self, session, endpoint, params=None, not_found=None):
         """
         Helper method to perform async GET requests.
-        Handles headers and basic error reporting.
+        Requests go through the rate-limit scheduler of their bucket: they wait
+        for a slot, and a request that hits a rate limit waits for the reset
+        and is retried instead of being dropped. A 404 returns not_found, any
+        other failure None.
+        """
+        limiter = self.limiters["search" if endpoint.startswith("search/") else "core"]
+        return await self._request(session, "GET", endpoint, limiter, not_found=not_found, params=params)
+
+    async def _graphql(self, session, query, variables):
+        """
+        Runs a GraphQL query; returns the response's "data" (None if the
+        request failed) and the set of top-level aliases reported NOT_FOUND.
         """
+        response = await self._request(session, "POST", "graphql", self.limiters["graphql"],
+                                       json={"query": query, "variables": variables})
+        if response is None:
+            return None, set()
+        not_found = set()
+        for error in response.get("errors") or []:
+            if error.get("type") == "NOT_FOUND":  # renamed or deleted users come back as null
+                not_found.add((error.get("path") or [None])[0])
+            else:
+                print(f" GraphQL error: {error.get('message')}")
+        return response.get("data"), not_found
+
+    async def _request(self, session, method, endpoint, limiter, not_found=None, **kwargs):
+        url = f"{self.api_url}/{endpoint}"
+        key = request_key(method, url, kwargs.get("params"), kwargs.get("json"))
+        cached, conditional_headers = self.cache.lookup(key)
+        if cached is not None:
+            return cached
+
         headers = {"Authorization": f"token {self.token}"} if self.token else {}
-        try:
-            async with session.get(f"{self.api_url}/{endpoint}", params=params, headers=headers) as resp:
-                if resp.status == 200:
-                    return await resp.json()
-                elif resp.status == 403:
-                    # Rate limit hit or forbidden
-                    print(f" Rate limit or Forbidden (403) on {endpoint}")
-                else:
-                    print(f" Request to {endpoint} failed: {resp.status}")
-        except Exception as e:
-            print(f" Error requesting {endpoint}: {e}")
-        return None
+        headers.update(conditional_headers)
+        errors = rate_limited_attempts = 0
+        while True:
+            await limiter.acquire()
+            status, response_headers, data, rate_limited = None, {}, None, False
+            try:
+                async with session.request(method, url, headers=headers, **kwargs) as resp:
+                    status, response_headers = resp.status, resp.headers
+                    if resp.status == 304:
+                        # Unchanged since the cached copy (and free: 304s don't use up the rate limit)
+                        data = self.cache.not_modified(key)
+                    elif resp.status == 200:
+                        body = await resp.text()
+                        data = json.loads(body)
+                        graphql_errors = data.get("errors") or [] if isinstance(data, dict) else []
+                        # GraphQL reports a spent budget as a 200 carrying a RATE_LIMITED error
+                        if any(e.get("type") == "RATE_LIMITED" for e in graphql_errors):
+                            status, rate_limited = 403, True
+                        elif all(e.get("type") == "NOT_FOUND" for e in graphql_errors):
+                            self.cache.store(key, url, body, resp.headers)
+                    elif resp.status == 403:
+                        rate_limited = "rate limit" in (await resp.text()).lower()
+            except Exception as e:
+                print(f" Error requesting {endpoint}: {e}")
+            finally:
+                retry = await limiter.release(status, response_headers, rate_limited)
 
-    async def get_users(self, session):
+            if status in (200, 304):
+                return data
+            if status == 404:
+                return not_found
+            if retry:
+                rate_limited_attempts += 1
+                if rate_limited_attempts <= MAX_RATE_LIMIT_RETRIES:
+                    continue
+                print(f" Giving up on {endpoint}: still rate limited after {MAX_RATE_LIMIT_RETRIES} retries")
+                return None
+            if status is None or status >= 500:
+                errors += 1
+                if errors <= MAX_RETRIES:
+                    await asyncio.sleep(2 ** errors)
+                    continue
+            print(f" Request to {endpoint} failed: {status}")
+            return None
+
+    async def get_users(self, session, checkpoint=None):
         """
         Fetches a list of unique usernames using the GitHub Search API.
         Iterates through pages of results to gather enough users.
+        With a checkpoint, the search position is journaled after every page
+        and an interrupted search continues from there.
         """
+        if checkpoint is not None and (usernames := checkpoint.get_cursor("usernames")) is not None:
+            print(f"Reusing the {len(usernames)} users found by the interrupted run.")
+            return usernames
+
         print(f"Finding {self.target_count} users to fetch via API...")
         users = set()
         
@@ -76,12 +223,17 @@ class GitHubCollector:
         random.shuffle(queries)
         
         query_idx = 0
+        first_page = 1
+        if checkpoint is not None and (search := checkpoint.get_cursor("search")) is not None:
+            queries, query_idx, users = search["queries"], search["query_idx"], set(search["users"])
+            first_page = search["page"] + 1
+            print(f" Resuming the search at query {query_idx + 1}, page {first_page} ({len(users)} users found)")
         while len(users) < self.target_count and query_idx < len(queries):
             query = queries[query_idx]
             print(f" Searching for: '{query}'")
             
             # GitHub Search API allows up to 1000 results (10 pages of 100)
-            for page in range(1, 11): 
+            for page in range(first_page, 11):
                 if len(users) >= self.target_count:
                     break
                 
@@ -102,33 +254,56 @@ class GitHubCollector:
                 
                 new_added = len(users) - initial_count
                 print(f"      + Found {new_added} new users (Total: {len(users)})")
-                
-                await asyncio.sleep(1) # Be nice to the API
+                if checkpoint is not None:
+                    checkpoint.save_cursor("search", {"queries": queries, "query_idx": query_idx, "page": page,
+                                                      "users": sorted(users)})
                 
             query_idx += 1
+            first_page = 1
 
         print(f"Found total {len(users)} unique users.")
-        return list(users)[:self.target_count]
+        usernames = list(users)[:self.target_count]
+        if checkpoint is not None:
+            checkpoint.save_cursor("usernames", usernames)
+        return usernames
 
     async def process_user(self, session, user):
         """
         Fetches detailed profile and repository stats for a single user.
+        Returns USER_GONE if the user no longer exists, None if a request failed.
         """
         # 1. Fetch Profile Data
-        profile = await self._get(session, f"users/{user}")
+        profile = await self._get(session, f"users/{user}", not_found=USER_GONE)
+        if profile is USER_GONE:
+            return USER_GONE
         if not profile: 
             return None
 
         # 2. Fetch Repository Stats
+        # We fetch up to 100 recently pushed repos
+        repos = await self._get(session, f"users/{user}/repos", {"per_page": 100, "sort": "pushed"}) or []
+        return self._build_record(profile, repos)
+
+    async def _process_and_journal(self, session, user, checkpoint):
+        record = await self.process_user(session, user)
+        if record is USER_GONE:
+            # Renamed or deleted: a retry won't find them either
+            checkpoint.record(user, None)
+            return None
+        if record:
+            checkpoint.record(user, record)
+        return record
+
+    def _build_record(self, profile, repos):
+        """
+        Aggregates a REST-shaped profile and list of repositories into one output row.
+        """
         stats = {
             "stars": 0, 
             "forks": 0, 
             "langs": defaultdict(int), 
             "topics": []
         }
-        
-        # We fetch up to 100 recently pushed repos
-        repos = await self._get(session, f"users/{user}/repos", {"per_page": 100, "sort": "pushed"}) or []
 
         for r in repos:
             stats["stars"] += r.get('stargazers_count', 0)
@@ -163,6 +338,73 @@ class GitHubCollector:
             "common_topics": common_topics_str
         }
 
+    async def process_users_graphql(self, session, users, checkpoint=None):
+        """
+        Fetches profiles and repository stats for all users through GraphQL,
+        GRAPHQL_BATCH_SIZE users per request, batches running concurrently.
+        Each finished batch is journaled to the checkpoint, if one is given.
+        """
+        # Sorted so the same users form the same batches (and cache keys) on every run
+        users = sorted(users)
+        batches = [users[i:i + GRAPHQL_BATCH_SIZE] for i in range(0, len(users), GRAPHQL_BATCH_SIZE)]
+        results = await asyncio.gather(*(self._process_graphql_batch(session, batch, checkpoint) for batch in batches))
+        return [record for batch in results for record in batch]
+
+    async def _process_graphql_batch(self, session, logins, checkpoint=None):
+        data, not_found = await self._graphql(session, profiles_query(len(logins)), {f"l{i}": l for i, l in enumerate(logins)})
+        if data is None:
+            print(f" Skipping {len(logins)} users: their GraphQL batch failed")
+            return []
+
+        # Keyed by the requested login, which the journal knows the user by
+        found = {login: data.get(f"u{i}") for i, login in enumerate(logins)}
+        gone = {login for i, login in enumerate(logins) if f"u{i}" in not_found}
+        users = [u for u in found.values() if u]
+        repos = {u["login"]: list(u["repositories"]["nodes"]) for u in users}
+        # Users with more than 100 repositories: follow their cursors, again many users per request
+        cursors = {u["login"]: u["repositories"]["pageInfo"]["endCursor"]
+                   for u in users if u["repositories"]["pageInfo"]["hasNextPage"]}
+        while cursors:
+            page = list(cursors.items())[:GRAPHQL_BATCH_SIZE]
+            variables = {}
+            for i, (login, cursor) in enumerate(page):
+                variables[f"l{i}"], variables[f"c{i}"] = login, cursor
+            data, _ = await self._graphql(session, repos_page_query(len(page)), variables)
+            for i, (login, _) in enumerate(page):
+                connection = ((data or {}).get(f"r{i}") or {}).get("repositories")
+                if connection is None:
+                    print(f" Repositories of {login} truncated: a page request failed")
+                    del cursors[login]
+                    continue
+                repos[login].extend(connection["nodes"])
+                if connection["pageInfo"]["hasNextPage"]:
+                    cursors[login] = connection["pageInfo"]["endCursor"]
+                else:
+                    del cursors[login]
+
+        records = []
+        for login, u in found.items():
+            if not u:
+                # Renamed or deleted: a retry won't find them either. A null
+                # for any other reason is left unjournaled and retried.
+                if checkpoint is not None and login in gone:
+                    checkpoint.record(login, None)
+                continue
+            profile = {
+                "login": u["login"],
+                "name": u["name"],
+                "email": u["email"] or None,  # GraphQL returns "" where REST returns null
+                "location": u["location"],
+                "public_repos": u["repositories"]["totalCount"],
+                "followers": u["followers"]["totalCount"],
+                "following": u["following"]["totalCount"],
+            }
+            record = self._build_record(profile, [rest_repo(node) for node in repos[u["login"]]])
+            if checkpoint is not None:
+                checkpoint.record(login, record)
+            records.append(record)
+        return records
+
     async def collect_async(self):
         """
         Main orchestration coroutine.
@@ -171,31 +413,35 @@ class GitHubCollector:
         3. Processes users concurrently.
         4. Saves data to CSV.
         """
+        # Finished users and the search position are journaled as they come in,
+        # so an interrupted run picks up where it stopped
+        checkpoint = Checkpoint("github")
         async with aiohttp.ClientSession() as session:
             # Step 1: Find users
-            usernames = await self.get_users(session)
+            usernames = await self.get_users(session, checkpoint)
             
             if not usernames:
                 print(" No users found. Exiting.")
                 return
 
-            print(f"\n Collecting full details for {len(usernames)} users...")
+            done = checkpoint.done_keys()
+            pending = [user for user in usernames if user not in done]
+            print(f"\n Collecting full details for {len(pending)} users..."
+                  + (f" ({len(usernames) - len(pending)} already done)" if done else ""))
             
             # Step 2: Create tasks for concurrent execution
-            # We limit concurrency preventing overwhelming the client/server
-            # (Though simple gather is often fine for batch jobs of this size)
-            tasks = [self.process_user(session, user) for user in usernames]
-            
-            # Track progress roughly
-            results = []
-            total = len(tasks)
-            # Use chunks or simple gather. gather is fastest but all-or-nothing for memory.
-            # We will use gather for simplicity as 1000 tasks is manageable.
-            
-            gathered_results = await asyncio.gather(*tasks)
-            results = [r for r in gathered_results if r]
+            # The rate-limit scheduler decides how many requests are actually in flight
+            if self.use_graphql:
+                await self.process_users_graphql(session, pending, checkpoint)
+            else:
+                tasks = [self._process_and_journal(session, user, checkpoint) for user in pending]
+                await asyncio.gather(*tasks)
+            for limiter in self.limiters.values():
+                print(f" {limiter.summary()}")
+            print(f" {self.cache.summary()}")
 
-        # Step 3: Save results
+        # Step 3: Save results (this run's and those journaled by an interrupted one)
+        results = checkpoint.records()
         if results:
             os.makedirs(os.path.dirname(self.output_file), exist_ok=True)
             df = pd.DataFrame(results)
@@ -203,12 +449,43 @@ class GitHubCollector:
             # Save to CSV
             df.to_csv(self.output_file, index=False, encoding='utf-8-sig')
             
+            record_fetches("github", df["username"], replace=True)
             print(f"\n SUCCESS! Saved {len(df)} profiles to {self.output_file}")
             print("\n Sample Data Preview:")
             print(df[["username", "name", "total_stars", "top_languages"]].head().to_string())
         else:
             print(" Failed to collect any profile data.")
 
+        failed = len(set(usernames) - checkpoint.done_keys())
+        if failed:
+            print(f"\n {failed} users could not be fetched; run again to retry them (the checkpoint is kept).")
+        else:
+            checkpoint.finish()
+
+    async def refetch_async(self, logins, checkpoint):
+        """Re-fetches the given users, journaling each to the checkpoint."""
+        async with aiohttp.ClientSession() as session:
+            if self.use_graphql:
+                await self.process_users_graphql(session, logins, checkpoint)
+            else:
+                await asyncio.gather(*(self._process_and_journal(session, login, checkpoint) for login in logins))
+            for limiter in self.limiters.values():
+                print(f" {limiter.summary()}")
+            print(f" {self.cache.summary()}")
+
+    def refresh(self, budget=REFRESH_BUDGET):
+        """
+        Re-fetches the stalest, most shortlist-worthy profiles already in
+        output_file within `budget` API requests and merges them in.
+        """
+        if os.name == 'nt':
+            asyncio.set_event_loop_policy(asyncio.WindowsSelectorEventLoopPolicy())
+        # A GraphQL batch fetches GRAPHQL_BATCH_SIZE users; REST needs two requests per user
+        cost_per_user = 1 / GRAPHQL_BATCH_SIZE if self.use_graphql else 2
+        refresh_dataset("github", self.output_file, "username", "followers",
+                        lambda logins, checkpoint: asyncio.run(self.refetch_async(logins, checkpoint)),
+                        cost_per_user, budget)
+
     def collect(self):
         """
         Synchronous entry point.
@@ -219,6 +496,15 @@ class GitHubCollector:
         asyncio.run(self.collect_async())
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--refresh", action="store_true",
+                        help="re-fetch the stalest existing profiles instead of collecting from scratch")
+    parser.add_argument("--budget", type=int, default=REFRESH_BUDGET, help="API requests a refresh may spend")
+    args = parser.parse_args()
+
     # Create the collector and run
     collector = GitHubCollector(target_count=TARGET_COUNT)
-    collector.collect()
+    if args.refresh:
+        collector.refresh(args.budget)
+    else:
+        collector.collect()
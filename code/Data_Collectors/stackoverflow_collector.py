@@ -1,26 +1,47 @@
+import argparse
 import requests
 import pandas as pd
 import time
 import os
 from dotenv import load_dotenv, find_dotenv
 
+from checkpoint import Checkpoint
+from http_cache import ResponseCache, request_key
+from refresh import REFRESH_BUDGET, load_profiles, record_fetches, refresh_dataset
+
 # Load environment variables (API Token)
 load_dotenv(find_dotenv())
 
+# Minimum spacing between requests to the API (answers served from the cache aren't delayed)
+REQUEST_INTERVAL_S = 0.25
+# /users/{ids} accepts up to 100 semicolon-separated ids
+IDS_PER_REQUEST = 100
+
 class StackOverflowCollector:
     """Collects top StackOverflow users and enriches them with contribution stats."""
     
     def __init__(self, output_dir="../Profile_Data"):
         self.api = "https://api.stackexchange.com/2.3"
         self.out = output_dir
+        self.cache = ResponseCache()
+        self._last_request = 0.0
         if not os.path.exists(self.out): os.makedirs(self.out)
 
     def _fetch(self, endpoint, params={}):
-        """Generic fetch with robust 429 rate-limit handling."""
+        """Generic fetch with robust 429 rate-limit handling. Returns the items, or None if the request failed."""
         params = {**params, "site": "stackoverflow"}
+        url = f"{self.api}/{endpoint}"
+        key = request_key("GET", url, params)
+        cached, conditional_headers = self.cache.lookup(key)
+        if cached is not None:
+            return cached.get('items', [])
         for attempt in range(3):
             try:
-                resp = requests.get(f"{self.api}/{endpoint}", params=params)
+                time.sleep(max(0.0, self._last_request + REQUEST_INTERVAL_S - time.time()))
+                self._last_request = time.time()
+                resp = requests.get(url, params=params, headers=conditional_headers)
+                if resp.status_code == 304:
+                    return self.cache.not_modified(key).get('items', [])
                 
                 # Handle Rate Limits (Backoff)
                 if resp.status_code == 429:
@@ -35,6 +56,9 @@ class StackOverflowCollector:
                     time.sleep(data['backoff'])
                 
                 if resp.status_code == 200:
+                    # Error wrappers are not cached
+                    if 'error_id' not in data:
+                        self.cache.store(key, url, resp.text, resp.headers)
                     return data.get('items', [])
                 
                 print(f"  [Error] {resp.status_code}: {resp.text[:100]}")
@@ -42,17 +66,23 @@ class StackOverflowCollector:
             except Exception as e:
                 print(f"  [Exception] {e}")
                 time.sleep(1)
-        return []
+        return None
 
-    def get_top_users(self, pages=2):
-        """Fetch top users by reputation."""
+    def get_top_users(self, pages=2, checkpoint=None):
+        """Fetch top users by reputation (journaling each page to the checkpoint, if given)."""
         print(f"Fetching top users ({pages} pages)...")
         
         min_rep = int(os.environ.get('MIN_STACKOVERFLOW_REPUTATION', 0))
         print(f"ℹ Using MIN_STACKOVERFLOW_REPUTATION: {min_rep}")
 
-        users = []
-        for p in range(1, pages + 1):
+        state = {"page": 0, "users": [], "complete": False}
+        if checkpoint is not None:
+            state = checkpoint.get_cursor("users", state)
+            if state["users"]:
+                print(f"  Resuming after page {state['page']} ({len(state['users'])} users)")
+        users = state["users"]
+        last_page = state["page"] if state["complete"] else pages
+        for p in range(state["page"] + 1, last_page + 1):
             # API supports 'min' parameter for reputation sort
             params = {
                 "page": p, 
@@ -62,52 +92,133 @@ class StackOverflowCollector:
                 "min": min_rep
             }
             batch = self._fetch("users", params)
+            if batch is None:
+                # Not marked complete: the next run retries from this page
+                print(f"  Page {p} failed; stopping the listing here")
+                return users
             if not batch: break
             users.extend(batch)
             print(f"  Page {p}: Found {len(batch)} users")
-            time.sleep(0.5)
+            if checkpoint is not None:
+                checkpoint.save_cursor("users", {"page": p, "users": users, "complete": False})
+        if checkpoint is not None:
+            checkpoint.save_cursor("users", {"page": pages, "users": users, "complete": True})
         return users
 
-    def enrich_and_save(self, users):
-        """Fetch Q/A stats for users and save to CSV."""
+    def enrich_and_save(self, users, checkpoint=None):
+        """Fetch Q/A stats for users and save to CSV. With a checkpoint, users it already holds are skipped."""
         if not users: return print("No users to enrich.")
         
-        print(f"Enriching {len(users)} profiles...")
+        done = checkpoint.done_keys() if checkpoint is not None else set()
+        pending = [u for u in users if str(u['user_id']) not in done]
+        print(f"Enriching {len(pending)} profiles..." + (f" ({len(users) - len(pending)} already done)" if done else ""))
         rows = []
         
-        for i, u in enumerate(users):
+        failed = 0
+        for i, u in enumerate(pending):
             uid = u['user_id']
+            row = self._profile_row(u)
+            if row is None:
+                # Not journaled, so the next run fetches this user again
+                failed += 1
+                continue
+            rows.append(row)
+            if checkpoint is not None:
+                checkpoint.record(uid, row)
+            if i % 10 == 0: print(f"  Processed {i+1}/{len(pending)}")
+        if failed:
+            print(f"  {failed} profiles could not be enriched")
+
+        if checkpoint is not None:
+            rows = checkpoint.records()
+        path = f"{self.out}/StackOverflow-20K-Formatted.csv"
+        pd.DataFrame(rows).to_csv(path, index=False)
+        record_fetches("stackoverflow", [row['User_ID'] for row in rows], replace=True)
+        print(f"Done! Saved {len(rows)} profiles to {path}")
+        print(self.cache.summary())
+
+    def _profile_row(self, u, enrich=True):
+        """
+        Output row for a user from /users; enrich adds the Q/A stats (two more
+        requests). None if one of those requests failed.
+        """
+        uid = u['user_id']
+        row = {
+            'User_ID': uid,
+            'Display_Name': u['display_name'],
+            'Account_Id': u.get('account_id'),
+            'Reputation': u.get('reputation', 0),
+            'Gold_Badges': u.get('badge_counts', {}).get('gold', 0),
+            'Silver_Badges': u.get('badge_counts', {}).get('silver', 0),
+            'Bronze_Badges': u.get('badge_counts', {}).get('bronze', 0),
+            'Location': u.get('location', ''),
+            'Website_URL': u.get('website_url', ''),
+            'Link': u.get('link', ''),
+        }
+        if enrich:
             # Fetch minimal counts (pagesize=1 reduces load, we just need the count metadata usually)
             # Actually SE API response wrapper often has 'total', but 'items' count is safer for page-limited views
             # To be robust but not spammy:
             qs = self._fetch(f"users/{uid}/questions", {"pagesize": 5, "order":"desc", "sort":"creation"})
             as_ = self._fetch(f"users/{uid}/answers",   {"pagesize": 5, "order":"desc", "sort":"creation"})
-            
-            rows.append({
-                'User_ID': uid,
-                'Display_Name': u['display_name'],
-                'Account_Id': u.get('account_id'),
-                'Reputation': u.get('reputation', 0),
-                'Gold_Badges': u.get('badge_counts', {}).get('gold', 0),
-                'Silver_Badges': u.get('badge_counts', {}).get('silver', 0),
-                'Bronze_Badges': u.get('badge_counts', {}).get('bronze', 0),
-                'Location': u.get('location', ''),
-                'Website_URL': u.get('website_url', ''),
-                'Link': u.get('link', ''),
+            if qs is None or as_ is None:
+                return None
+            row.update({
                 'Questions_Count': len(qs), 
                 'Answers_Count': len(as_),
                 'Total_Question_Views': sum(q.get('view_count', 0) for q in qs)
             })
-            if i % 10 == 0: print(f"  Processed {i+1}/{len(users)}")
-            time.sleep(0.5) # Safe delay
+        return row
+
+    def refetch_users(self, user_ids, checkpoint, enrich=True):
+        """Re-fetches users, IDS_PER_REQUEST per /users request, journaling each to the checkpoint."""
+        for start in range(0, len(user_ids), IDS_PER_REQUEST):
+            chunk = user_ids[start:start + IDS_PER_REQUEST]
+            users = self._fetch(f"users/{';'.join(chunk)}", {"pagesize": IDS_PER_REQUEST})
+            if users is None:
+                print(f"  Skipping {len(chunk)} users: the request failed")
+                continue
+            by_id = {str(u['user_id']): u for u in users}
+            for uid in chunk:
+                if uid not in by_id:
+                    # Deleted accounts are missing from the answer
+                    checkpoint.record(uid, None)
+                elif (row := self._profile_row(by_id[uid], enrich)) is not None:
+                    checkpoint.record(uid, row)
+            print(f"  Refreshed {min(start + IDS_PER_REQUEST, len(user_ids))}/{len(user_ids)}")
+        print(self.cache.summary())
 
+    def refresh(self, budget=REFRESH_BUDGET):
+        """Re-fetches the stalest, most shortlist-worthy profiles already saved, within `budget` requests."""
         path = f"{self.out}/StackOverflow-20K-Formatted.csv"
-        pd.DataFrame(rows).to_csv(path, index=False)
-        print(f"Done! Saved {len(rows)} profiles to {path}")
+        # The Q/A stats cost two requests per user; skip them if the dataset doesn't keep them
+        enrich = 'Questions_Count' in load_profiles(path)[0].columns
+        cost_per_user = 1 / IDS_PER_REQUEST + (2 if enrich else 0)
+        refresh_dataset("stackoverflow", path, "User_ID", "Reputation",
+                        lambda user_ids, checkpoint: self.refetch_users(user_ids, checkpoint, enrich),
+                        cost_per_user, budget)
 
     def run(self):
-        users = self.get_top_users(pages=10) # 1 page equals 100 results
-        self.enrich_and_save(users)
+        # Pages and enriched profiles are journaled, so an interrupted run resumes where it stopped
+        checkpoint = Checkpoint("stackoverflow")
+        users = self.get_top_users(pages=10, checkpoint=checkpoint) # 1 page equals 100 results
+        self.enrich_and_save(users, checkpoint)
+
+        listed = checkpoint.get_cursor("users", {}).get("complete", False)
+        failed = len({str(u['user_id']) for u in users} - checkpoint.done_keys())
+        if failed or not listed:
+            print(f"{failed} profiles could not be fetched" + ("" if listed else " and the user listing is incomplete")
+                  + "; run again to retry them (the checkpoint is kept)")
+        else:
+            checkpoint.finish()
 
 if __name__ == "__main__":
-    StackOverflowCollector().run()
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--refresh", action="store_true",
+                        help="re-fetch the stalest existing profiles instead of collecting from scratch")
+    parser.add_argument("--budget", type=int, default=REFRESH_BUDGET, help="API requests a refresh may spend")
+    args = parser.parse_args()
+    if args.refresh:
+        StackOverflowCollector().refresh(args.budget)
+    else:
+        StackOverflowCollector().run()
@@ -1,10 +1,38 @@
 import requests
 import os
+import json
+import time
 import streamlit as st
 
 # Backend URL (default to localhost for local dev, overridden by env var in prod)
 BACKEND_URL = os.getenv("BACKEND_URL", "http://127.0.0.1:8000")
 
+# Last payload and ETag per request, so unchanged data comes back as a 304
+_etag_cache = {}
+
+def get_json_cached(path, params=None, timeout=None):
+    """
+    GET a JSON endpoint with If-None-Match, reusing the stored payload on 304.
+    Returns (status_code, payload).
+    """
+    key = (path, tuple(sorted((params or {}).items())))
+    headers = {}
+    cached = _etag_cache.get(key)
+    if cached:
+        headers["If-None-Match"] = cached[0]
+
+    response = requests.get(f"{BACKEND_URL}{path}", params=params, headers=headers, timeout=timeout)
+    if response.status_code == 304 and cached:
+        return 200, cached[1]
+    if response.status_code != 200:
+        return response.status_code, None
+
+    payload = response.json()
+    etag = response.headers.get("ETag")
+    if etag:
+        _etag_cache[key] = (etag, payload)
+    return 200, payload
+
 def check_backend_status():
     try:
         response = requests.get(BACKEND_URL, timeout=2)
@@ -23,31 +51,72 @@ def login_user(username, password, endpoint):
         st.error("Backend unavailable.")
         return None
 
-def fetch_candidates(platform):
-    """Helper to fetch candidate lists from backend."""
+def fetch_candidates(platform, limit=50, cursor=None, sort=None, order=None, fields=None, filters=None):
+    """
+    Helper to fetch one page of candidates from backend.
+    Returns a dict with 'items', 'next_cursor' and 'total'.
+    """
+    params = {"limit": limit}
+    if cursor:
+        params["cursor"] = cursor
+    if sort:
+        params["sort"] = sort
+    if order:
+        params["order"] = order
+    if fields:
+        params["fields"] = ",".join(fields)
+    # Drop empty filters so the backend only applies the ones that were set
+    params.update({k: v for k, v in (filters or {}).items() if v not in (None, "", 0)})
+
+    empty_page = {"items": [], "next_cursor": None, "total": 0}
     try:
-        response = requests.get(f"{BACKEND_URL}/candidates/{platform}")
-        return response.json() if response.status_code == 200 else []
+        status, payload = get_json_cached(f"/candidates/{platform}", params)
+        return payload if status == 200 else empty_page
     except requests.exceptions.RequestException:
         st.error(f"Failed to fetch {platform} data.")
-        return []
+        return empty_page
+
+def export_candidates(platform, fmt="csv", filters=None):
+    """
+    Download every matching candidate of a platform from the streaming export
+    endpoint. Returns the file contents as bytes, or None on failure.
+    """
+    params = {"format": fmt}
+    params.update({k: v for k, v in (filters or {}).items() if v not in (None, "", 0)})
+    try:
+        with requests.get(f"{BACKEND_URL}/export/{platform}", params=params, stream=True, timeout=60) as response:
+            if response.status_code != 200:
+                return None
+            return b"".join(response.iter_content(chunk_size=64 * 1024))
+    except requests.exceptions.RequestException:
+        st.error(f"Failed to export {platform} data.")
+        return None
 
 def fetch_top_candidates(platform):
     """Fetch top candidates list for a specific platform."""
     try:
-        response = requests.get(f"{BACKEND_URL}/top_candidates/{platform}")
-        return response.json() if response.status_code == 200 else []
+        status, payload = get_json_cached(f"/top_candidates/{platform}")
+        return payload if status == 200 else []
     except requests.exceptions.RequestException:
         st.error(f"Failed to fetch top candidates for {platform}.")
         return []
 
 def fetch_questions():
-    """Fetch sample questions."""
+    """Fetch the question bank listing (no examples or test cases)."""
     try:
-        return requests.get(f"{BACKEND_URL}/questions").json()
+        status, payload = get_json_cached("/questions")
+        return payload if status == 200 else []
     except:
         return []
 
+def fetch_question(question_id):
+    """Fetch the full definition of one question."""
+    try:
+        response = requests.get(f"{BACKEND_URL}/questions/{question_id}")
+        return response.json() if response.status_code == 200 else None
+    except requests.exceptions.RequestException:
+        return None
+
 def assign_question(recruiter, candidate, question_dict, email, password):
     """Call backend to assign question."""
     payload = {
@@ -64,9 +133,24 @@ def assign_question(recruiter, candidate, question_dict, email, password):
     except:
         return False
 
+def assign_questions_bulk(recruiter, rows):
+    """
+    Assign questions to many candidates in one call.
+    rows: list of dicts with candidate_username, question_id, email and candidate_password.
+    Returns the per-row results, or None if the request failed.
+    """
+    payload = {"recruiter_username": recruiter, "assignments": rows}
+    try:
+        res = requests.post(f"{BACKEND_URL}/assign_questions/bulk", json=payload)
+        if res.status_code == 200:
+            return res.json()["results"]
+        return None
+    except:
+        return None
+
 def fetch_stats():
     try:
-        stats = requests.get(f"{BACKEND_URL}/stats").json()
+        status, stats = get_json_cached("/stats")
         return stats
     except:
         return None
@@ -113,6 +197,43 @@ def submit_solution(username, question_id, assignment_id, code):
         st.error(f"Request Failed: {str(e)}")
         return {"status": "error", "message": str(e)}
 
+def fetch_submission_job(job_id):
+    try:
+        res = requests.get(f"{BACKEND_URL}/submission_jobs/{job_id}", timeout=10)
+        return res.json() if res.status_code == 200 else None
+    except requests.RequestException:
+        return None
+
+def stream_submission_events(job_id):
+    """
+    Yields (event, data) pairs from a submission job's server-sent events:
+    "status", one "progress" per test case, then "result" or "failed".
+    If the stream breaks, the job is polled until it finishes instead.
+    """
+    try:
+        with requests.get(f"{BACKEND_URL}/submission_jobs/{job_id}/events", stream=True, timeout=(5, 60)) as res:
+            res.raise_for_status()
+            event = None
+            for line in res.iter_lines(decode_unicode=True):
+                if line.startswith("event: "):
+                    event = line[len("event: "):]
+                elif line.startswith("data: ") and event:
+                    yield event, json.loads(line[len("data: "):])
+                    if event in ("result", "failed"):
+                        return
+    except requests.RequestException:
+        pass
+
+    while True:
+        job = fetch_submission_job(job_id)
+        if job and job["status"] == "completed":
+            yield "result", {"result": job["result"], "error": None}
+            return
+        if job is None or job["status"] == "failed":
+            yield "failed", {"result": None, "error": job["error"] if job else "Lost track of the submission."}
+            return
+        time.sleep(1)
+
 def trigger_workflow(token, owner, repo, workflow_id, inputs):
     """
     Triggers a GitHub Actions workflow dispatch event.
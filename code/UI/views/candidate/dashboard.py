@@ -1,13 +1,13 @@
 import streamlit as st
 import datetime
-from services.api import fetch_my_assignments, fetch_questions
+from services.api import fetch_my_assignments, fetch_questions, fetch_question
 
 def render_assignment_list():
     st.subheader("My Assignments")
     assignments = fetch_my_assignments(st.session_state['username'])
     
     if assignments:
-        # Fetch question details to display names and difficulty (mocked)
+        # Fetch the question listing to display descriptions
         questions = fetch_questions()
         
         # Create a table-like structure
@@ -30,7 +30,7 @@ def render_assignment_list():
                 else:
                     if st.button("Solve Challenge", key=f"solve_{task['id']}"):
                         st.session_state['active_assignment'] = task
-                        st.session_state['active_question'] = next((q for q in questions if q['id'] == task['question_id']), None)
+                        st.session_state['active_question'] = fetch_question(task['question_id'])
                         st.session_state['candidate_view'] = 'editor'
                         st.session_state['start_time'] = datetime.datetime.now()
                         st.session_state['end_time'] = st.session_state['start_time'] + datetime.timedelta(minutes=30)
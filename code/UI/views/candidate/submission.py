@@ -3,7 +3,7 @@ import datetime
 import time
 import streamlit.components.v1 as components
 from code_editor import code_editor
-from services.api import run_code_mock, submit_solution
+from services.api import run_code_mock, submit_solution, stream_submission_events
 
 def render_code_editor():
     task = st.session_state.get('active_assignment')
@@ -44,12 +44,10 @@ def render_code_editor():
              current_code = st.session_state.get(f"code_{task['id']}")
              if current_code:
                  result = submit_solution(st.session_state['username'], question['id'], task['id'], current_code)
-                 if result and result.get('status') == 'success':
-                     exec_res = result.get('execution_result', {})
-                     score = exec_res.get('score', 0)
-                     total = exec_res.get('total', 0)
-                     
-                     st.success(f"Time's Up! Assignment Auto-Submitted. Score: {score}/{total}")
+                 if result and result.get('status') == 'queued':
+                     # Don't wait for the result: a whole cohort hits the deadline at once.
+                     # The submission keeps its submit time and is graded in order.
+                     st.success("Time's Up! Assignment Auto-Submitted. Your result will appear on your dashboard once it has been graded.")
                      time.sleep(3)
                      st.session_state['candidate_view'] = 'list'
                      st.rerun()
@@ -118,7 +116,7 @@ def render_code_editor():
     with col_left:
         # Problem Description Panel
         st.markdown(f"### {question['title']}")
-        st.info(f"Difficulty: Medium") # Mock
+        st.info(f"Difficulty: {question.get('difficulty', 'Medium')}")
         st.markdown("#### Description")
         st.write(question['description'])
         
@@ -193,6 +191,8 @@ def render_code_editor():
         if 'run_output' in st.session_state:
             res = st.session_state['run_output']
             st.markdown("#### Output")
+            if res.get('cached'):
+                st.caption("Unchanged code: showing the result of your previous identical run.")
             if res.get('status') == 'success':
                  st.success(res.get('output', 'Passed'))
             else:
@@ -208,12 +208,30 @@ def confirm_submission(username, question_id, assignment_id, code):
     with col2:
         if st.button("Confirm Submit", type="primary"):
             result = submit_solution(username, question_id, assignment_id, code)
-            if result and result.get('status') == 'success':
-                exec_res = result.get('execution_result', {})
+            if result and result.get('status') == 'queued':
+                # The backend runs the submission as a job; show each test case as it completes
+                exec_res, error = None, None
+                with st.status("Running your solution...", expanded=True) as status_box:
+                    progress_bar = st.progress(0.0)
+                    for event, data in stream_submission_events(result['job_id']):
+                        if event == 'progress':
+                            outcome = "Passed" if data['passed'] else "Failed"
+                            st.write(f"Test Case {data['case']+1}/{data['total']}: {outcome} ({data['wall_ms']:.3f}ms)")
+                            progress_bar.progress((data['case'] + 1) / max(data['total'], 1))
+                        elif event == 'result':
+                            exec_res = data['result']
+                        elif event == 'failed':
+                            error = data['error']
+                    status_box.update(label="Finished" if exec_res else "Submission failed",
+                                      state="complete" if exec_res else "error", expanded=False)
+
+                if exec_res is None:
+                    st.error(f"Submission Failed: {error or 'Unknown error'}")
+                    return
+
                 score = exec_res.get('score', 0)
                 total = exec_res.get('total', 0)
-                outcome = result.get('output', 'Submitted') # Fallback
-                
+
                 if score == total and total > 0:
                     st.balloons()
                     st.success(f"Assignment Submitted! \n\n**Result: Passed ({score}/{total})**")
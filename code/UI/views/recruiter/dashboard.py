@@ -1,12 +1,118 @@
 import streamlit as st
 import pandas as pd
 import altair as alt
+import json
 import os
-from services.api import fetch_stats, fetch_candidates, fetch_questions, assign_question, fetch_recruiter_assignments, fetch_top_candidates
+import secrets
+from services.api import fetch_stats, fetch_candidates, fetch_questions, assign_question, assign_questions_bulk, fetch_recruiter_assignments, fetch_top_candidates, export_candidates
 from dotenv import load_dotenv
 
 load_dotenv()
 
+# Sort columns offered in the Manage Candidates tab, with their default order
+CANDIDATE_SORTS = {
+    "GitHub": {"followers": "desc", "total_stars": "desc", "public_repos": "desc", "username": "asc"},
+    "LeetCode": {"Ranking": "asc", "Reputation": "desc", "All_Solved": "desc", "Hard_Solved": "desc"},
+    "StackOverflow": {"reputation": "desc", "gold": "desc", "name": "asc"}
+}
+
+def render_candidate_filters(platform):
+    """Renders the server-side filter widgets and returns (filters, sort, order)."""
+    with st.expander("Filters & Sorting", expanded=False):
+        col_f1, col_f2, col_sort = st.columns(3)
+        if platform == "GitHub":
+            with col_f1:
+                min_followers = st.number_input("Min Followers", value=0, step=50, key="cand_min_followers")
+                min_stars = st.number_input("Min Total Stars", value=0, step=100, key="cand_min_stars")
+            with col_f2:
+                location = st.text_input("Location contains", key="cand_location")
+                language = st.text_input("Top language contains", key="cand_language")
+            filters = {"min_followers": min_followers, "min_stars": min_stars, "location": location, "language": language}
+        elif platform == "LeetCode":
+            with col_f1:
+                max_ranking = st.number_input("Max Ranking", value=0, step=1000, key="cand_max_ranking", help="0 means no limit")
+                min_reputation = st.number_input("Min Reputation", value=0, step=10, key="cand_lc_min_rep")
+            with col_f2:
+                min_solved = st.number_input("Min Problems Solved", value=0, step=50, key="cand_min_solved")
+            filters = {"max_ranking": max_ranking, "min_reputation": min_reputation, "min_solved": min_solved}
+        else:
+            with col_f1:
+                min_reputation = st.number_input("Min Reputation", value=0, step=1000, key="cand_so_min_rep")
+                min_gold = st.number_input("Min Gold Badges", value=0, step=10, key="cand_min_gold")
+            with col_f2:
+                name = st.text_input("Name contains", key="cand_name")
+            filters = {"min_reputation": min_reputation, "min_gold": min_gold, "name": name}
+        with col_sort:
+            sorts = CANDIDATE_SORTS[platform]
+            sort = st.selectbox("Sort by", list(sorts.keys()), key=f"cand_sort_{platform}")
+            order = st.radio("Order", ["desc", "asc"], index=0 if sorts[sort] == "desc" else 1, horizontal=True, key=f"cand_order_{platform}_{sort}")
+    return filters, sort, order
+
+def render_bulk_assign(df_top, user_col):
+    """Multi-select flow that assigns one question to several shortlisted candidates in a single request."""
+    st.markdown("#### Bulk Assign")
+    with st.container(border=True):
+        selected = st.multiselect("Select Candidates", df_top[user_col].astype(str).tolist(), key="bulk_cand_select")
+        questions = fetch_questions()
+        q_titles = [q['title'] for q in questions] if questions else []
+        selected_q_title = st.selectbox("Select Question", q_titles, key="bulk_q_select")
+        selected_q_obj = next((q for q in questions if q['title'] == selected_q_title), None)
+
+        if not selected:
+            st.caption("Select one or more candidates to assign the question to.")
+            return
+
+        # One editable row per candidate; emails are pre-filled when the profile has one,
+        # passwords are generated and can be overwritten
+        emails = {}
+        if 'email' in df_top.columns:
+            emails = {str(u): e for u, e in zip(df_top[user_col], df_top['email']) if pd.notna(e)}
+        generated = st.session_state.setdefault('bulk_passwords', {})
+        df_rows = pd.DataFrame({
+            "candidate_username": selected,
+            "email": [emails.get(u, '') for u in selected],
+            "candidate_password": [generated.setdefault(u, secrets.token_urlsafe(9)) for u in selected]
+        })
+        edited = st.data_editor(
+            df_rows,
+            column_config={
+                "candidate_username": st.column_config.TextColumn("Candidate", disabled=True),
+                "email": st.column_config.TextColumn("Email", required=True),
+                "candidate_password": st.column_config.TextColumn("Password", required=True)
+            },
+            width="stretch",
+            hide_index=True,
+            key="bulk_rows"
+        )
+
+        if st.button(f"Assign to {len(selected)} Candidates", type="primary", width="stretch", key="bulk_assign_btn"):
+            if not selected_q_obj:
+                st.error("Please select a question.")
+                return
+            rows = [
+                {"candidate_username": r["candidate_username"], "question_id": selected_q_obj['id'],
+                 "email": r["email"] or '', "candidate_password": r["candidate_password"] or ''}
+                for r in edited.to_dict(orient="records")
+            ]
+            results = assign_questions_bulk(st.session_state['username'], rows)
+            if results is None:
+                st.error("Failed to assign questions.")
+                return
+            succeeded = sum(1 for r in results if r["status"] == "success")
+            if succeeded == len(results):
+                st.success(f"✅ Assigned '{selected_q_title}' to {succeeded} candidates and queued their emails!")
+            else:
+                st.warning(f"Assigned {succeeded} of {len(results)} candidates.")
+            st.dataframe(
+                pd.DataFrame([
+                    {"Candidate": row["candidate_username"], "Result": r["status"],
+                     "Details": r.get("message") or f"Assignment #{r['assignment_id']} (account {r['account']})"}
+                    for row, r in zip(rows, results)
+                ]),
+                width="stretch",
+                hide_index=True
+            )
+
 def render_recruiter_dashboard():
     col1, col2 = st.columns([2, 1])
     with col1:
@@ -119,9 +225,12 @@ def render_recruiter_dashboard():
                         st.error("Please set a password for the candidate.")
                     else:
                         if assign_question(st.session_state['username'], selected_candidate, selected_q_obj, candidate_email, new_password):
-                            st.success(f"✅ Assigned '{selected_q_title}' to **{selected_candidate}** and sent email to {candidate_email}!")
+                            st.success(f"✅ Assigned '{selected_q_title}' to **{selected_candidate}** and queued an email to {candidate_email}!")
                         else:
                             st.error("Failed to assign question.")
+
+                st.markdown("---")
+                render_bulk_assign(df_top, user_col)
             else:
                  st.info(f"No top candidates found for {platform_filter}.")
 
@@ -133,15 +242,55 @@ def render_recruiter_dashboard():
         
         # 2. View Candidates
         if platform:
-            candidates = fetch_candidates(platform)
+            filters, sort, order = render_candidate_filters(platform)
+            page_size = st.selectbox("Rows per page", [25, 50, 100, 200], index=1, key="cand_page_size")
+
+            # Cursor stack for the current platform/filter combination, reset when either changes
+            page_key = (platform, tuple(sorted(filters.items())), sort, order, page_size)
+            if st.session_state.get('cand_page_key') != page_key:
+                st.session_state['cand_page_key'] = page_key
+                st.session_state['cand_cursors'] = [None]
+            cursors = st.session_state['cand_cursors']
+
+            page = fetch_candidates(platform, limit=page_size, cursor=cursors[-1], sort=sort, order=order, filters=filters)
+            candidates = page["items"]
             if candidates:
                 # --- Metrics ---
-                st.metric(label=f"Total {platform} Candidates", value=len(candidates))
+                st.metric(label=f"Total {platform} Candidates", value=page["total"])
                 
                 # --- Candidate Table ---
                 df = pd.DataFrame(candidates)
                 st.dataframe(df, width="stretch", hide_index=True)
 
+                # --- Pagination ---
+                col_prev, col_page, col_next = st.columns([1, 2, 1])
+                with col_prev:
+                    if st.button("← Previous", disabled=len(cursors) == 1, key="cand_prev"):
+                        cursors.pop()
+                        st.rerun()
+                with col_page:
+                    st.caption(f"Page {len(cursors)} of {max(1, -(-page['total'] // page_size))}")
+                with col_next:
+                    if st.button("Next →", disabled=not page["next_cursor"], key="cand_next"):
+                        cursors.append(page["next_cursor"])
+                        st.rerun()
+
+                # --- Export ---
+                with st.expander(f"Export all {page['total']} matching candidates"):
+                    export_fmt = st.selectbox("Format", ["csv", "ndjson"], key="cand_export_fmt")
+                    if st.button("Prepare export", key="cand_export_btn"):
+                        st.session_state['cand_export'] = (page_key, export_fmt, export_candidates(platform, export_fmt, filters))
+                    export = st.session_state.get('cand_export')
+                    if export and export[:2] == (page_key, export_fmt):
+                        if export[2] is None:
+                            st.error("Export failed.")
+                        else:
+                            st.download_button(
+                                "Download", data=export[2], file_name=f"{platform}.{export_fmt}",
+                                mime="text/csv" if export_fmt == "csv" else "application/x-ndjson",
+                                key="cand_export_download"
+                            )
+
                 st.markdown("---")
                 
                 # --- Assignment Workflow ---
@@ -181,7 +330,7 @@ def render_recruiter_dashboard():
                         st.error("Please set a password for the candidate.")
                     else:
                         if assign_question(st.session_state['username'], selected_candidate, selected_q_obj, candidate_email, new_password):
-                            st.success(f"✅ Assigned '{selected_q_title}' to **{selected_candidate}** and sent email to {candidate_email}!")
+                            st.success(f"✅ Assigned '{selected_q_title}' to **{selected_candidate}** and queued an email to {candidate_email}!")
                         else:
                             st.error("Failed to assign question.")
             else:
@@ -234,6 +383,8 @@ def render_recruiter_dashboard():
                     st.markdown("#### Candidate Info")
                     st.write(f"**Name:** `{submission['candidate_username']}`")
                     st.write(f"**Question:** {submission['question_title']}")
+                    if submission.get('email_status'):
+                        st.write(f"**Invitation Email:** {submission['email_status'].capitalize()}")
                     
                     # Status Badge
                     status_val = submission['status'].lower()
@@ -248,6 +399,41 @@ def render_recruiter_dashboard():
                     
                     st.metric("Score", f"{submission['score']}/{submission['total_test_cases']}")
                     st.markdown(f"**Outcome:** <span style='background-color:{outcome_color}; color:white; padding: 4px 8px; border-radius: 4px; font-weight:bold;'>{outcome}</span>", unsafe_allow_html=True)
+
+                # --- Measured Performance ---
+                if submission.get('runtime_ms') is not None:
+                    st.markdown("#### ⏱️ Performance")
+                    p1, p2, p3 = st.columns(3)
+                    p1.metric("Runtime", f"{submission['runtime_ms']:.3f} ms")
+                    p2.metric("CPU Time", f"{submission['cpu_time_ms']:.3f} ms")
+                    p3.metric("Peak Memory", f"{submission['peak_memory_kb']:.1f} KB")
+
+                    # Empirical complexity from the scaled-input run
+                    if submission.get('complexity'):
+                        profile = json.loads(submission['complexity_profile'] or "{}")
+                        st.metric("Estimated Complexity", submission['complexity'],
+                                  help=f"log-log slope: {profile.get('exponent')}")
+                        if profile.get('timed_out_at'):
+                            st.warning(f"Timed out at input size n = {profile['timed_out_at']}")
+                        curve = [p for p in profile.get('points', []) if 'ms' in p]
+                        if curve:
+                            st.line_chart(pd.DataFrame(curve).set_index('n'), x_label="Input size (n)", y_label="Runtime (ms)")
+
+                    case_metrics = json.loads(submission['test_case_metrics'] or "[]")
+                    if case_metrics:
+                        df_cases = pd.DataFrame(case_metrics)
+                        df_cases['case'] = df_cases['case'] + 1
+                        st.dataframe(
+                            df_cases,
+                            column_config={
+                                "case": st.column_config.NumberColumn("Test Case"),
+                                "wall_ms": st.column_config.NumberColumn("Runtime (ms)", format="%.3f"),
+                                "cpu_ms": st.column_config.NumberColumn("CPU (ms)", format="%.3f"),
+                                "peak_kb": st.column_config.NumberColumn("Peak Memory (KB)", format="%.1f")
+                            },
+                            width="stretch",
+                            hide_index=True
+                        )
                 
                 st.markdown("---")
                 
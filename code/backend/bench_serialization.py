@@ -0,0 +1,73 @@
+import argparse
+import json
+import time
+import tracemalloc
+
+# Compares the old pandas response path (read_sql -> astype/where ->
+# to_dict -> jsonable_encoder -> json.dumps) with json_rows (sqlite3 tuples
+# -> dicts -> dumps) on a whole profile table.
+#
+# Usage (from code/backend):
+#   python bench_serialization.py [--table Stack_overflow] [--repeats 5]
+
+
+def pandas_path(conn, sql):
+    import pandas as pd
+    from fastapi.encoders import jsonable_encoder
+
+    df = pd.read_sql(sql, conn)
+    df = df.astype(object).where(pd.notnull(df), None)
+    return json.dumps(jsonable_encoder(df.to_dict(orient="records")), separators=(",", ":")).encode()
+
+
+def rows_path(conn, sql):
+    from json_rows import dumps, fetch_records
+
+    return dumps(fetch_records(conn, sql))
+
+
+def measure(path, conn, sql, repeats):
+    """Returns (best wall time in ms, peak traced memory in MB, body)."""
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        body = path(conn, sql)
+        times.append((time.perf_counter() - start) * 1000)
+
+    tracemalloc.start()
+    path(conn, sql)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return min(times), peak / (1024 * 1024), body
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--table", default="Stack_overflow")
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args()
+
+    from db_pool import get_db_connection
+    import json_rows
+
+    sql = f"SELECT * FROM {args.table}"
+    with get_db_connection() as conn:
+        rows = conn.execute(f"SELECT COUNT(*) FROM {args.table}").fetchone()[0]
+        print(f"{args.table}: {rows} rows, encoder: {'orjson' if json_rows.orjson else 'json (stdlib)'}")
+
+        results = {}
+        for name, path in (("pandas", pandas_path), ("json_rows", rows_path)):
+            ms, peak_mb, body = measure(path, conn, sql, args.repeats)
+            results[name] = (ms, peak_mb, body)
+            print(f"  {name:<10} {ms:8.1f} ms  peak {peak_mb:7.1f} MB  {len(body) / 1024:8.0f} KB")
+
+    old, new = results["pandas"], results["json_rows"]
+    print(f"  speedup {old[0] / new[0]:.1f}x, peak memory {old[1] / new[1]:.1f}x lower")
+    # pandas turns INTEGER columns containing NULL into floats (12 -> 12.0), so
+    # compare the decoded values rather than the bytes
+    if json.loads(old[2]) != json.loads(new[2]):
+        print("  WARNING: the two paths produced different data")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+# Measures backend cold start the way a new uvicorn worker sees it: each run
+# is a fresh interpreter that imports main, runs the startup hooks and sends
+# its first requests. Reports the median of every step over --runs runs.
+#
+# Usage (from code/backend):
+#   python bench_startup.py [--runs 5]
+
+CHILD = r'''
+import json, sys, time
+start = time.perf_counter()
+timings = {}
+
+def mark(name):
+    global start
+    now = time.perf_counter()
+    timings[name] = (now - start) * 1000
+    start = now
+
+import main
+mark("import main")
+modules = len(sys.modules)
+
+from fastapi.testclient import TestClient
+mark("import TestClient")
+with TestClient(main.app) as client:
+    mark("startup hooks")
+    client.get("/")
+    mark("first GET /")
+    client.get("/questions")
+    mark("first GET /questions")
+    client.get("/candidates/GitHub", params={"limit": 50})
+    mark("first GET /candidates")
+    client.post("/run_code", json={"code": "def solution(nums, target):\n    return [0, 1]", "question_id": 101})
+    mark("first POST /run_code")
+timings["modules loaded by main"] = modules
+print(json.dumps(timings))
+'''
+
+
+def run_once():
+    env = dict(os.environ, SANDBOX_WORKERS=os.environ.get("SANDBOX_WORKERS", "1"))
+    result = subprocess.run([sys.executable, "-c", CHILD], capture_output=True, text=True, env=env,
+                            cwd=os.path.dirname(os.path.abspath(__file__)))
+    if result.returncode != 0:
+        sys.exit(f"Benchmark run failed:\n{result.stderr}")
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    runs = [run_once() for _ in range(args.runs)]
+    print(f"Median of {args.runs} cold starts:")
+    for name in runs[0]:
+        value = statistics.median(run[name] for run in runs)
+        unit = "" if name.startswith("modules") else " ms"
+        print(f"  {name:<24} {value:8.1f}{unit}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,175 @@
+import os
+import re
+import sqlite3
+import sys
+import tempfile
+
+# Exercises every backend endpoint against a copy of the database, records the
+# SQL the API runs and fails if any statement needs a full table scan
+# (i.e. no index from schema.py can serve it).
+#
+# Usage (from code/backend, after setup_db.py / migrate_db.py):
+#   python check_query_plans.py
+# The same check runs in the test suite (tests/test_query_plans.py).
+
+# Scans that are expected, with the reason
+ALLOWED_SCANS = {
+    "top_github": "the shortlist (top N rows) is returned whole",
+    "top_leetcode": "the shortlist (top N rows) is returned whole",
+    "top_stackoverflow": "the shortlist (top N rows) is returned whole",
+}
+# Statements that read a whole table on purpose, with the reason
+ALLOWED_STATEMENTS = [
+    # Substring filters (LIKE '%...%') can't use a b-tree index
+    (re.compile(r"LIKE\s+'%", re.IGNORECASE), "substring search"),
+    # /export/{platform} without filters streams the whole table in rowid order
+    (re.compile(r'^SELECT ("[^"]+", )*"[^"]+" FROM \w+ ORDER BY rowid$'), "unfiltered table export"),
+    # /questions without filters lists the whole bank
+    (re.compile(r"FROM questions q\s+ORDER BY q\.id$"), "unfiltered question listing"),
+]
+# "SCAN t" without "USING ... INDEX" walks the whole table b-tree
+FULL_SCAN = re.compile(r"^SCAN (\w+)\b(?! USING)")
+
+
+def copy_database(workdir):
+    """Copies database.db and the current profile snapshot into workdir."""
+    from db_pool import DB_PATH, SNAPSHOT_POINTER, current_snapshot_path
+
+    def backup(src, dst):
+        source, target = sqlite3.connect(src), sqlite3.connect(dst)
+        source.backup(target)
+        source.close()
+        target.close()
+
+    db_copy = os.path.join(workdir, os.path.basename(DB_PATH))
+    backup(DB_PATH, db_copy)
+    snapshot = current_snapshot_path()
+    if snapshot:
+        backup(snapshot, os.path.join(workdir, os.path.basename(snapshot)))
+        with open(os.path.join(workdir, os.path.basename(SNAPSHOT_POINTER)), 'w', encoding='utf-8') as f:
+            f.write(os.path.basename(snapshot))
+    return db_copy
+
+
+def exercise_endpoints(client):
+    """Calls every endpoint with representative parameters."""
+    from main import CANDIDATE_FILTERS, SORTABLE_COLUMNS
+    from email_outbox import email_sender
+
+    client.get("/")
+    client.post("/login/Candidate", json={"username": "student1", "password": "password123"})
+    client.post("/login/recruiter", json={"username": "recruiter1", "password": "admin123"})
+    client.get("/stats")
+
+    for platform, columns in SORTABLE_COLUMNS.items():
+        client.get(f"/top_candidates/{platform}")
+        client.get(f"/candidates/{platform}")
+        for column in columns:
+            for order in ("asc", "desc"):
+                page = client.get(f"/candidates/{platform}", params={"sort": column, "order": order, "limit": 5}).json()
+                if page.get("next_cursor"):
+                    client.get(f"/candidates/{platform}",
+                               params={"sort": column, "order": order, "limit": 5, "cursor": page["next_cursor"]})
+        for param, (column, operator) in CANDIDATE_FILTERS[platform].items():
+            client.get(f"/candidates/{platform}", params={param: "a" if operator == "LIKE" else 1})
+            client.get(f"/export/{platform}", params={param: "a" if operator == "LIKE" else 1})
+        client.get(f"/export/{platform}", params={"format": "csv"})
+
+    questions = client.get("/questions").json()
+    client.get("/questions", params={"difficulty": "Easy", "tag": "array", "after_id": 0, "limit": 10})
+    question = client.get(f"/questions/{questions[0]['id']}").json()
+    client.put(f"/questions/{question['id']}", json={k: v for k, v in question.items() if k != "id"},
+               auth=("recruiter1", "admin123"))
+    client.get(f"/questions/{question['id']}")
+
+    assigned = client.post("/assign_question", json={
+        "recruiter_username": "recruiter1", "candidate_username": "plan_check_candidate",
+        "question_id": question["id"], "question_title": question["title"],
+        "candidate_password": "plan-check", "email": "plan-check@example.com"
+    })
+    client.post("/assign_questions/bulk", json={"recruiter_username": "recruiter1", "assignments": [
+        {"candidate_username": f"plan_check_bulk{i}", "question_id": question["id"],
+         "candidate_password": "plan-check", "email": f"plan-check{i}@example.com"} for i in range(3)
+    ]})
+    # The outbox sender's queries (the SMTP server is unreachable on purpose)
+    email_sender.send_pending()
+
+    client.get("/recruiter_assignments/recruiter1")
+    assignments = client.get("/my_assignments/plan_check_candidate").json()
+    if assigned.status_code == 200 and assignments:
+        job = client.post("/submit_solution", json={
+            "username": "plan_check_candidate", "question_id": question["id"],
+            "assignment_id": assignments[-1]["id"], "code": "def solution(nums, target):\n    return [0, 1]"
+        }).json()
+        # The submission runs as a background job; the events stream ends when it finishes
+        if job.get("job_id"):
+            with client.stream("GET", f"/submission_jobs/{job['job_id']}/events") as events:
+                for _ in events.iter_lines():
+                    pass
+            client.get(f"/submission_jobs/{job['job_id']}")
+
+
+def traced_queries(client):
+    """The distinct queries the API runs while exercise_endpoints() calls it."""
+    from db_pool import pool
+
+    statements = []
+    pool.set_trace_callback(statements.append)
+    try:
+        exercise_endpoints(client)
+    finally:
+        pool.set_trace_callback(None)
+    return sorted({s.strip() for s in statements if s.lstrip().upper().startswith(("SELECT", "INSERT", "UPDATE", "DELETE", "WITH"))})
+
+
+def check_plans(statements):
+    """Returns (failures, allowed) lists of (sql, plan detail) for scanning statements."""
+    from db_pool import get_db_connection
+
+    failures, allowed = [], []
+    with get_db_connection() as conn:
+        for sql in statements:
+            for row in conn.execute("EXPLAIN QUERY PLAN " + sql):
+                detail = row[3]
+                match = FULL_SCAN.match(detail)
+                if not match or match.group(1) == "CONSTANT":
+                    continue
+                table = match.group(1)
+                reason = ALLOWED_SCANS.get(table) or next(
+                    (reason for pattern, reason in ALLOWED_STATEMENTS if pattern.search(sql)), None)
+                if reason:
+                    allowed.append((sql, f"{detail} ({reason})"))
+                else:
+                    failures.append((sql, detail))
+    return failures, allowed
+
+
+def main():
+    workdir = tempfile.mkdtemp(prefix="query_plans_")
+    # Point the backend at the copy before it is imported, and keep it from sending mail
+    os.environ["HUSHHUSH_DB_PATH"] = copy_database(workdir)
+    os.environ["SMTP_HOST"], os.environ["SMTP_PORT"], os.environ["SMTP_STARTTLS"] = "127.0.0.1", "1", "0"
+    os.environ.setdefault("SANDBOX_WORKERS", "1")
+    for name in ("db_pool", "email_outbox", "response_cache", "main"):
+        sys.modules.pop(name, None)
+
+    from fastapi.testclient import TestClient
+    import main as backend
+
+    with TestClient(backend.app) as client:
+        queries = traced_queries(client)
+    failures, allowed = check_plans(queries)
+
+    print(f"Checked {len(queries)} distinct queries")
+    for sql, detail in allowed:
+        print(f"  allowed: {detail}\n    {sql}")
+    for sql, detail in failures:
+        print(f"  FULL SCAN: {detail}\n    {sql}")
+    if failures:
+        print(f"{len(failures)} queries do a full table scan; add an index in schema.py")
+        sys.exit(1)
+    print("No full table scans.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+import math
+import os
+import random
+
+# Input sizes tried in order; profiling stops at the first size that times out
+PROFILE_SIZES = [int(n) for n in os.environ.get(
+    'COMPLEXITY_SIZES', '256,512,1024,2048,4096,8192,16384,32768,65536').split(',')]
+SIZE_TIMEOUT_S = float(os.environ.get('COMPLEXITY_SIZE_TIMEOUT_S', 1.0))
+PROFILE_WALL_LIMIT_S = float(os.environ.get('COMPLEXITY_WALL_LIMIT_S', 20))
+# Calls per size (the fastest one is kept); slow sizes are only run once
+REPEATS = 3
+MIN_POINTS = 3
+FIT_MARGIN = 0.5
+
+
+# --- Input generators (run inside the sandbox worker) ---
+# Each takes a size n and a seeded random.Random and returns the solution's
+# arguments, shaped like the question's test cases. Inputs are worst cases
+# for the naive approach, so brute force can't get lucky.
+
+def two_sum_input(n, rng):
+    # Only the last two numbers add up to the target
+    nums = [rng.randint(5, 10**6) * 2 for _ in range(n - 2)] + [1, 3]
+    return [nums, 4]
+
+
+def reverse_list_input(n, rng):
+    return [list(range(n))]
+
+
+def valid_parentheses_input(n, rng):
+    half = n // 2
+    opening = [rng.choice("([{") for _ in range(half)]
+    closing = [{"(": ")", "[": "]", "{": "}"}[c] for c in reversed(opening)]
+    return ["".join(opening + closing)]
+
+
+def merge_intervals_input(n, rng):
+    intervals = []
+    for _ in range(n):
+        start = rng.randint(0, 10 * n)
+        intervals.append([start, start + rng.randint(0, 5)])
+    return [intervals]
+
+
+def max_subarray_input(n, rng):
+    return [[rng.randint(-1000, 1000) for _ in range(n)]]
+
+
+# Keyed by question title rather than id, so a question replaced through
+# PUT /questions/{id} doesn't inherit the old problem's generator
+INPUT_GENERATORS = {
+    "Two Sum": two_sum_input,
+    "Reverse Linked List": reverse_list_input,
+    "Valid Parentheses": valid_parentheses_input,
+    "Merge Intervals": merge_intervals_input,
+    "Maximum Subarray": max_subarray_input,
+}
+
+
+def _same_shape(a, b):
+    """True if a and b nest lists, numbers and strings the same way (empty lists match any list)."""
+    if isinstance(a, list) and isinstance(b, list):
+        return not a or not b or _same_shape(a[0], b[0])
+    if isinstance(a, (int, float)) and isinstance(b, (int, float)):
+        return True
+    return type(a) is type(b)
+
+
+def input_generator_for(question):
+    """
+    Name of the input generator for a question definition, or None when there
+    is none or the question's test cases no longer take the arguments it
+    generates (an edited signature).
+    """
+    name = question["title"]
+    generator = INPUT_GENERATORS.get(name)
+    if generator is None or not question["test_cases"]:
+        return None
+    sample = generator(8, random.Random(0))
+    if not all(len(case["args"]) == len(sample) and all(map(_same_shape, case["args"], sample))
+               for case in question["test_cases"]):
+        return None
+    return name
+
+
+# --- Curve fitting (run in the API process) ---
+
+COMPLEXITY_CLASSES = [
+    ("O(1)", lambda n: 1.0),
+    ("O(log n)", lambda n: math.log2(n)),
+    ("O(n)", lambda n: float(n)),
+    ("O(n log n)", lambda n: n * math.log2(n)),
+    ("O(n^2)", lambda n: float(n) ** 2),
+    ("O(n^3)", lambda n: float(n) ** 3),
+]
+
+
+def _fit(points, f):
+    """
+    Fits t = c * f(n) in log space and returns the residual sum of squares.
+    Working on log(time) weighs every size equally, so the largest (and
+    noisiest) size doesn't decide the fit on its own.
+    """
+    residuals = [math.log(max(t, 1e-9)) - math.log(f(n)) for n, t in points]
+    log_c = sum(residuals) / len(residuals)
+    return sum((r - log_c) ** 2 for r in residuals)
+
+
+def loglog_slope(points):
+    """Slope of log(time) against log(n): ~1 for linear, ~2 for quadratic."""
+    logs = [(math.log(n), math.log(max(t, 1e-9))) for n, t in points]
+    mean_x = sum(x for x, _ in logs) / len(logs)
+    mean_y = sum(y for _, y in logs) / len(logs)
+    sxx = sum((x - mean_x) ** 2 for x, _ in logs)
+    return sum((x - mean_x) * (y - mean_y) for x, y in logs) / sxx if sxx else 0.0
+
+
+def estimate_complexity(timings):
+    """
+    Picks the complexity class whose curve best fits the measured runtimes.
+    timings is the worker's list of {"n", "ms"} points (plus a trailing
+    {"n", "timed_out": True} when a size hit its timeout).
+    """
+    points = [(t["n"], t["ms"]) for t in timings if not t.get("timed_out") and not t.get("error")]
+    timed_out_at = next((t["n"] for t in timings if t.get("timed_out")), None)
+    estimate = {"class": "unknown", "exponent": None, "timed_out_at": timed_out_at, "points": timings}
+    if len(points) < MIN_POINTS:
+        return estimate
+
+    # Classes are tried from cheapest to most expensive, and a more expensive
+    # one has to fit clearly better, so timing noise doesn't escalate the class
+    best = None
+    for name, f in COMPLEXITY_CLASSES:
+        residual = _fit(points, f)
+        if best is None or residual < best[1] * FIT_MARGIN:
+            best = (name, residual)
+    estimate["class"] = best[0]
+    estimate["exponent"] = round(loglog_slope(points), 2)
+    return estimate
@@ -0,0 +1,223 @@
+import sqlite3
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+from metrics import observe_db_query
+
+# Database Path (can be overridden, e.g. to point the backend at a copy of the database)
+DB_PATH = os.environ.get(
+    'HUSHHUSH_DB_PATH',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), '../database/database.db')
+)
+
+# Candidate profile tables live in a separate snapshot database built by
+# database/database.py. This file names the current snapshot; the pipeline
+# replaces it atomically once a new snapshot is complete. Snapshots alternate
+# between two file names, so a name can come back holding a rebuilt file.
+SNAPSHOT_POINTER = os.path.join(os.path.dirname(DB_PATH), 'profiles_current')
+SNAPSHOT_SCHEMA = 'profiles'
+
+# How long a connection waits on a locked database before raising "database is locked"
+BUSY_TIMEOUT_MS = int(os.environ.get('SQLITE_BUSY_TIMEOUT_MS', 5000))
+
+# Applied to every new connection. WAL lets readers keep going while
+# /submit_solution or /assign_question write, and synchronous=NORMAL is
+# durable enough in WAL mode while skipping an fsync per commit.
+PRAGMAS = [
+    "PRAGMA journal_mode = WAL",
+    f"PRAGMA busy_timeout = {BUSY_TIMEOUT_MS}",
+    "PRAGMA synchronous = NORMAL",
+    "PRAGMA cache_size = -20000",      # ~20MB page cache per connection
+    "PRAGMA mmap_size = 268435456",    # map up to 256MB of the file
+    "PRAGMA temp_store = MEMORY",
+]
+
+
+def current_snapshot_path():
+    """Absolute path of the current profile snapshot, or None if there isn't one yet."""
+    try:
+        with open(SNAPSHOT_POINTER, encoding='utf-8') as f:
+            name = f.read().strip()
+    except OSError:
+        return None
+    path = os.path.join(os.path.dirname(SNAPSHOT_POINTER), name)
+    return path if name and os.path.exists(path) else None
+
+
+class TimedCursor(sqlite3.Cursor):
+    """Cursor that reports the time of each execute and fetch call to the metrics."""
+    def execute(self, *args):
+        start = time.perf_counter()
+        try:
+            return super().execute(*args)
+        finally:
+            observe_db_query(time.perf_counter() - start)
+
+    def executemany(self, *args):
+        start = time.perf_counter()
+        try:
+            return super().executemany(*args)
+        finally:
+            observe_db_query(time.perf_counter() - start)
+
+    def fetchone(self):
+        start = time.perf_counter()
+        try:
+            return super().fetchone()
+        finally:
+            observe_db_query(time.perf_counter() - start)
+
+    def fetchmany(self, *args):
+        start = time.perf_counter()
+        try:
+            return super().fetchmany(*args)
+        finally:
+            observe_db_query(time.perf_counter() - start)
+
+    def fetchall(self):
+        start = time.perf_counter()
+        try:
+            return super().fetchall()
+        finally:
+            observe_db_query(time.perf_counter() - start)
+
+
+class TimedConnection(sqlite3.Connection):
+    """Connection whose cursors (including those of execute()) are TimedCursors."""
+    def cursor(self, factory=TimedCursor):
+        return super().cursor(factory)
+
+    def execute(self, *args):
+        return self.cursor().execute(*args)
+
+    def executemany(self, *args):
+        return self.cursor().executemany(*args)
+
+
+def open_connection(db_path=DB_PATH):
+    """
+    Opens a tuned connection (see PRAGMAS). check_same_thread is disabled so
+    close_all() can close pooled connections at shutdown and a dedicated
+    connection can be read from whichever thread drives a streamed response.
+    """
+    conn = sqlite3.connect(db_path, timeout=BUSY_TIMEOUT_MS / 1000, check_same_thread=False, factory=TimedConnection)
+    conn.row_factory = sqlite3.Row
+    for pragma in PRAGMAS:
+        conn.execute(pragma)
+    return conn
+
+
+def attach_snapshot(conn, path):
+    """
+    Attaches a profile snapshot as SNAPSHOT_SCHEMA. With the profile tables gone
+    from the main database, unqualified names like Git_hub resolve to it.
+    """
+    conn.execute(f"ATTACH DATABASE ? AS {SNAPSHOT_SCHEMA}", (path,))
+    conn.execute(f"PRAGMA {SNAPSHOT_SCHEMA}.cache_size = -20000")
+    conn.execute(f"PRAGMA {SNAPSHOT_SCHEMA}.mmap_size = 268435456")
+
+
+class ConnectionPool:
+    """
+    Per-thread SQLite connection pool.
+    Each thread (FastAPI runs sync handlers in a fixed worker thread pool)
+    opens one tuned connection on first use and reuses it for every request.
+    """
+    def __init__(self, db_path=DB_PATH):
+        self.db_path = db_path
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._connections = []
+        self._trace_callback = None
+
+    def _connect(self):
+        conn = open_connection(self.db_path)
+        with self._lock:
+            self._connections.append(conn)
+            conn.set_trace_callback(self._trace_callback)
+        return conn
+
+    def set_trace_callback(self, callback):
+        """Passes every SQL statement run on pooled connections to callback (None to stop)."""
+        with self._lock:
+            self._trace_callback = callback
+            for conn in self._connections:
+                conn.set_trace_callback(callback)
+
+    @contextmanager
+    def connection(self):
+        """
+        Yields this thread's connection, opening it on first use.
+        Any transaction left open when the outermost block exits is rolled back,
+        so a failed request never leaks uncommitted writes into the next one.
+        """
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = self._connect()
+            self._local.conn = conn
+            self._local.depth = 0
+            self._local.snapshot = None
+
+        if self._local.depth == 0:
+            self._attach_snapshot(conn)
+        self._local.depth += 1
+        try:
+            yield conn
+        finally:
+            self._local.depth -= 1
+            if self._local.depth == 0 and conn.in_transaction:
+                conn.rollback()
+
+    def _attach_snapshot(self, conn):
+        """
+        Attaches the current profile snapshot, switching over when the pipeline
+        has published a new one. Done between requests only, so a request in
+        flight keeps reading the snapshot it started with.
+        """
+        path = current_snapshot_path()
+        try:
+            # The file's identity, not just its name: a rebuilt file replaces the old one under the same name
+            stat = os.stat(path) if path is not None else None
+        except OSError:
+            path, stat = None, None
+        snapshot = (path, stat.st_ino, stat.st_mtime_ns) if stat is not None else None
+        if snapshot == getattr(self._local, 'snapshot', None):
+            return
+        if getattr(self._local, 'snapshot', None) is not None:
+            conn.execute(f"DETACH DATABASE {SNAPSHOT_SCHEMA}")
+        if path is not None:
+            attach_snapshot(conn, path)
+        self._local.snapshot = snapshot
+
+    def dedicated_connection(self):
+        """
+        Opens a connection outside the pool, on the current snapshot, for work
+        that outlives a request handler (e.g. a streamed response consumed
+        from several threads). The caller closes it.
+        """
+        conn = open_connection(self.db_path)
+        conn.set_trace_callback(self._trace_callback)
+        path = current_snapshot_path()
+        if path is not None:
+            attach_snapshot(conn, path)
+        return conn
+
+    def close_all(self):
+        """Closes every connection opened by the pool (used on shutdown)."""
+        with self._lock:
+            connections, self._connections = self._connections, []
+        for conn in connections:
+            try:
+                conn.close()
+            except sqlite3.Error:
+                pass
+        self._local = threading.local()
+
+
+pool = ConnectionPool()
+
+def get_db_connection():
+    """Context manager returning the pooled connection for the current thread."""
+    return pool.connection()
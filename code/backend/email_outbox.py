@@ -0,0 +1,254 @@
+import os
+import threading
+import time
+
+from db_pool import get_db_connection
+
+# smtplib and the email.mime modules are imported on first send, so workers
+# that never send mail don't pay for them at startup.
+
+# SMTP server (point SMTP_HOST/SMTP_PORT at a local stand-in and set
+# SMTP_STARTTLS=0 to test without sending real mail)
+SMTP_HOST = os.getenv('SMTP_HOST', 'smtp-relay.brevo.com')
+SMTP_PORT = int(os.getenv('SMTP_PORT', 587))
+SMTP_STARTTLS = os.getenv('SMTP_STARTTLS', '1') not in ('0', 'false', 'False')
+SMTP_TIMEOUT_S = float(os.getenv('SMTP_TIMEOUT_S', 30))
+SMTP_USER = os.getenv('SMTP_USER')
+SMTP_PASSWORD = os.getenv('SMTP_PASSWORD')
+SENDER_EMAIL = os.getenv('SENDER_EMAIL')
+SENDER_NAME = os.getenv('SENDER_NAME')
+
+# Outbox sender settings
+BATCH_SIZE = int(os.getenv('OUTBOX_BATCH_SIZE', 50))
+POLL_INTERVAL_S = float(os.getenv('OUTBOX_POLL_INTERVAL_S', 5))
+MAX_ATTEMPTS = int(os.getenv('OUTBOX_MAX_ATTEMPTS', 6))
+BACKOFF_BASE_S = float(os.getenv('OUTBOX_BACKOFF_BASE_S', 30))
+BACKOFF_MAX_S = float(os.getenv('OUTBOX_BACKOFF_MAX_S', 3600))
+# The SMTP connection is closed after this long without anything to send
+SMTP_IDLE_TIMEOUT_S = float(os.getenv('SMTP_IDLE_TIMEOUT_S', 60))
+# A message left in 'sending' this long (sender crashed mid-batch) is picked up again
+CLAIM_TIMEOUT_S = 300
+
+INVITATION_SUBJECT = "Invitation to Attempt Online Coding Interview Test"
+# Note: Adjust URL port if needed (Streamlit default is 8501)
+INVITATION_TEMPLATE = """
+Dear {username},
+
+We are pleased to inform you that you are a potential candidate for our company Doodle.
+We invite you to attempt an online coding interview test.
+
+Use the username '{username}' to login.
+Your password has been set as '{candidate_password}' during assignment.
+
+Please click on the following link to start the test:
+Link: http://localhost:8501
+
+Best regards,
+The Doodle Team
+"""
+
+
+def queue_invitation_email(conn, assignment_id, candidate_username, candidate_email, candidate_password):
+    """
+    Adds the invitation for an assignment to the outbox, inside the caller's
+    transaction: the email is only sent if the assignment is committed.
+    """
+    queue_invitation_emails(conn, [(assignment_id, candidate_username, candidate_email, candidate_password)])
+
+
+def queue_invitation_emails(conn, invitations):
+    """
+    Batch version of queue_invitation_email() for a list of
+    (assignment_id, candidate_username, candidate_email, candidate_password) tuples.
+    """
+    now = time.time()
+    conn.executemany(
+        "INSERT INTO email_outbox (assignment_id, recipient, subject, body, next_attempt_at) VALUES (?, ?, ?, ?, ?)",
+        [
+            (assignment_id, email, INVITATION_SUBJECT,
+             INVITATION_TEMPLATE.format(username=username, candidate_password=password), now)
+            for assignment_id, username, email, password in invitations
+        ]
+    )
+    conn.executemany(
+        "UPDATE assignments SET email_status = 'queued' WHERE id = ?",
+        [(assignment_id,) for assignment_id, _, _, _ in invitations]
+    )
+
+
+def backoff_delay(attempts):
+    """Seconds to wait before retry number `attempts` (exponential, capped)."""
+    return min(BACKOFF_BASE_S * 2 ** (attempts - 1), BACKOFF_MAX_S)
+
+
+class OutboxSender:
+    """
+    Background thread that delivers queued emails over one reused,
+    authenticated SMTP connection, and records each delivery status on the
+    outbox row and its assignment.
+    """
+    def __init__(self):
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self._smtp = None
+        self._last_used = 0.0
+
+    def start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="email-outbox", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout=10):
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        self._disconnect()
+
+    def wake(self):
+        """Asks the sender to look at the outbox now instead of at its next poll."""
+        self._wake.set()
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                sent = self.send_pending()
+            except Exception as e:
+                print(f"Email outbox error: {e}")
+                sent = 0
+            if sent:
+                continue  # a full batch may mean more is waiting
+            if self._smtp is not None and time.monotonic() - self._last_used > SMTP_IDLE_TIMEOUT_S:
+                self._disconnect()
+            self._wake.wait(POLL_INTERVAL_S)
+            self._wake.clear()
+
+    def _claim_batch(self):
+        """Marks up to BATCH_SIZE due messages as 'sending' and returns them."""
+        now = time.time()
+        with get_db_connection() as conn:
+            # One statement, so finding and claiming the rows is atomic: a second
+            # sender (e.g. another uvicorn worker) waits for the write lock and
+            # then no longer sees them as claimable
+            claimed = [dict(row) for row in conn.execute(
+                """
+                UPDATE email_outbox SET status = 'sending', claimed_at = ?
+                WHERE id IN (
+                    SELECT id FROM email_outbox
+                    WHERE (status = 'pending' AND next_attempt_at <= ?)
+                       OR (status = 'sending' AND claimed_at < ?)
+                    ORDER BY next_attempt_at LIMIT ?
+                )
+                RETURNING id, assignment_id, recipient, subject, body, attempts
+                """,
+                (now, now, now - CLAIM_TIMEOUT_S, BATCH_SIZE)
+            ).fetchall()]
+            conn.commit()
+        return claimed
+
+    def send_pending(self):
+        """Sends one batch of due messages. Returns how many were attempted."""
+        batch = self._claim_batch()
+        if not batch:
+            return 0
+        import smtplib
+
+        results = []
+        for message in batch:
+            try:
+                self._send(message)
+                results.append((message, None, False))
+            except smtplib.SMTPRecipientsRefused as e:
+                # Every recipient rejected: the address is bad, retrying won't help
+                results.append((message, f"{type(e).__name__}: {e}", True))
+            except smtplib.SMTPResponseException as e:
+                # 5xx replies (bad address, rejected sender) won't succeed on retry
+                results.append((message, f"{e.smtp_code} {e.smtp_error!r}", e.smtp_code >= 500))
+            except (smtplib.SMTPException, OSError) as e:
+                # The connection is suspect after any other failure; reconnect for the next message
+                self._disconnect()
+                results.append((message, f"{type(e).__name__}: {e}", False))
+        self._record(results)
+        return len(batch)
+
+    def _send(self, message):
+        import smtplib
+        from email.mime.multipart import MIMEMultipart
+        from email.mime.text import MIMEText
+
+        msg = MIMEMultipart()
+        msg['From'] = f'{SENDER_NAME} <{SENDER_EMAIL}>'
+        msg['To'] = message['recipient']
+        msg['Subject'] = message['subject']
+        msg.attach(MIMEText(message['body'], 'plain'))
+
+        for retry in (False, True):
+            smtp = self._connection()
+            try:
+                smtp.send_message(msg)
+                break
+            except smtplib.SMTPServerDisconnected:
+                # The server dropped the idle connection; reconnect once
+                self._disconnect()
+                if retry:
+                    raise
+        self._last_used = time.monotonic()
+        print(f"Email sent to {message['recipient']}")
+
+    def _connection(self):
+        if self._smtp is None:
+            import smtplib
+
+            smtp = smtplib.SMTP(SMTP_HOST, SMTP_PORT, timeout=SMTP_TIMEOUT_S)
+            try:
+                if SMTP_STARTTLS:
+                    smtp.starttls()
+                if SMTP_USER:
+                    smtp.login(SMTP_USER, SMTP_PASSWORD)
+            except Exception:
+                smtp.close()
+                raise
+            self._smtp = smtp
+            self._last_used = time.monotonic()
+        return self._smtp
+
+    def _disconnect(self):
+        if self._smtp is not None:
+            import smtplib
+
+            try:
+                self._smtp.quit()
+            except (smtplib.SMTPException, OSError):
+                self._smtp.close()
+            self._smtp = None
+
+    def _record(self, results):
+        """Stores each message's outcome and mirrors it onto the assignment."""
+        now = time.time()
+        with get_db_connection() as conn:
+            for message, error, permanent in results:
+                attempts = message['attempts'] + 1
+                if error is None:
+                    status = 'sent'
+                    conn.execute(
+                        "UPDATE email_outbox SET status = 'sent', attempts = ?, sent_at = ?, last_error = NULL WHERE id = ?",
+                        (attempts, now, message['id'])
+                    )
+                else:
+                    print(f"Failed to send email to {message['recipient']} (attempt {attempts}): {error}")
+                    status = 'failed' if permanent or attempts >= MAX_ATTEMPTS else 'pending'
+                    conn.execute(
+                        "UPDATE email_outbox SET status = ?, attempts = ?, next_attempt_at = ?, last_error = ? WHERE id = ?",
+                        (status, attempts, now + backoff_delay(attempts), error, message['id'])
+                    )
+                if message['assignment_id'] is not None:
+                    conn.execute(
+                        "UPDATE assignments SET email_status = ? WHERE id = ?",
+                        ('retrying' if status == 'pending' else status, message['assignment_id'])
+                    )
+            conn.commit()
+
+
+email_sender = OutboxSender()
@@ -0,0 +1,95 @@
+import csv
+import io
+import os
+
+from json_rows import dumps
+
+# pyarrow is optional; without it the Arrow format is unavailable
+try:
+    import pyarrow as pa
+except ImportError:
+    pa = None
+
+# Rows read from SQLite and written out per chunk; bounds the memory an export holds
+EXPORT_CHUNK_ROWS = int(os.environ.get('EXPORT_CHUNK_ROWS', 1000))
+
+EXPORT_FORMATS = {
+    'ndjson': ('application/x-ndjson', 'ndjson'),
+    'csv': ('text/csv; charset=utf-8', 'csv'),
+    'arrow': ('application/vnd.apache.arrow.stream', 'arrows'),
+}
+
+
+def iter_chunks(cur):
+    """Yields an executed cursor's rows as lists of tuples, EXPORT_CHUNK_ROWS at a time."""
+    while True:
+        rows = cur.fetchmany(EXPORT_CHUNK_ROWS)
+        if not rows:
+            return
+        yield rows
+
+
+def ndjson_stream(columns, chunks):
+    for rows in chunks:
+        yield b"".join(dumps(dict(zip(columns, row))) + b"\n" for row in rows)
+
+
+def csv_stream(columns, chunks):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    for rows in chunks:
+        writer.writerows(rows)
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode()
+
+
+def arrow_type(declared):
+    """Arrow type for a SQLite declared column type, following SQLite's affinity rules."""
+    declared = (declared or "").upper()
+    if "INT" in declared:
+        return pa.int64()
+    if any(t in declared for t in ("REAL", "FLOA", "DOUB")):
+        return pa.float64()
+    return pa.string()
+
+
+def arrow_stream(columns, declared_types, chunks):
+    """Writes one Arrow IPC record batch per chunk."""
+    schema = pa.schema([(c, arrow_type(declared_types.get(c))) for c in columns])
+    sink = io.BytesIO()
+    with pa.ipc.new_stream(sink, schema) as writer:
+        for rows in chunks:
+            arrays = [pa.array([row[i] for row in rows], type=field.type) for i, field in enumerate(schema)]
+            writer.write_batch(pa.record_batch(arrays, schema=schema))
+            yield sink.getvalue()
+            sink.seek(0)
+            sink.truncate()
+    # End-of-stream marker
+    yield sink.getvalue()
+
+
+def export_rows(connect, sql, params, columns, declared_types, fmt):
+    """
+    Generator streaming the rows of a query in the requested format. The
+    connection comes from connect() on the first read and is closed when the
+    stream ends, fails, or the client goes away; a response that is never
+    sent never opens one.
+    """
+    conn = connect()
+    try:
+        cur = conn.cursor()
+        cur.row_factory = None
+        cur.execute(sql, params)
+        chunks = iter_chunks(cur)
+        if fmt == 'ndjson':
+            yield from ndjson_stream(columns, chunks)
+        elif fmt == 'csv':
+            yield from csv_stream(columns, chunks)
+        else:
+            yield from arrow_stream(columns, declared_types, chunks)
+    finally:
+        conn.close()
@@ -0,0 +1,49 @@
+import json
+import math
+
+from fastapi import Response
+
+# orjson is optional: it serializes rows several times faster and writes
+# NaN/Infinity as null on its own. Without it the standard library is used.
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def fetch_records(conn, sql, params=()):
+    """
+    Runs a query and returns its rows as a list of {column: value} dicts,
+    built straight from the sqlite3 tuples (no DataFrame in between).
+    """
+    cur = conn.cursor()
+    cur.row_factory = None  # plain tuples; the pool's sqlite3.Row isn't needed here
+    cur.execute(sql, params)
+    columns = [d[0] for d in cur.description]
+    return [dict(zip(columns, row)) for row in cur.fetchall()]
+
+
+def _replace_nan(value):
+    if isinstance(value, float):
+        return None if math.isnan(value) or math.isinf(value) else value
+    if isinstance(value, dict):
+        return {k: _replace_nan(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_replace_nan(v) for v in value]
+    return value
+
+
+def dumps(data):
+    """Serializes data to compact JSON bytes, with NaN and Infinity written as null."""
+    if orjson is not None:
+        return orjson.dumps(data)
+    try:
+        return json.dumps(data, separators=(",", ":"), allow_nan=False).encode()
+    except ValueError:
+        # Only pay for the rewrite when a non-finite float is actually present
+        return json.dumps(_replace_nan(data), separators=(",", ":")).encode()
+
+
+def json_response(data, **kwargs):
+    """A JSON Response serialized with dumps() instead of FastAPI's jsonable_encoder."""
+    return Response(content=dumps(data), media_type="application/json", **kwargs)
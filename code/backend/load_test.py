@@ -0,0 +1,164 @@
+import argparse
+import asyncio
+import calendar
+import os
+import time
+
+import httpx
+
+# Deadline-burst scenario: a cohort that started together hits the 30 minute
+# limit at once and every candidate's view auto-submits. Assigns a question to
+# --candidates new candidates, fires all their submissions at the same moment
+# (optionally with --runs editor runs on top), follows every job to the end
+# and reports p50/p99 latencies.
+#
+# Usage (from code/backend, with the backend running):
+#   python load_test.py --candidates 200 [--runs 50] [--url http://127.0.0.1:8000]
+# or against an in-process app (point HUSHHUSH_DB_PATH at a scratch copy, it
+# writes assignments and jobs):
+#   python load_test.py --candidates 200 --in-process
+
+ACCEPTED_SOLUTION = '''
+def solution(nums, target):
+    seen = {}
+    for i, n in enumerate(nums):
+        if target - n in seen:
+            return [seen[target - n], i]
+        seen[n] = i
+'''
+BULK_CHUNK = 500
+
+
+def percentile(values, p):
+    """Nearest-rank percentile of values (p in 0..100)."""
+    if not values:
+        return float("nan")
+    ordered = sorted(values)
+    rank = max(1, -(-len(ordered) * p // 100))
+    return ordered[int(rank) - 1]
+
+
+def report(name, seconds):
+    ms = [s * 1000 for s in seconds]
+    print(f"  {name:<28} n={len(ms):<5} p50 {percentile(ms, 50):9.1f} ms   "
+          f"p99 {percentile(ms, 99):9.1f} ms   max {max(ms, default=float('nan')):9.1f} ms")
+
+
+async def assign_cohort(client, recruiter, usernames, question_id):
+    """Assigns the question to every candidate; returns {username: assignment id}."""
+    assignments = {}
+    for start in range(0, len(usernames), BULK_CHUNK):
+        chunk = usernames[start:start + BULK_CHUNK]
+        response = await client.post("/assign_questions/bulk", json={"recruiter_username": recruiter, "assignments": [
+            {"candidate_username": u, "question_id": question_id, "candidate_password": "load-test",
+             "email": f"{u}@example.com"} for u in chunk
+        ]})
+        response.raise_for_status()
+        for result in response.json()["results"]:
+            if result["status"] == "success":
+                assignments[result["candidate_username"]] = result["assignment_id"]
+    return assignments
+
+
+async def submit_and_follow(client, start, username, assignment_id, question_id, code, poll_interval_s, timeout_s):
+    """One auto-submit: returns (accept latency, completion latency or None, job status)."""
+    await start.wait()
+    sent = time.perf_counter()
+    response = await client.post("/submit_solution", json={
+        "username": username, "question_id": question_id, "assignment_id": assignment_id, "code": code
+    })
+    accepted = time.perf_counter() - sent
+    body = response.json() if response.status_code == 200 else {}
+    if body.get("status") != "queued":
+        return accepted, None, f"rejected ({response.status_code})"
+
+    deadline = sent + timeout_s
+    while time.perf_counter() < deadline:
+        await asyncio.sleep(poll_interval_s)
+        job = (await client.get(f"/submission_jobs/{body['job_id']}")).json()
+        if job["status"] in ("completed", "failed"):
+            return accepted, time.perf_counter() - sent, job["status"]
+    return accepted, None, "timed out"
+
+
+async def editor_run(client, start, question_id, code):
+    """One "Run" click during the burst: returns (latency, HTTP status)."""
+    await start.wait()
+    sent = time.perf_counter()
+    response = await client.post("/run_code", json={"code": code, "question_id": question_id})
+    return time.perf_counter() - sent, response.status_code
+
+
+async def run_scenario(args, client):
+    run_id = time.strftime("%Y%m%d%H%M%S")
+    recruiter = f"loadtest-recruiter-{run_id}"
+    usernames = [f"loadtest-{run_id}-{i}" for i in range(args.candidates)]
+    assignments = await assign_cohort(client, recruiter, usernames, args.question_id)
+    print(f"Assigned question {args.question_id} to {len(assignments)} candidates")
+
+    start = asyncio.Event()
+    submits = [
+        asyncio.create_task(submit_and_follow(client, start, u, assignment_id, args.question_id, ACCEPTED_SOLUTION,
+                                              args.poll_interval, args.timeout))
+        for u, assignment_id in assignments.items()
+    ]
+    # Runs use code that differs per click, so the result cache can't answer them
+    runs = [asyncio.create_task(editor_run(client, start, args.question_id, ACCEPTED_SOLUTION + f"\n# run {i}\n"))
+            for i in range(args.runs)]
+    began = time.perf_counter()
+    start.set()
+    submit_results = await asyncio.gather(*submits)
+    run_results = await asyncio.gather(*runs)
+    elapsed = time.perf_counter() - began
+
+    outcomes = {}
+    for _, _, status in submit_results:
+        outcomes[status] = outcomes.get(status, 0) + 1
+    print(f"\n{len(submits)} simultaneous submissions finished in {elapsed:.1f}s: "
+          + ", ".join(f"{count} {status}" for status, count in sorted(outcomes.items())))
+    report("submit accepted", [accepted for accepted, _, _ in submit_results])
+    report("submission graded", [done for _, done, _ in submit_results if done is not None])
+    if runs:
+        codes = {}
+        for _, status_code in run_results:
+            codes[status_code] = codes.get(status_code, 0) + 1
+        print(f"{len(runs)} editor runs: " + ", ".join(f"{count} x HTTP {code}" for code, count in sorted(codes.items())))
+        report("run answered (200)", [latency for latency, code in run_results if code == 200])
+
+    # Each graded assignment should carry the time it was submitted, not the time it was graded
+    rows = (await client.get(f"/recruiter_assignments/{recruiter}")).json()
+    submitted = [calendar.timegm(time.strptime(r["submitted_at"], "%Y-%m-%d %H:%M:%S"))
+                 for r in rows if r.get("submitted_at")]
+    if submitted:
+        print(f"submitted_at recorded for {len(submitted)} assignments, spread over {max(submitted) - min(submitted):.0f}s")
+
+
+async def main_async(args):
+    limits = httpx.Limits(max_connections=None, max_keepalive_connections=None)
+    timeout = httpx.Timeout(args.timeout)
+    if args.in_process:
+        from main import app, sandbox_pool
+        sandbox_pool.start()
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://load-test", timeout=timeout) as client:
+            await run_scenario(args, client)
+        sandbox_pool.shutdown()
+    else:
+        async with httpx.AsyncClient(base_url=args.url, limits=limits, timeout=timeout) as client:
+            await run_scenario(args, client)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--candidates", type=int, default=100, help="simultaneous auto-submits")
+    parser.add_argument("--runs", type=int, default=0, help="editor runs fired during the burst")
+    parser.add_argument("--question-id", type=int, default=101)
+    parser.add_argument("--url", default=os.environ.get("BACKEND_URL", "http://127.0.0.1:8000"))
+    parser.add_argument("--in-process", action="store_true", help="drive main.app directly instead of --url")
+    parser.add_argument("--poll-interval", type=float, default=0.5)
+    parser.add_argument("--timeout", type=float, default=600, help="seconds before a submission counts as timed out")
+    asyncio.run(main_async(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
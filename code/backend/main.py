@@ -1,16 +1,38 @@
-from fastapi import FastAPI, HTTPException, Depends
-from pydantic import BaseModel
+from fastapi import FastAPI, HTTPException, Depends, Query, Request, Response
+from pydantic import BaseModel, Field
+from typing import Any, Optional
 import sqlite3
 import os
-import pandas as pd
-import smtplib
-from email.mime.multipart import MIMEMultipart
-from email.mime.text import MIMEText
+import json
+import base64
+import asyncio
+import time
 from dotenv import load_dotenv
 
 load_dotenv()
 
+from db_pool import DB_PATH, get_db_connection, pool
+from response_cache import cached_json_response
+from json_rows import fetch_records, json_response
+import export
+from question_bank import list_questions, question_cache, save_question
+from result_cache import result_cache, suite_version
+import submission_jobs
+from submission_jobs import create_job, finish_job, get_job, record_progress, sse_event, start_job, touch_jobs
+from sandbox import sandbox_pool, SandboxBusy, PRIORITY_SUBMISSION, CPU_TIME_LIMIT_S, WALL_TIME_LIMIT_S, MEMORY_LIMIT_MB
+from email_outbox import email_sender, queue_invitation_email, queue_invitation_emails
+from complexity import PROFILE_SIZES, SIZE_TIMEOUT_S, PROFILE_WALL_LIMIT_S, estimate_complexity, input_generator_for
+from starlette.concurrency import run_in_threadpool
+from fastapi.responses import FileResponse, StreamingResponse
+from fastapi.security import HTTPBasic, HTTPBasicCredentials
+import metrics
+from metrics import MetricsMiddleware
+from profiling import ProfilingMiddleware, ProfilingRoute, is_recruiter, list_profiles, profile_path
+
 app = FastAPI()
+# Endpoints can be profiled on demand (see profiling.py); must be set before any route is declared
+app.router.route_class = ProfilingRoute
+app.add_middleware(ProfilingMiddleware)
 
 # Add CORS Middleware
 from fastapi.middleware.cors import CORSMiddleware
@@ -21,75 +43,74 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
-
-# Database Path
-DB_PATH = os.path.join(os.path.dirname(__file__), '../database/database.db')
-
-# Email Configuration
-SMTP_USER = os.getenv('SMTP_USER')
-SMTP_PASSWORD = os.getenv('SMTP_PASSWORD')
-SENDER_EMAIL = os.getenv('SENDER_EMAIL')
-SENDER_NAME = os.getenv('SENDER_NAME')
-
-def send_email_notification(candidate_username, candidate_email, candidate_password):
-    subject = "Invitation to Attempt Online Coding Interview Test"
-    # Note: Adjust URL port if needed (Streamlit default is 8501)
-    email_template = """
-Dear {username},
-
-We are pleased to inform you that you are a potential candidate for our company Doodle.
-We invite you to attempt an online coding interview test.
-
-Use the username '{username}' to login.
-Your password has been set as '{candidate_password}' during assignment.
-
-Please click on the following link to start the test:
-Link: http://localhost:8501
-
-Best regards,
-The Doodle Team
-"""
-    try:
-        msg = MIMEMultipart()
-        msg['From'] = f'{SENDER_NAME} <{SENDER_EMAIL}>'
-        msg['To'] = candidate_email
-        msg['Subject'] = subject
-
-        body = email_template.format(username=candidate_username, candidate_password=candidate_password)
-        msg.attach(MIMEText(body, 'plain'))
-
-        server = smtplib.SMTP('smtp-relay.brevo.com', 587)
-        server.starttls()
-        server.login(SMTP_USER, SMTP_PASSWORD)
-        server.send_message(msg)
-        server.quit()
-        print(f"Email sent to {candidate_email}")
-        return True
-    except Exception as e:
-        print(f"Failed to send email: {e}")
-        return False
-
+# Per-route request metrics, served on /metrics
+app.add_middleware(MetricsMiddleware, router_app=app)
 
 class UserLogin(BaseModel):
     username: str
     password: str
 
-def get_db_connection():
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
-    return conn
+@app.on_event("startup")
+def start_sandbox_pool():
+    # Pre-fork the code execution workers so the first submission doesn't pay for it
+    sandbox_pool.start()
+    # Deliver queued invitation emails in the background
+    email_sender.start()
+
+@app.on_event("startup")
+async def start_job_heartbeat():
+    # Keeps this worker's queued submissions from being taken for lost during a burst
+    app.state.job_heartbeat = asyncio.create_task(keep_submission_jobs_alive())
+
+@app.on_event("shutdown")
+def close_db_pool():
+    if getattr(app.state, "job_heartbeat", None):
+        app.state.job_heartbeat.cancel()
+    email_sender.stop()
+    pool.close_all()
+    sandbox_pool.shutdown()
 
 @app.get("/")
 def read_root():
     return {"message": "HushHushRecruiter Backend is Running"}
 
+@app.get("/metrics")
+def get_metrics():
+    """
+    Request, database and code execution metrics of this worker in the
+    Prometheus text format.
+    """
+    return Response(content=metrics.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+def require_recruiter(credentials: HTTPBasicCredentials = Depends(HTTPBasic())):
+    """Dependency admitting only recruiters (HTTP Basic with their login)."""
+    if not is_recruiter(credentials.username, credentials.password):
+        raise HTTPException(status_code=403, detail="Recruiter credentials required", headers={"WWW-Authenticate": "Basic"})
+    return credentials.username
+
+@app.get("/profiles")
+def get_profiles(recruiter: str = Depends(require_recruiter)):
+    """
+    Lists the stored request profiles, newest first. A recruiter profiles a
+    request by sending it with "X-Profile: 1" (or ?profile=1) and their
+    credentials; the response's X-Profile-Id names the profile.
+    """
+    return list_profiles()
+
+@app.get("/profiles/{profile_id}")
+def download_profile(profile_id: str, recruiter: str = Depends(require_recruiter)):
+    """Downloads a profile's cProfile stats (open with pstats or snakeviz)."""
+    path = profile_path(profile_id)
+    if path is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return FileResponse(path, media_type="application/octet-stream", filename=f"{profile_id}.prof")
+
 @app.post("/login/Candidate")
 def login_Candidate(user: UserLogin):
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute("SELECT * FROM users WHERE username = ? AND password = ? AND role = 'Candidate'", (user.username, user.password))
-    user_record = cursor.fetchone()
-    conn.close()
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT * FROM users WHERE username = ? AND password = ? AND role = 'Candidate'", (user.username, user.password))
+        user_record = cursor.fetchone()
 
     if user_record:
         return {"status": "success", "role": "Candidate", "username": user.username}
@@ -98,11 +119,10 @@ def login_Candidate(user: UserLogin):
 
 @app.post("/login/recruiter")
 def login_recruiter(user: UserLogin):
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute("SELECT * FROM users WHERE username = ? AND password = ? AND role = 'recruiter'", (user.username, user.password))
-    user_record = cursor.fetchone()
-    conn.close()
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT * FROM users WHERE username = ? AND password = ? AND role = 'recruiter'", (user.username, user.password))
+        user_record = cursor.fetchone()
 
     if user_record:
         return {"status": "success", "role": "recruiter", "username": user.username}
@@ -111,35 +131,261 @@ def login_recruiter(user: UserLogin):
 
 # --- Recruiter Features ---
 
+# Mapping friendly names to Database Table names
+PLATFORM_TABLES = {
+    'GitHub': 'Git_hub',
+    'LeetCode': 'Leet_code',
+    'StackOverflow': 'Stack_overflow'
+}
+
+# Columns that can be used as the keyset sort key for each platform
+SORTABLE_COLUMNS = {
+    'GitHub': ['followers', 'total_stars', 'total_forks', 'public_repos', 'following', 'username'],
+    'LeetCode': ['Ranking', 'Reputation', 'All_Solved', 'Hard_Solved', 'Medium_Solved', 'Easy_Solved', 'Username'],
+    'StackOverflow': ['reputation', 'gold', 'silver', 'bronze', 'user_id', 'name']
+}
+
+DEFAULT_SORT = {
+    'GitHub': ('followers', 'desc'),
+    'LeetCode': ('Ranking', 'asc'),
+    'StackOverflow': ('reputation', 'desc')
+}
+
+# Server-side filters: query parameter -> (column, SQL operator) per platform
+CANDIDATE_FILTERS = {
+    'GitHub': {
+        'min_followers': ('followers', '>='),
+        'min_stars': ('total_stars', '>='),
+        'min_repos': ('public_repos', '>='),
+        'location': ('location', 'LIKE'),
+        'language': ('top_languages', 'LIKE')
+    },
+    'LeetCode': {
+        'min_reputation': ('Reputation', '>='),
+        'max_ranking': ('Ranking', '<='),
+        'min_solved': ('All_Solved', '>=')
+    },
+    'StackOverflow': {
+        'min_reputation': ('reputation', '>='),
+        'min_gold': ('gold', '>='),
+        'name': ('name', 'LIKE')
+    }
+}
+
+def encode_cursor(sort, order, last_value, last_rowid):
+    """Encodes the position of the last returned row as an opaque cursor string."""
+    raw = json.dumps({"s": sort, "o": order, "v": last_value, "r": last_rowid})
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+def decode_cursor(cursor, sort, order):
+    """Decodes a cursor and checks it was issued for the same sort column and order."""
+    try:
+        data = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        if data["s"] != sort or data["o"] != order:
+            raise ValueError("cursor was issued for a different sort")
+        return data["v"], int(data["r"])
+    except (ValueError, KeyError, TypeError) as e:
+        raise HTTPException(status_code=400, detail=f"Invalid cursor: {e}")
+
+def keyset_clause(column, order, last_value, last_rowid):
+    """
+    Builds the WHERE clause selecting rows after (last_value, last_rowid).
+    SQLite sorts NULLs first in ascending order and last in descending order,
+    with rowid as the tie-breaker in the same direction as the sort column.
+
+    Returns (clause, params, tail): each clause is a range the column's index
+    can seek to, so rows in the other NULL/non-NULL region that follow are
+    returned separately as the 'tail' clause (None when nothing follows).
+    """
+    if order == 'asc':
+        if last_value is None:
+            return f'("{column}" IS NULL AND rowid > ?)', [last_rowid], f'"{column}" IS NOT NULL'
+        return f'("{column}" >= ? AND ("{column}" > ? OR rowid > ?))', [last_value, last_value, last_rowid], None
+    if last_value is None:
+        return f'("{column}" IS NULL AND rowid < ?)', [last_rowid], None
+    return f'("{column}" <= ? AND ("{column}" < ? OR rowid < ?))', [last_value, last_value, last_rowid], f'"{column}" IS NULL'
+
+def candidate_filter_params(
+    min_followers: Optional[int] = None,
+    min_stars: Optional[int] = None,
+    min_repos: Optional[int] = None,
+    location: Optional[str] = None,
+    language: Optional[str] = None,
+    min_reputation: Optional[int] = None,
+    max_ranking: Optional[int] = None,
+    min_solved: Optional[int] = None,
+    min_gold: Optional[int] = None,
+    name: Optional[str] = None
+):
+    """Query parameters shared by the candidate endpoints; returns the filters that were set."""
+    supplied_filters = {
+        'min_followers': min_followers, 'min_stars': min_stars, 'min_repos': min_repos,
+        'location': location, 'language': language, 'min_reputation': min_reputation,
+        'max_ranking': max_ranking, 'min_solved': min_solved, 'min_gold': min_gold, 'name': name
+    }
+    return {k: v for k, v in supplied_filters.items() if v is not None}
+
+def candidate_where(platform, supplied_filters):
+    """Builds the WHERE conditions and parameters for the supplied filters."""
+    # Make sure the supplied filters apply to this platform
+    allowed_filters = CANDIDATE_FILTERS[platform]
+    where, params = [], []
+    for param, value in supplied_filters.items():
+        if param not in allowed_filters:
+            raise HTTPException(status_code=400, detail=f"Filter '{param}' is not supported for {platform}")
+        column, operator = allowed_filters[param]
+        if operator == 'LIKE':
+            where.append(f'"{column}" LIKE ?')
+            params.append(f"%{value}%")
+        else:
+            where.append(f'"{column}" {operator} ?')
+            params.append(value)
+    return where, params
+
+def select_columns(table_columns, fields):
+    """Column projection, validated against the real table columns."""
+    if not fields:
+        return table_columns
+    columns = [c.strip() for c in fields.split(',') if c.strip()]
+    unknown = [c for c in columns if c not in table_columns]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown columns: {', '.join(unknown)}")
+    return columns
+
 @app.get("/candidates/{platform}")
-def get_candidates(platform: str):
+def get_candidates(
+    request: Request,
+    platform: str,
+    limit: int = Query(50, ge=1, le=500),
+    cursor: Optional[str] = None,
+    sort: Optional[str] = None,
+    order: Optional[str] = Query(None, pattern="^(asc|desc)$"),
+    fields: Optional[str] = Query(None, description="Comma separated list of columns to return"),
+    supplied_filters: dict = Depends(candidate_filter_params)
+):
     """
-    Fetch candidate profiles from the specified platform table.
+    Fetch one page of candidate profiles from the specified platform table.
     Valid platforms: 'GitHub', 'LeetCode', 'StackOverflow'
+
+    Pages are keyset-paginated on (sort column, rowid): pass the returned
+    'next_cursor' back as 'cursor' to get the following page.
     """
-    # Mapping friendly names to Database Table names
-    platform_mapping = {
-        'GitHub': 'Git_hub',
-        'LeetCode': 'Leet_code',
-        'StackOverflow': 'Stack_overflow'
+    if platform not in PLATFORM_TABLES:
+        raise HTTPException(status_code=400, detail="Invalid platform. Use: GitHub, LeetCode, StackOverflow")
+
+    default_sort, default_order = DEFAULT_SORT[platform]
+    sort = sort or default_sort
+    order = order or default_order
+    if sort not in SORTABLE_COLUMNS[platform]:
+        raise HTTPException(status_code=400, detail=f"Invalid sort column. Use one of: {', '.join(SORTABLE_COLUMNS[platform])}")
+
+    cache_key = ("candidates", platform, limit, cursor, sort, order, fields, tuple(sorted(supplied_filters.items())))
+    return cached_json_response(
+        request, cache_key,
+        lambda: query_candidate_page(platform, limit, cursor, sort, order, fields, supplied_filters)
+    )
+
+def query_candidate_page(platform, limit, cursor, sort, order, fields, supplied_filters):
+    """Runs the filtered keyset query for one page of candidates."""
+    db_table_name = PLATFORM_TABLES[platform]
+
+    where, params = candidate_where(platform, supplied_filters)
+
+    try:
+        with get_db_connection() as conn:
+            cur = conn.cursor()
+            table_columns = [row[1] for row in cur.execute(f"PRAGMA table_info({db_table_name})")]
+            columns = select_columns(table_columns, fields)
+
+            filter_sql = f" WHERE {' AND '.join(where)}" if where else ""
+            total = cur.execute(f"SELECT COUNT(*) FROM {db_table_name}{filter_sql}", params).fetchone()[0]
+
+            select_cols = ", ".join(f'"{c}"' for c in columns)
+            direction = "ASC" if order == 'asc' else "DESC"
+
+            def fetch(extra_where, extra_params, count):
+                page_where = where + extra_where
+                page_sql = f" WHERE {' AND '.join(page_where)}" if page_where else ""
+                return cur.execute(
+                    f'SELECT rowid AS __rowid, "{sort}" AS __sort, {select_cols} FROM {db_table_name}'
+                    f'{page_sql} ORDER BY "{sort}" {direction}, rowid {direction} LIMIT ?',
+                    params + extra_params + [count]
+                ).fetchall()
+
+            if cursor:
+                last_value, last_rowid = decode_cursor(cursor, sort, order)
+                clause, clause_params, tail = keyset_clause(sort, order, last_value, last_rowid)
+                rows = fetch([clause], clause_params, limit + 1)
+                # Ran out of rows in this NULL/non-NULL region: continue into the next one
+                if tail and len(rows) <= limit:
+                    rows += fetch([tail], [], limit + 1 - len(rows))
+            else:
+                rows = fetch([], [], limit + 1)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+    # One extra row was fetched to know whether another page exists
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    next_cursor = encode_cursor(sort, order, rows[-1]["__sort"], rows[-1]["__rowid"]) if has_more else None
+
+    return {
+        # Skip the __rowid/__sort helper columns
+        "items": [dict(zip(columns, row[2:])) for row in rows],
+        "next_cursor": next_cursor,
+        "total": total,
+        "sort": sort,
+        "order": order
     }
-    
-    if platform not in platform_mapping:
+
+@app.get("/export/{platform}")
+def export_candidates(
+    platform: str,
+    fmt: str = Query('ndjson', alias="format", pattern="^(ndjson|csv|arrow)$"),
+    fields: Optional[str] = Query(None, description="Comma separated list of columns to return"),
+    supplied_filters: dict = Depends(candidate_filter_params)
+):
+    """
+    Stream every matching candidate of a platform table as NDJSON, CSV or
+    Arrow IPC (format=ndjson|csv|arrow). Rows are read and sent in chunks,
+    so the whole table is never held in memory. Takes the same filters as
+    /candidates/{platform}.
+    """
+    if platform not in PLATFORM_TABLES:
         raise HTTPException(status_code=400, detail="Invalid platform. Use: GitHub, LeetCode, StackOverflow")
+    if fmt == 'arrow' and export.pa is None:
+        raise HTTPException(status_code=501, detail="Arrow export needs pyarrow installed on the server")
 
-    db_table_name = platform_mapping[platform]
+    db_table_name = PLATFORM_TABLES[platform]
+    where, params = candidate_where(platform, supplied_filters)
 
     try:
-        conn = get_db_connection()
-        # Using pandas to easily read SQL and convert to JSON compatible dict
-        df = pd.read_sql(f"SELECT * FROM {db_table_name}", conn)
-        conn.close()
-        return df.to_dict(orient="records")
+        with get_db_connection() as conn:
+            declared_types = {row[1]: row[2] for row in conn.execute(f"PRAGMA table_info({db_table_name})")}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+    columns = select_columns(list(declared_types), fields)
+    filter_sql = f" WHERE {' AND '.join(where)}" if where else ""
+    select_cols = ", ".join(f'"{c}"' for c in columns)
+    # Unfiltered exports stream the table in rowid order; filtered ones are
+    # left unordered so SQLite can read them through a filter column's index
+    order_sql = "" if where else " ORDER BY rowid"
+    sql = f"SELECT {select_cols} FROM {db_table_name}{filter_sql}{order_sql}"
+
+    # The stream is read from threadpool threads after this handler returns, so
+    # it opens its own connection (instead of this thread's pooled one) once
+    # the response starts sending
+    media_type, extension = export.EXPORT_FORMATS[fmt]
+    return StreamingResponse(
+        export.export_rows(pool.dedicated_connection, sql, params, columns, declared_types, fmt),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{platform}.{extension}"'}
+    )
 
 @app.get("/top_candidates/{platform}")
-def get_top_candidates(platform: str):
+def get_top_candidates(request: Request, platform: str):
     """
     Fetch top candidate profiles from the specified platform table.
     Valid platforms: 'GitHub', 'LeetCode', 'StackOverflow'
@@ -156,16 +402,12 @@ def get_top_candidates(platform: str):
 
     db_table_name = platform_mapping[platform]
 
+    def load_shortlist():
+        with get_db_connection() as conn:
+            return fetch_records(conn, f"SELECT * FROM {db_table_name}")
+
     try:
-        conn = get_db_connection()
-        # Using pandas to easily read SQL and convert to JSON compatible dict
-        df = pd.read_sql(f"SELECT * FROM {db_table_name}", conn)
-        conn.close()
-        
-        # Handle NaN values
-        df = df.astype(object).where(pd.notnull(df), None)
-        
-        return df.to_dict(orient="records")
+        return cached_json_response(request, ("top_candidates", platform), load_shortlist)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -184,205 +426,215 @@ def send_questions(payload: QuestionPayload):
     return {"status": "success", "message": f"Question sent to {payload.candidate_username}"}
 
 @app.get("/stats")
-def get_stats():
+def get_stats(request: Request):
     """
     Returns the count of candidates for each platform.
     """
-    stats = {}
-    platforms = {
-        'GitHub': 'Git_hub',
-        'LeetCode': 'Leet_code',
-        'StackOverflow': 'Stack_overflow'
-    }
-    
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    
-    try:
-        for name, table in platforms.items():
-            cursor.execute(f"SELECT COUNT(*) FROM {table}")
-            count = cursor.fetchone()[0]
-            stats[name] = count
-    except Exception as e:
-        print(f"Error fetching stats: {e}")
-    finally:
-        conn.close()
-        
-    return stats
+    def count_candidates():
+        stats = {}
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            try:
+                for name, table in PLATFORM_TABLES.items():
+                    cursor.execute(f"SELECT COUNT(*) FROM {table}")
+                    count = cursor.fetchone()[0]
+                    stats[name] = count
+            except Exception as e:
+                print(f"Error fetching stats: {e}")
+        return stats
 
-    return stats
+    return cached_json_response(request, ("stats",), count_candidates)
 
 # --- Question Assignment Features ---
 
-SAMPLE_QUESTIONS = [
-    {
-        "id": 101, 
-        "title": "Two Sum", 
-        "description": "Given an array of integers nums and an integer target, return indices of the two numbers such that they add up to target.",
-        "examples": [
-            {"input": "nums = [2,7,11,15], target = 9", "output": "[0,1]"},
-            {"input": "nums = [3,2,4], target = 6", "output": "[1,2]"}
-        ],
-        "test_cases": [
-            {"args": [[2,7,11,15], 9], "expected": [0,1]},
-            {"args": [[3,2,4], 6], "expected": [1,2]},
-            {"args": [[3,3], 6], "expected": [0,1]}
-        ]
-    },
-    {
-        "id": 102, 
-        "title": "Reverse Linked List", 
-        "description": "Given the head of a singly linked list, reverse the list, and return the reversed list. (Note: For this mock, input is just a list)",
-        "examples": [
-            {"input": "head = [1,2,3,4,5]", "output": "[5,4,3,2,1]"}
-        ],
-        "test_cases": [
-            {"args": [[1,2,3,4,5]], "expected": [5,4,3,2,1]},
-            {"args": [[1,2]], "expected": [2,1]},
-            {"args": [[]], "expected": []}
-        ]
-    },
-    {
-        "id": 103, 
-        "title": "Valid Parentheses", 
-        "description": "Given a string s containing just the characters '(', ')', '{', '}', '[' and ']', determine if the input string is valid.",
-        "examples": [
-            {"input": "s = '()'", "output": "true"},
-            {"input": "s = '()[]{}'", "output": "true"},
-            {"input": "s = '(]'", "output": "false"}
-        ],
-        "test_cases": [
-            {"args": ["()"], "expected": True},
-            {"args": ["()[]{}"], "expected": True},
-            {"args": ["(]"], "expected": False}
-        ]
-    },
-    {
-        "id": 104, 
-        "title": "Merge Intervals", 
-        "description": "Given an array of intervals where intervals[i] = [start, end], merge all overlapping intervals.",
-        "examples": [
-             {"input": "intervals = [[1,3],[2,6],[8,10],[15,18]]", "output": "[[1,6],[8,10],[15,18]]"}
-        ],
-        "test_cases": [
-             {"args": [[[1,3],[2,6],[8,10],[15,18]]], "expected": [[1,6],[8,10],[15,18]]},
-             {"args": [[[1,4],[4,5]]], "expected": [[1,5]]}
-        ]
-    },
-    {
-        "id": 105, 
-        "title": "Maximum Subarray", 
-        "description": "Given an integer array nums, find the subarray with the largest sum, and return its sum.",
-        "examples": [
-            {"input": "nums = [-2,1,-3,4,-1,2,1,-5,4]", "output": "6"}
-        ],
-        "test_cases": [
-            {"args": [[-2,1,-3,4,-1,2,1,-5,4]], "expected": 6},
-            {"args": [[1]], "expected": 1},
-            {"args": [[5,4,-1,7,8]], "expected": 23}
-        ]
-    }
-]
+class QuestionTestCase(BaseModel):
+    args: list
+    expected: Any
+
+class QuestionDefinition(BaseModel):
+    title: str
+    description: str = ""
+    difficulty: str = Field("Medium", pattern="^(Easy|Medium|Hard)$")
+    tags: list[str] = []
+    examples: list[dict] = []
+    test_cases: list[QuestionTestCase]
 
 @app.get("/questions")
-def get_sample_questions():
-    """Returns the list of sample questions."""
-    return SAMPLE_QUESTIONS
+def get_questions(
+    request: Request,
+    difficulty: Optional[str] = Query(None, pattern="^(Easy|Medium|Hard)$"),
+    tag: Optional[str] = None,
+    after_id: Optional[int] = None,
+    limit: Optional[int] = Query(None, ge=1, le=1000)
+):
+    """
+    Lists the question bank (id, title, difficulty, tags, description), without
+    examples or test cases. Page with limit and after_id (the last id seen).
+    """
+    def load_questions():
+        with get_db_connection() as conn:
+            return list_questions(conn, difficulty, tag, after_id, limit)
+
+    try:
+        return cached_json_response(request, ("questions", difficulty, tag, after_id, limit), load_questions)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/questions/{question_id}")
+def get_question(question_id: int):
+    """Full definition of one question, including its examples and test cases."""
+    question = question_cache.get(question_id)
+    if question is None:
+        raise HTTPException(status_code=404, detail="Question not found")
+    return json_response(question)
+
+@app.put("/questions/{question_id}")
+def put_question(question_id: int, payload: QuestionDefinition, recruiter: str = Depends(require_recruiter)):
+    """Creates or replaces a question (recruiters only); cached copies are invalidated in every worker."""
+    if not payload.test_cases:
+        raise HTTPException(status_code=400, detail="A question needs at least one test case")
+    question = payload.model_dump()
+    question["id"] = question_id
+    try:
+        save_question(question)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    return {"status": "success", "id": question_id}
 
 class RunCodePayload(BaseModel):
     code: str
     question_id: int
 
-def execute_code(code: str, question_id: int):
+def format_execution_result(result, test_cases):
+    """
+    Turns a sandbox result into the dict the UI expects:
+    status ('success'/'error'), output text, score and total test cases.
+    """
+    status = result["status"]
+    total = len(test_cases)
+    passed = result.get("passed", 0)
+    metrics = summarize_metrics(result)
+
+    if status == "accepted":
+        output = (
+            f"Accepted\nAll {total} test cases passed!\n"
+            f"Runtime: {metrics['runtime_ms']:.3f}ms (CPU {metrics['cpu_time_ms']:.3f}ms)\n"
+            f"Memory: {(metrics['peak_memory_kb'] or 0) / 1024:.3f}MB peak"
+        )
+        response = {"status": "success", "output": output, "score": passed, "total": total}
+    elif status == "wrong_answer":
+        case = test_cases[result["case"]]
+        output = f"Wrong Answer on Test Case {result['case']+1}\nInput: {case['args']}\nOutput: {result['got']}\nExpected: {case['expected']}"
+        response = {"status": "error", "output": output, "score": passed, "total": total}
+    elif status == "runtime_error":
+        response = {"status": "error", "output": f"Runtime Error on Test Case {result['case']+1}:\n{result['message']}", "score": passed, "total": total}
+    elif status == "no_solution":
+        response = {"status": "error", "output": "Function 'solution' not found. Please define 'def solution(...):'.", "score": 0, "total": total}
+    elif status == "time_limit":
+        limit = f"{CPU_TIME_LIMIT_S:g}s CPU time" if result.get("limit") == "cpu" else f"{WALL_TIME_LIMIT_S:g}s wall-clock time"
+        response = {"status": "error", "output": f"Time Limit Exceeded: your solution used more than {limit}.", "score": passed, "total": total}
+    elif status == "memory_limit":
+        response = {"status": "error", "output": f"Memory Limit Exceeded: your solution used more than {MEMORY_LIMIT_MB}MB.", "score": passed, "total": total}
+    elif status == "syntax_error":
+        response = {"status": "error", "output": f"Syntax Error: {result['message']}", "score": 0, "total": 0}
+    else:
+        response = {"status": "error", "output": f"Execution Error: {result.get('message', status)}", "score": 0, "total": 0}
+
+    # Per test case measurements, for every case that actually ran
+    if result.get("metrics"):
+        response["output"] += "\n\nPer Test Case:\n" + "\n".join(
+            f"Test Case {m['case']+1}: Runtime: {m['wall_ms']:.3f}ms | CPU: {m['cpu_ms']:.3f}ms"
+            + (f" | Memory: {m['peak_kb']:.1f}KB" if m['peak_kb'] is not None else "")
+            for m in result["metrics"]
+        )
+    response["metrics"] = metrics
+
+    # Anything the candidate printed, captured in their own worker process
+    if result.get("stdout"):
+        response["output"] += f"\n\nStdout:\n{result['stdout']}"
+    return response
+
+def summarize_metrics(result):
+    """Totals the per test case wall time, CPU time and peak memory measured in the sandbox."""
+    cases = result.get("metrics", [])
+    return {
+        "runtime_ms": sum(m["wall_ms"] for m in cases) if cases else None,
+        "cpu_time_ms": sum(m["cpu_ms"] for m in cases) if cases else None,
+        "peak_memory_kb": max((m["peak_kb"] for m in cases if m["peak_kb"] is not None), default=None),
+        "max_rss_kb": result.get("max_rss_kb"),
+        "test_cases": cases
+    }
+
+async def execute_code(code: str, question_id: int, use_cache: bool = False, on_progress=None, **admission):
     """
     Helper function to execute code against test cases.
+    The code runs in a sandbox worker process with CPU, wall-clock and memory limits.
+    With use_cache, an identical earlier run against the same test suite is
+    reused instead of running the code again. on_progress and the admission
+    priority / submitted_at are passed on to the sandbox (see sandbox.py).
     Returns a dict with status, output, score, total_test_cases.
     """
-    import sys
-    import io
-    import traceback
-
     # 1. Find the question
-    question = next((q for q in SAMPLE_QUESTIONS if q["id"] == question_id), None)
+    question = await run_in_threadpool(question_cache.get, question_id)
     if not question:
         return {"status": "error", "output": "Question not found.", "score": 0, "total": 0}
-    
-    # 2. Prepare execution environment
-    local_scope = {}
-    
-    # Capture stdout
-    captured_stdout = io.StringIO()
-    # We save the original stdout to restore it later, just in case
-    original_stdout = sys.stdout
-    sys.stdout = captured_stdout
-
-    try:
-        # 3. Execute the user's code definition
-        exec(code, {}, local_scope)
-        
-        if "solution" not in local_scope:
-             return {"status": "error", "output": "Function 'solution' not found. Please define 'def solution(...):'.", "score": 0, "total": len(question.get("test_cases", []))}
-        
-        user_func = local_scope["solution"]
-        
-        # 4. Run against test cases
-        test_cases = question.get("test_cases", [])
-        total_cases = len(test_cases)
-        passed_count = 0
-        results = []
-        all_passed = True
-        
-        for i, case in enumerate(test_cases):
-            args = case["args"]
-            expected = case["expected"]
-            
-            try:
-                # Call function
-                result = user_func(*args)
-                
-                # Check correctness
-                if result == expected:
-                    results.append(f"Test Case {i+1}: Passed")
-                    passed_count += 1
-                else:
-                    all_passed = False
-                    results.append(f"Test Case {i+1}: Failed\n   Input: {args}\n   Expected: {expected}\n   Got: {result}")
-                    # Construct detailed error for the first failure
-                    return {
-                        "status": "error", 
-                        "output": f"Wrong Answer on Test Case {i+1}\nInput: {args}\nOutput: {result}\nExpected: {expected}",
-                        "score": passed_count,
-                        "total": total_cases
-                    }
-                    
-            except Exception as e:
-                return {
-                    "status": "error", 
-                    "output": f"Runtime Error on Test Case {i+1}:\n{str(e)}",
-                    "score": passed_count,
-                    "total": total_cases
-                }
-
-        # If we get here, all passed
-        runtime_ms = 35 # Mock runtime for now
-        memory_mb = 14.2 # Mock memory
-        
-        success_msg = f"Accepted\nAll {len(test_cases)} test cases passed!\nRuntime: {runtime_ms}ms\nMemory: {memory_mb}MB"
-        return {"status": "success", "output": success_msg, "score": passed_count, "total": total_cases}
 
-    except SyntaxError as e:
-        return {"status": "error", "output": f"Syntax Error: {e.msg} at line {e.lineno}", "score": 0, "total": 0}
-    except Exception as e:
-        return {"status": "error", "output": f"Execution Error: {str(e)}", "score": 0, "total": 0}
-    finally:
-        sys.stdout = original_stdout # Restore stdout
+    # 2. Run it in the sandbox pool, unless this exact code already ran against these tests
+    test_cases = question.get("test_cases", [])
+    version = suite_version(test_cases)
+    result = result_cache.get(code, question_id, version) if use_cache else None
+    if result is not None:
+        response = format_execution_result(result, test_cases)
+        response["cached"] = True
+        return response
+    result = await sandbox_pool.execute_async(code, test_cases, on_progress=on_progress, **admission)
+    if use_cache:
+        result_cache.put(code, question_id, version, result)
+    return format_execution_result(result, test_cases)
+
+async def profile_complexity(code: str, question: dict, submitted_at: float = None):
+    """
+    Runs an accepted solution on generated inputs of growing size and fits the
+    runtime curve to estimate its complexity class. Returns None when the
+    question has no input generator matching its current definition.
+    """
+    generator = input_generator_for(question)
+    if generator is None:
+        return None
+    result = await sandbox_pool.profile_async(code, generator, PROFILE_SIZES, SIZE_TIMEOUT_S, PROFILE_WALL_LIMIT_S,
+                                              submitted_at=submitted_at)
+    # A job killed by the overall limits still counts as a timeout at the size it was on
+    timings = result.get("timings", [])
+    if result.get("status") in ("time_limit", "memory_limit", "crashed"):
+        done = {t["n"] for t in timings}
+        pending = next((n for n in PROFILE_SIZES if n not in done), None)
+        if pending is not None:
+            timings.append({"n": pending, "timed_out": True})
+    return estimate_complexity(timings)
+
+def format_complexity(estimate):
+    """One-line summary of a complexity estimate for the execution log."""
+    if estimate["class"] == "unknown":
+        line = "Complexity: unknown (too few input sizes completed)"
+    else:
+        sizes = [p["n"] for p in estimate["points"] if "ms" in p]
+        line = f"Complexity: {estimate['class']} (log-log slope {estimate['exponent']}, n = {sizes[0]}..{sizes[-1]})"
+    if estimate["timed_out_at"]:
+        line += f" | timed out at n = {estimate['timed_out_at']}"
+    return line
 
 @app.post("/run_code")
-def run_code(payload: RunCodePayload):
+async def run_code(payload: RunCodePayload):
     """
     Executes user code against test cases.
     """
-    result = execute_code(payload.code, payload.question_id)
+    # Candidates re-run unchanged code a lot; submissions below are always graded afresh
+    try:
+        result = await execute_code(payload.code, payload.question_id, use_cache=True)
+    except SandboxBusy:
+        # Submissions go first during a burst; runs are turned away rather than queued indefinitely
+        raise HTTPException(status_code=503, detail="Code execution is busy, please run again in a moment.",
+                            headers={"Retry-After": "5"})
     # The endpoint expects just status and output for now, but we can return more if needed
     return result
 
@@ -399,72 +651,145 @@ class AssignmentPayload(BaseModel):
 
 @app.post("/assign_question")
 def assign_question(payload: AssignmentPayload):
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    try:
-        # 1. Save Assignment
-        cursor.execute(
-            "INSERT INTO assignments (recruiter_id, candidate_username, question_id, question_title) VALUES (?, ?, ?, ?)",
-            (payload.recruiter_username, payload.candidate_username, payload.question_id, payload.question_title)
-        )
-        
-        # 2. Create User (Mandatory now)
-        user_created_msg = ""
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
         try:
+            # 1. Save Assignment
             cursor.execute(
-                "INSERT INTO users (username, password, role) VALUES (?, ?, ?)",
-                (payload.candidate_username, payload.candidate_password, 'Candidate')
-            )
-            user_created_msg = " and user account created"
-        except sqlite3.IntegrityError:
-            # Update password if user exists? Or just ignore. Use new password for login.
-             cursor.execute(
-                "UPDATE users SET password = ? WHERE username = ?",
-                (payload.candidate_password, payload.candidate_username)
+                "INSERT INTO assignments (recruiter_id, candidate_username, question_id, question_title) VALUES (?, ?, ?, ?)",
+                (payload.recruiter_username, payload.candidate_username, payload.question_id, payload.question_title)
             )
-             user_created_msg = " (user account updated)"
+            assignment_id = cursor.lastrowid
+        
+            # 2. Create User (Mandatory now)
+            user_created_msg = ""
+            try:
+                cursor.execute(
+                    "INSERT INTO users (username, password, role) VALUES (?, ?, ?)",
+                    (payload.candidate_username, payload.candidate_password, 'Candidate')
+                )
+                user_created_msg = " and user account created"
+            except sqlite3.IntegrityError:
+                # Update password if user exists? Or just ignore. Use new password for login.
+                 cursor.execute(
+                    "UPDATE users SET password = ? WHERE username = ?",
+                    (payload.candidate_password, payload.candidate_username)
+                )
+                 user_created_msg = " (user account updated)"
+
+            # 3. Queue Email (sent by the background outbox sender once committed)
+            queue_invitation_email(conn, assignment_id, payload.candidate_username, payload.email, payload.candidate_password)
+
+            conn.commit()
+            email_sender.wake()
+            return {"status": "success", "message": f"Assigned '{payload.question_title}' to {payload.candidate_username}{user_created_msg} | Email queued"}
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=str(e))
+
+# Largest number of assignments accepted by one /assign_questions/bulk call
+MAX_BULK_ASSIGNMENTS = 500
+
+class BulkAssignmentItem(BaseModel):
+    candidate_username: str
+    question_id: int
+    candidate_password: str
+    email: str
+
+class BulkAssignmentPayload(BaseModel):
+    recruiter_username: str
+    assignments: list[BulkAssignmentItem]
 
-        # 3. Send Email
-        email_sent = send_email_notification(payload.candidate_username, payload.email, payload.candidate_password)
-        email_msg = " | Email sent" if email_sent else " | Email failed"
+@app.post("/assign_questions/bulk")
+def assign_questions_bulk(payload: BulkAssignmentPayload):
+    """
+    Assigns questions to many candidates at once.
+    All valid rows are written in one transaction and their emails queued in
+    one batch; the response has a result for every row, in request order.
+    """
+    if len(payload.assignments) > MAX_BULK_ASSIGNMENTS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_BULK_ASSIGNMENTS} assignments per request")
+
+    titles = {}
+    for question_id in {item.question_id for item in payload.assignments}:
+        question = question_cache.get(question_id)
+        if question is not None:
+            titles[question_id] = question["title"]
+    results = [None] * len(payload.assignments)
+    valid = []
+    first_row = {}
+    for i, item in enumerate(payload.assignments):
+        if item.question_id not in titles:
+            results[i] = {"status": "error", "message": f"Unknown question {item.question_id}"}
+        elif not item.candidate_username or not item.email or not item.candidate_password:
+            results[i] = {"status": "error", "message": "Candidate, email and password are required"}
+        elif item.candidate_username in first_row:
+            # One account per candidate: a second row would overwrite the password sent in the first invitation
+            results[i] = {"status": "error",
+                          "message": f"Duplicate candidate {item.candidate_username} (already in row {first_row[item.candidate_username] + 1})"}
+        else:
+            first_row[item.candidate_username] = i
+            valid.append((i, item))
+    if not valid:
+        return {"created": 0, "results": results}
+
+    with get_db_connection() as conn:
+        try:
+            ids = [
+                conn.execute(
+                    "INSERT INTO assignments (recruiter_id, candidate_username, question_id, question_title) VALUES (?, ?, ?, ?)",
+                    (payload.recruiter_username, item.candidate_username, item.question_id, titles[item.question_id])
+                ).lastrowid
+                for _, item in valid
+            ]
+
+            # Create candidate accounts, or update the password of existing ones (as /assign_question does)
+            usernames = sorted(first_row)
+            placeholders = ",".join("?" * len(usernames))
+            existing = {r[0] for r in conn.execute(f"SELECT username FROM users WHERE username IN ({placeholders})", usernames)}
+            conn.executemany(
+                "INSERT INTO users (username, password, role) VALUES (?, ?, 'Candidate') "
+                "ON CONFLICT(username) DO UPDATE SET password = excluded.password",
+                [(item.candidate_username, item.candidate_password) for _, item in valid]
+            )
 
-        conn.commit()
-        return {"status": "success", "message": f"Assigned '{payload.question_title}' to {payload.candidate_username}{user_created_msg}{email_msg}"}
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
-    finally:
-        conn.close()
+            queue_invitation_emails(conn, [
+                (assignment_id, item.candidate_username, item.email, item.candidate_password)
+                for assignment_id, (_, item) in zip(ids, valid)
+            ])
+            conn.commit()
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=str(e))
+
+    email_sender.wake()
+    for assignment_id, (i, item) in zip(ids, valid):
+        results[i] = {
+            "status": "success",
+            "assignment_id": assignment_id,
+            "candidate_username": item.candidate_username,
+            "account": "updated" if item.candidate_username in existing else "created",
+            "email_status": "queued"
+        }
+    return {"created": len(valid), "results": results}
 
 @app.get("/recruiter_assignments/{username}")
 def get_recruiter_assignments(username: str):
-    conn = get_db_connection()
-    try:
-        # Fetch all columns including submitted_code, outcome, score, etc.
-        df = pd.read_sql("SELECT * FROM assignments WHERE recruiter_id = ?", conn, params=(username,))
-        # Handle NaN values which are not JSON compliant
-        df = df.astype(object).where(pd.notnull(df), None)
-        return df.to_dict(orient="records")
-    except Exception as e:
-        print(f"DEBUG ERROR: {e}")
-        import traceback
-        traceback.print_exc()
-        raise HTTPException(status_code=500, detail=str(e))
-    finally:
-        conn.close()
+    with get_db_connection() as conn:
+        try:
+            # Fetch all columns including submitted_code, outcome, score, etc.
+            return json_response(fetch_records(conn, "SELECT * FROM assignments WHERE recruiter_id = ?", (username,)))
+        except Exception as e:
+            print(f"DEBUG ERROR: {e}")
+            import traceback
+            traceback.print_exc()
+            raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/my_assignments/{username}")
 def get_my_assignments(username: str):
-    conn = get_db_connection()
-    try:
-        # Using pandas to easily get dict list
-        df = pd.read_sql("SELECT * FROM assignments WHERE candidate_username = ?", conn, params=(username,))
-        # Handle NaN values which are not JSON compliant
-        df = df.astype(object).where(pd.notnull(df), None)
-        return df.to_dict(orient="records")
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
-    finally:
-        conn.close()
+    with get_db_connection() as conn:
+        try:
+            return json_response(fetch_records(conn, "SELECT * FROM assignments WHERE candidate_username = ?", (username,)))
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=str(e))
 
 class SubmissionPayload(BaseModel):
     username: str
@@ -472,36 +797,43 @@ class SubmissionPayload(BaseModel):
     assignment_id: int
     code: str
 
-@app.post("/submit_solution")
-def submit_solution_endpoint(payload: SubmissionPayload):
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    try:
+def check_submission_allowed(payload: SubmissionPayload):
+    """Returns an error message if the assignment cannot be submitted, otherwise None."""
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
         # Check if already completed using assignment_id
         cursor.execute(
             "SELECT status, candidate_username FROM assignments WHERE id = ?",
             (payload.assignment_id,)
         )
         row = cursor.fetchone()
-        
-        if not row:
-             return {"status": "error", "message": "Assignment not found"}
-        
-        # Verify ownership
-        if row['candidate_username'] != payload.username:
-             return {"status": "error", "message": "Unauthorized: buffer mismatch"}
-             
-        if row['status'] == 'Completed':
-             return {"status": "error", "message": "Assignment already submitted. You cannot resubmit."}
-
-        # Execute code to get results
-        exec_result = execute_code(payload.code, payload.question_id)
-        
-        outcome = "Passed" if exec_result["status"] == "success" else "Failed"
-        if exec_result["status"] == "error" and "Runtime Error" in exec_result["output"]:
-            outcome = "Error"
-            
+
+    if not row:
+        return "Assignment not found"
+
+    # Verify ownership
+    if row['candidate_username'] != payload.username:
+        return "Unauthorized: buffer mismatch"
+
+    if row['status'] == 'Completed':
+        return "Assignment already submitted. You cannot resubmit."
+    return None
+
+def store_submission_result(payload: SubmissionPayload, exec_result, submitted_at: float):
+    """
+    Marks the assignment as completed with its results and the time it was
+    submitted (not graded) at. Returns False if it was already completed.
+    """
+    outcome = "Passed" if exec_result["status"] == "success" else "Failed"
+    if exec_result["status"] == "error" and "Runtime Error" in exec_result["output"]:
+        outcome = "Error"
+
+    metrics = exec_result.get("metrics") or {}
+    complexity = exec_result.get("complexity")
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
         # Update status to 'Completed' and store results
+        # (the status guard stops two concurrent submissions from both being recorded)
         cursor.execute(
             """
             UPDATE assignments 
@@ -510,8 +842,15 @@ def submit_solution_endpoint(payload: SubmissionPayload):
                 outcome = ?,
                 score = ?,
                 total_test_cases = ?,
-                execution_log = ?
-            WHERE id = ?
+                execution_log = ?,
+                runtime_ms = ?,
+                cpu_time_ms = ?,
+                peak_memory_kb = ?,
+                test_case_metrics = ?,
+                complexity = ?,
+                complexity_profile = ?,
+                submitted_at = ?
+            WHERE id = ? AND status != 'Completed'
             """,
             (
                 payload.code, 
@@ -519,20 +858,142 @@ def submit_solution_endpoint(payload: SubmissionPayload):
                 exec_result.get("score", 0), 
                 exec_result.get("total", 0), 
                 exec_result.get("output", ""),
+                metrics.get("runtime_ms"),
+                metrics.get("cpu_time_ms"),
+                metrics.get("peak_memory_kb"),
+                json.dumps(metrics.get("test_cases", [])),
+                complexity["class"] if complexity else None,
+                json.dumps(complexity) if complexity else None,
+                time.strftime("%Y-%m-%d %H:%M:%S", time.gmtime(submitted_at)),
                 payload.assignment_id
             )
         )
         conn.commit()
-        
+        return cursor.rowcount == 1
+
+# Submission jobs queued or running in this worker, by job id
+submission_tasks = {}
+
+async def keep_submission_jobs_alive():
+    while True:
+        await asyncio.sleep(submission_jobs.JOB_STALE_S / 3)
+        if submission_tasks:
+            await run_in_threadpool(touch_jobs, list(submission_tasks))
+
+async def run_submission_job(job_id: str, payload: SubmissionPayload, submitted_at: float):
+    """
+    Runs a queued submission: executes it, reporting each test case to the
+    job as it completes, times accepted solutions on large inputs and records
+    the result on the assignment. The sandbox serves submissions ahead of
+    editor runs and in submit-time order.
+    """
+    try:
+        question = await run_in_threadpool(question_cache.get, payload.question_id)
+        await run_in_threadpool(start_job, job_id, len(question["test_cases"]) if question else 0)
+
+        exec_result = await execute_code(payload.code, payload.question_id,
+                                         on_progress=lambda event: record_progress(job_id, event),
+                                         priority=PRIORITY_SUBMISSION, submitted_at=submitted_at)
+
+        # Accepted solutions are also timed on large generated inputs
+        if exec_result["status"] == "success" and question is not None:
+            estimate = await profile_complexity(payload.code, question, submitted_at)
+            if estimate is not None:
+                exec_result["complexity"] = estimate
+                exec_result["output"] += "\n\n" + format_complexity(estimate)
+
+        if not await run_in_threadpool(store_submission_result, payload, exec_result, submitted_at):
+            await run_in_threadpool(finish_job, job_id, None, "Assignment already submitted. You cannot resubmit.")
+            return
+        await run_in_threadpool(finish_job, job_id, exec_result)
+    except Exception as e:
+        print(f"Submission job {job_id} failed: {e}")
+        await run_in_threadpool(finish_job, job_id, None, str(e))
+
+@app.post("/submit_solution")
+async def submit_solution_endpoint(payload: SubmissionPayload):
+    """
+    Queues the submission and returns its job id at once. Follow the job on
+    /submission_jobs/{job_id} (polling) or /submission_jobs/{job_id}/events
+    (server-sent events); the assignment is updated when it finishes, with
+    the time the submission arrived here as its submitted_at.
+    """
+    submitted_at = time.time()
+    try:
+        error = await run_in_threadpool(check_submission_allowed, payload)
+        if error:
+            return {"status": "error", "message": error}
+
+        job_id, created = await run_in_threadpool(
+            create_job, payload.assignment_id, payload.username, payload.question_id, payload.code, submitted_at)
+        if created:
+            task = asyncio.create_task(run_submission_job(job_id, payload, submitted_at))
+            submission_tasks[job_id] = task
+            task.add_done_callback(lambda _: submission_tasks.pop(job_id, None))
+
         return {
-            "status": "success", 
-            "message": "Solution submitted", 
-            "execution_result": exec_result
+            "status": "queued",
+            "message": "Solution submitted",
+            "job_id": job_id,
+            "status_url": f"/submission_jobs/{job_id}",
+            "events_url": f"/submission_jobs/{job_id}/events"
         }
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
-    finally:
-        conn.close()
+
+@app.get("/submission_jobs/{job_id}")
+def get_submission_job(job_id: str):
+    """
+    Status of a submission job: queued, running, completed or failed, with
+    the outcome of every test case run so far and, once completed, the
+    execution result.
+    """
+    job = get_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+async def job_events(job_id: str, sent: int):
+    """
+    Server-sent events for a job: "status" when it starts running, one
+    "progress" per test case (its id is the case count, so a reconnecting
+    client resumes through Last-Event-ID), then "result" or "failed"
+    ("failed" also if the job disappears meanwhile).
+    """
+    status = None
+    last_write = time.monotonic()
+    while True:
+        job = await run_in_threadpool(get_job, job_id)
+        if job is None:
+            # Gone since the stream started (e.g. the database was reset)
+            yield sse_event("failed", {"result": None, "error": "The submission job no longer exists. Please submit again."})
+            return
+        if job["status"] != status and job["status"] not in submission_jobs.FINISHED:
+            yield sse_event("status", {"status": job["status"], "total": job["total"]})
+            last_write = time.monotonic()
+        status = job["status"]
+        for event in job["progress"][sent:]:
+            sent += 1
+            yield sse_event("progress", dict(event, total=job["total"]), event_id=sent)
+            last_write = time.monotonic()
+        if status in submission_jobs.FINISHED:
+            yield sse_event("result" if status == "completed" else "failed",
+                            {"result": job["result"], "error": job["error"]})
+            return
+        if time.monotonic() - last_write > submission_jobs.JOB_HEARTBEAT_S:
+            yield b": keep-alive\n\n"
+            last_write = time.monotonic()
+        await asyncio.sleep(submission_jobs.JOB_POLL_INTERVAL_S)
+
+@app.get("/submission_jobs/{job_id}/events")
+async def stream_submission_job(job_id: str, request: Request):
+    """Streams a submission job's progress as server-sent events (see job_events)."""
+    if await run_in_threadpool(get_job, job_id) is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    last_event_id = request.headers.get("last-event-id", "")
+    sent = int(last_event_id) if last_event_id.isdigit() else 0
+    return StreamingResponse(job_events(job_id, sent), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
 
 if __name__ == "__main__":
     import uvicorn
@@ -0,0 +1,177 @@
+import bisect
+import contextvars
+import threading
+import time
+
+from starlette.routing import Match
+
+# In-process metrics in the Prometheus text format, served on /metrics.
+# Every uvicorn worker keeps its own numbers; scrape each worker (or run one)
+# to see them all.
+
+# Route template of the request being handled, e.g. "/candidates/{platform}".
+# Work done outside a request (outbox sender, pool threads) is "background".
+current_route = contextvars.ContextVar('current_route', default='background')
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+DB_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.5)
+EXECUTION_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(names, values, extra=()):
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)] + [f'{n}="{v}"' for n, v in extra]
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value):
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+class Metric:
+    """A named family of samples, one per combination of label values."""
+    kind = None
+
+    def __init__(self, name, help_text, labels=()):
+        self.name = name
+        self.help_text = help_text
+        self.labels = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+        registry.append(self)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            samples = sorted(self._values.items())
+        for label_values, value in samples:
+            lines.extend(self._render_sample(label_values, value))
+        return lines
+
+    def _render_sample(self, label_values, value):
+        return [f"{self.name}{_format_labels(self.labels, label_values)} {_format_value(value)}"]
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def inc(self, *label_values, amount=1):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+
+class Gauge(Metric):
+    kind = "gauge"
+
+    def inc(self, *label_values, amount=1):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def dec(self, *label_values, amount=1):
+        self.inc(*label_values, amount=-amount)
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name, help_text, labels=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, help_text, labels)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, *label_values):
+        with self._lock:
+            state = self._values.get(label_values)
+            if state is None:
+                # One count per bucket (the last is +Inf), then the sum
+                state = self._values[label_values] = [0] * (len(self.buckets) + 1) + [0.0]
+            state[bisect.bisect_left(self.buckets, value)] += 1
+            state[-1] += value
+
+    def _render_sample(self, label_values, state):
+        lines, cumulative = [], 0
+        for bound, count in zip(self.buckets + ("+Inf",), state[:-1]):
+            cumulative += count
+            labels = _format_labels(self.labels, label_values, [("le", bound)])
+            lines.append(f"{self.name}_bucket{labels} {cumulative}")
+        labels = _format_labels(self.labels, label_values)
+        lines.append(f"{self.name}_sum{labels} {_format_value(state[-1])}")
+        lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+registry = []
+
+REQUESTS = Counter("http_requests_total", "HTTP requests by route and status code.", ("method", "route", "status"))
+ERRORS = Counter("http_request_errors_total", "HTTP requests that failed with a 5xx status or an exception.", ("method", "route"))
+IN_FLIGHT = Gauge("http_requests_in_flight", "HTTP requests currently being handled.", ("method", "route"))
+LATENCY = Histogram("http_request_duration_seconds", "Time to handle an HTTP request, including streaming the body.", ("method", "route"))
+DB_QUERY = Histogram("db_query_duration_seconds", "Time spent in one SQLite execute or fetch call.", ("route",), DB_BUCKETS)
+CODE_EXECUTION = Histogram("code_execution_duration_seconds", "Time a sandbox worker took to run a job.", ("kind", "status"), EXECUTION_BUCKETS)
+SANDBOX_WAIT = Histogram("sandbox_queue_wait_seconds", "Time a job waited for an idle sandbox worker.", ("kind",), EXECUTION_BUCKETS)
+ADMISSION_WAIT = Histogram("sandbox_admission_wait_seconds", "Time a job waited in the sandbox admission queue, by priority.", ("priority",), EXECUTION_BUCKETS)
+ADMISSION_WAITING = Gauge("sandbox_admission_waiting", "Jobs currently waiting in the sandbox admission queue.")
+ADMISSION_REJECTED = Counter("sandbox_admission_rejected_total", "Runs turned away because the sandbox admission queue was full.")
+CACHE_LOOKUPS = Counter("response_cache_lookups_total", "Response cache lookups by result (hit or miss).", ("result",))
+EXECUTION_CACHE_LOOKUPS = Counter("execution_cache_lookups_total", "Code run result cache lookups by result (hit or miss).", ("result",))
+
+
+def observe_db_query(seconds):
+    DB_QUERY.observe(seconds, current_route.get())
+
+
+def render():
+    """The text exposition of every metric."""
+    lines = []
+    for metric in registry:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+def route_template(app, scope):
+    """The path template of the route that will handle scope ("unmatched" for 404s)."""
+    for route in app.router.routes:
+        match, _ = route.matches(scope)
+        if match == Match.FULL:
+            return route.path
+    return "unmatched"
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording request counts, errors, in-flight requests and latency per route."""
+    def __init__(self, app, router_app):
+        self.app = app
+        # The FastAPI app whose routes are matched (self.app may be another middleware)
+        self.router_app = router_app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        route = route_template(self.router_app, scope)
+        token = current_route.set(route)
+        status = [500]
+
+        async def send_with_status(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+            await send(message)
+
+        IN_FLIGHT.inc(method, route)
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        except BaseException:
+            status[0] = 500
+            raise
+        finally:
+            LATENCY.observe(time.perf_counter() - start, method, route)
+            IN_FLIGHT.dec(method, route)
+            REQUESTS.inc(method, route, str(status[0]))
+            if status[0] >= 500:
+                ERRORS.inc(method, route)
+            current_route.reset(token)
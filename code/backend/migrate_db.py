@@ -1,8 +1,12 @@
 import sqlite3
 import os
 
-# Path to the database
-DB_PATH = os.path.join(os.path.dirname(__file__), '../database/database.db')
+# Path to the database (shared with the API, honours HUSHHUSH_DB_PATH)
+from db_pool import DB_PATH
+from setup_db import EMAIL_OUTBOX_SCHEMA
+from schema import OPERATIONAL_INDEXES, create_indexes
+from question_bank import seed_questions
+from submission_jobs import SUBMISSION_JOBS_SCHEMA
 
 def migrate_assignments_table():
     print(f"Connecting to database at {DB_PATH}")
@@ -14,7 +18,15 @@ def migrate_assignments_table():
         ("outcome", "TEXT"),
         ("score", "INTEGER"),
         ("total_test_cases", "INTEGER"),
-        ("execution_log", "TEXT")
+        ("execution_log", "TEXT"),
+        ("runtime_ms", "REAL"),
+        ("cpu_time_ms", "REAL"),
+        ("peak_memory_kb", "REAL"),
+        ("test_case_metrics", "TEXT"),
+        ("complexity", "TEXT"),
+        ("complexity_profile", "TEXT"),
+        ("email_status", "TEXT"),
+        ("submitted_at", "DATETIME")
     ]
 
     for col_name, col_type in columns_to_add:
@@ -27,7 +39,17 @@ def migrate_assignments_table():
             else:
                 print(f"Error adding {col_name}: {e}")
 
+    # Outbox of emails waiting to be sent (see email_outbox.py)
+    cursor.execute(EMAIL_OUTBOX_SCHEMA)
+    # Background submission jobs (see submission_jobs.py)
+    cursor.execute(SUBMISSION_JOBS_SCHEMA)
     conn.commit()
+
+    # Question bank tables, seeded from questions.json when empty
+    seed_questions(conn)
+
+    # Secondary indexes (see schema.py)
+    create_indexes(conn, OPERATIONAL_INDEXES)
     conn.close()
     print("Migration completed.")
 
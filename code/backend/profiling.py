@@ -0,0 +1,221 @@
+import base64
+import contextvars
+import cProfile
+import functools
+import inspect
+import json
+import os
+import re
+import threading
+import time
+import uuid
+from urllib.parse import parse_qs
+
+from fastapi.routing import APIRoute
+from starlette.concurrency import run_in_threadpool
+from starlette.responses import JSONResponse
+
+from db_pool import get_db_connection
+
+# On-demand profiling of single requests. A recruiter adds "X-Profile: 1" (or
+# ?profile=1) plus HTTP Basic credentials to a request; its handler then runs
+# under cProfile and the stats are saved for download from /profiles.
+# Requests without the flag only pay for one header check and a context
+# variable lookup.
+
+PROFILE_DIR = os.environ.get(
+    'PROFILE_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'request_profiles'))
+# Retention: the newest PROFILE_KEEP profiles younger than PROFILE_MAX_AGE_S are kept
+PROFILE_KEEP = int(os.environ.get('PROFILE_KEEP', 50))
+PROFILE_MAX_AGE_S = float(os.environ.get('PROFILE_MAX_AGE_S', 7 * 24 * 3600))
+
+PROFILE_ID = re.compile(r"^\d{13}-[0-9a-f]{8}$")
+
+# The profiling session of the request being handled, if it asked for one
+active_session = contextvars.ContextVar('active_profile_session', default=None)
+# cProfile can only run one profiler at a time per process
+_profiler_lock = threading.Lock()
+
+
+class ProfileSession:
+    """One profiled request: its id and, once the handler has run, its profiler."""
+    def __init__(self):
+        self.id = f"{int(time.time() * 1000)}-{uuid.uuid4().hex[:8]}"
+        self.profiler = None
+        self.busy = False
+
+    def _start(self):
+        if not _profiler_lock.acquire(blocking=False):
+            # Another request is being profiled; this one runs normally
+            self.busy = True
+            return None
+        self.profiler = cProfile.Profile()
+        return self.profiler
+
+    def run(self, endpoint, *args, **kwargs):
+        profiler = self._start()
+        if profiler is None:
+            return endpoint(*args, **kwargs)
+        try:
+            return profiler.runcall(endpoint, *args, **kwargs)
+        finally:
+            _profiler_lock.release()
+
+    async def run_async(self, endpoint, *args, **kwargs):
+        # Profiles the event loop thread while the handler runs, so other
+        # coroutines scheduled during its awaits show up too; work it hands to
+        # other threads or to the sandbox shows up as time spent waiting.
+        profiler = self._start()
+        if profiler is None:
+            return await endpoint(*args, **kwargs)
+        profiler.enable()
+        try:
+            return await endpoint(*args, **kwargs)
+        finally:
+            profiler.disable()
+            _profiler_lock.release()
+
+
+def profiled_endpoint(endpoint):
+    """Wraps an endpoint so it runs under the request's profiling session, if any."""
+    if inspect.iscoroutinefunction(endpoint):
+        @functools.wraps(endpoint)
+        async def wrapper(*args, **kwargs):
+            session = active_session.get()
+            if session is None:
+                return await endpoint(*args, **kwargs)
+            return await session.run_async(endpoint, *args, **kwargs)
+    else:
+        @functools.wraps(endpoint)
+        def wrapper(*args, **kwargs):
+            session = active_session.get()
+            if session is None:
+                return endpoint(*args, **kwargs)
+            # Sync endpoints run in a threadpool thread, so the profiler is started there
+            return session.run(endpoint, *args, **kwargs)
+    return wrapper
+
+
+class ProfilingRoute(APIRoute):
+    """Route class (set as app.router.route_class) whose endpoints can be profiled."""
+    def __init__(self, path, endpoint, **kwargs):
+        super().__init__(path, profiled_endpoint(endpoint), **kwargs)
+
+
+def is_recruiter(username, password):
+    with get_db_connection() as conn:
+        row = conn.execute(
+            "SELECT 1 FROM users WHERE username = ? AND password = ? AND role = 'recruiter'", (username, password)
+        ).fetchone()
+    return row is not None
+
+
+def basic_credentials(headers):
+    """(username, password) from an HTTP Basic Authorization header, or None."""
+    value = headers.get(b"authorization", b"").decode("latin-1")
+    scheme, _, encoded = value.partition(" ")
+    if scheme.lower() != "basic":
+        return None
+    try:
+        username, _, password = base64.b64decode(encoded).decode().partition(":")
+    except ValueError:
+        return None
+    return username, password
+
+
+def save_profile(session, method, path, status, duration_ms):
+    """Writes the stats and a metadata file, then applies the retention limits."""
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    session.profiler.dump_stats(os.path.join(PROFILE_DIR, f"{session.id}.prof"))
+    with open(os.path.join(PROFILE_DIR, f"{session.id}.json"), "w", encoding="utf-8") as f:
+        json.dump({"id": session.id, "method": method, "path": path, "status": status,
+                   "duration_ms": round(duration_ms, 2), "created": time.time()}, f)
+    prune_profiles()
+
+
+def list_profiles():
+    """Metadata of the stored profiles, newest first."""
+    profiles = []
+    if not os.path.isdir(PROFILE_DIR):
+        return profiles
+    for name in sorted(os.listdir(PROFILE_DIR), reverse=True):
+        if name.endswith(".json"):
+            try:
+                with open(os.path.join(PROFILE_DIR, name), encoding="utf-8") as f:
+                    profiles.append(json.load(f))
+            except (OSError, ValueError):
+                continue
+    return profiles
+
+
+def profile_path(profile_id):
+    """Path of a stored profile's stats file, or None if there is no such profile."""
+    if not PROFILE_ID.match(profile_id):
+        return None
+    path = os.path.join(PROFILE_DIR, f"{profile_id}.prof")
+    return path if os.path.exists(path) else None
+
+
+def prune_profiles():
+    cutoff = time.time() - PROFILE_MAX_AGE_S
+    for i, profile in enumerate(list_profiles()):
+        if i >= PROFILE_KEEP or profile["created"] < cutoff:
+            for extension in (".prof", ".json"):
+                try:
+                    os.remove(os.path.join(PROFILE_DIR, profile["id"] + extension))
+                except OSError:
+                    pass
+
+
+def profiling_requested(scope):
+    query_string = scope.get("query_string", b"")
+    # The substring test keeps unflagged requests cheap; parse_qs makes sure the
+    # flag is the "profile" parameter itself, not e.g. ?myprofile=10
+    if b"profile=" in query_string and parse_qs(query_string.decode("latin-1")).get("profile") == ["1"]:
+        return True
+    return any(name == b"x-profile" and value == b"1" for name, value in scope["headers"])
+
+
+class ProfilingMiddleware:
+    """
+    ASGI middleware that starts a profiling session for requests that ask for
+    one. Only recruiters may profile; the response carries an X-Profile-Id
+    header naming the saved profile.
+    """
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not profiling_requested(scope):
+            await self.app(scope, receive, send)
+            return
+
+        credentials = basic_credentials(dict(scope["headers"]))
+        if credentials is None or not await run_in_threadpool(is_recruiter, *credentials):
+            response = JSONResponse({"detail": "Profiling requires recruiter credentials (HTTP Basic)"},
+                                    status_code=403, headers={"WWW-Authenticate": "Basic"})
+            await response(scope, receive, send)
+            return
+
+        session = ProfileSession()
+        token = active_session.set(session)
+        status = [500]
+
+        async def send_with_profile_id(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+                # The handler has returned by now, so it's known whether it was profiled
+                if session.profiler is not None:
+                    message["headers"] = list(message.get("headers", [])) + [(b"x-profile-id", session.id.encode())]
+                elif session.busy:
+                    message["headers"] = list(message.get("headers", [])) + [(b"x-profile-status", b"busy")]
+            await send(message)
+
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_profile_id)
+        finally:
+            active_session.reset(token)
+            if session.profiler is not None:
+                duration_ms = (time.perf_counter() - start) * 1000
+                await run_in_threadpool(save_profile, session, scope["method"], scope["path"], status[0], duration_ms)
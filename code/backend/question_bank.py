@@ -0,0 +1,206 @@
+import json
+import os
+import threading
+import time
+
+from db_pool import get_db_connection
+
+# Questions seeded into a new database by setup_db.py / migrate_db.py
+QUESTIONS_SEED_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'questions.json')
+# How often (seconds) a worker checks whether another worker edited the bank
+QUESTION_CACHE_CHECK_S = float(os.environ.get('QUESTION_CACHE_CHECK_S', 5))
+
+QUESTION_BANK_SCHEMA = [
+    '''
+    CREATE TABLE IF NOT EXISTS questions (
+        id INTEGER PRIMARY KEY,
+        title TEXT NOT NULL,
+        description TEXT NOT NULL DEFAULT '',
+        difficulty TEXT NOT NULL DEFAULT 'Medium' CHECK(difficulty IN ('Easy', 'Medium', 'Hard')),
+        examples TEXT NOT NULL DEFAULT '[]',
+        updated_at DATETIME DEFAULT CURRENT_TIMESTAMP
+    )
+    ''',
+    '''
+    CREATE TABLE IF NOT EXISTS test_cases (
+        question_id INTEGER NOT NULL REFERENCES questions(id) ON DELETE CASCADE,
+        position INTEGER NOT NULL,
+        args TEXT NOT NULL,
+        expected TEXT NOT NULL,
+        PRIMARY KEY (question_id, position)
+    ) WITHOUT ROWID
+    ''',
+    '''
+    CREATE TABLE IF NOT EXISTS question_tags (
+        tag TEXT NOT NULL,
+        question_id INTEGER NOT NULL REFERENCES questions(id) ON DELETE CASCADE,
+        PRIMARY KEY (tag, question_id)
+    ) WITHOUT ROWID
+    ''',
+    # Bumped by every edit; separate from data_version so an edit doesn't
+    # invalidate the candidate and stats caches
+    '''
+    CREATE TABLE IF NOT EXISTS question_bank_version (
+        id INTEGER PRIMARY KEY CHECK(id = 1),
+        version INTEGER NOT NULL
+    )
+    ''',
+    "INSERT OR IGNORE INTO question_bank_version (id, version) VALUES (1, 1)",
+]
+
+# Listing columns: everything but the examples and test cases
+LIST_SQL = '''
+SELECT q.id, q.title, q.difficulty, q.description,
+       (SELECT json_group_array(t.tag) FROM question_tags t WHERE t.question_id = q.id) AS tags
+FROM questions q
+'''
+
+
+def write_question(conn, question):
+    """
+    Inserts or replaces one question with its test cases and tags, inside the
+    caller's transaction. question is a dict shaped like an entry of questions.json.
+    """
+    conn.execute(
+        """
+        INSERT INTO questions (id, title, description, difficulty, examples) VALUES (?, ?, ?, ?, ?)
+        ON CONFLICT(id) DO UPDATE SET title = excluded.title, description = excluded.description,
+            difficulty = excluded.difficulty, examples = excluded.examples, updated_at = CURRENT_TIMESTAMP
+        """,
+        (question["id"], question["title"], question.get("description", ""),
+         question.get("difficulty", "Medium"), json.dumps(question.get("examples", [])))
+    )
+    conn.execute("DELETE FROM test_cases WHERE question_id = ?", (question["id"],))
+    conn.executemany(
+        "INSERT INTO test_cases (question_id, position, args, expected) VALUES (?, ?, ?, ?)",
+        [(question["id"], i, json.dumps(case["args"]), json.dumps(case["expected"]))
+         for i, case in enumerate(question.get("test_cases", []))]
+    )
+    conn.execute("DELETE FROM question_tags WHERE question_id = ?", (question["id"],))
+    conn.executemany(
+        "INSERT OR IGNORE INTO question_tags (tag, question_id) VALUES (?, ?)",
+        [(tag, question["id"]) for tag in question.get("tags", [])]
+    )
+
+
+def seed_questions(conn, path=QUESTIONS_SEED_PATH):
+    """Creates the question bank tables and loads questions.json into them if they are empty."""
+    for statement in QUESTION_BANK_SCHEMA:
+        conn.execute(statement)
+    if conn.execute("SELECT 1 FROM questions LIMIT 1").fetchone():
+        print("Question bank already populated.")
+        return 0
+    with open(path, encoding='utf-8') as f:
+        questions = json.load(f)
+    for question in questions:
+        write_question(conn, question)
+    conn.commit()
+    print(f"Seeded {len(questions)} questions.")
+    return len(questions)
+
+
+def list_questions(conn, difficulty=None, tag=None, after_id=None, limit=None):
+    """Question summaries in id order, optionally filtered by difficulty and tag."""
+    where, params = [], []
+    if difficulty:
+        where.append("q.difficulty = ?")
+        params.append(difficulty)
+    if tag:
+        where.append("q.id IN (SELECT question_id FROM question_tags WHERE tag = ?)")
+        params.append(tag)
+    if after_id is not None:
+        where.append("q.id > ?")
+        params.append(after_id)
+    sql = LIST_SQL + (f" WHERE {' AND '.join(where)}" if where else "") + " ORDER BY q.id"
+    if limit is not None:
+        sql += " LIMIT ?"
+        params.append(limit)
+    questions = []
+    for row in conn.execute(sql, params):
+        question = dict(row)
+        question["tags"] = json.loads(question["tags"])
+        questions.append(question)
+    return questions
+
+
+def get_question_bank_version(conn):
+    """The question bank's edit counter (0 on a database that predates it)."""
+    try:
+        row = conn.execute("SELECT version FROM question_bank_version WHERE id = 1").fetchone()
+    except Exception:
+        return 0
+    return row[0] if row else 0
+
+
+def load_question(conn, question_id):
+    """The full definition of one question (with examples and test cases), or None."""
+    row = conn.execute(
+        "SELECT id, title, difficulty, description, examples FROM questions WHERE id = ?", (question_id,)
+    ).fetchone()
+    if row is None:
+        return None
+    question = dict(row)
+    question["examples"] = json.loads(question["examples"])
+    question["tags"] = [r[0] for r in conn.execute(
+        "SELECT tag FROM question_tags WHERE question_id = ? ORDER BY tag", (question_id,))]
+    question["test_cases"] = [
+        {"args": json.loads(r[0]), "expected": json.loads(r[1])}
+        for r in conn.execute("SELECT args, expected FROM test_cases WHERE question_id = ? ORDER BY position", (question_id,))
+    ]
+    return question
+
+
+class QuestionCache:
+    """
+    In-memory cache of full question definitions, so the code runner doesn't
+    re-read test cases on every run. An edit clears this worker's cache at
+    once and bumps the question bank version, which the other workers check
+    at most every QUESTION_CACHE_CHECK_S seconds.
+    """
+    def __init__(self, check_interval=QUESTION_CACHE_CHECK_S):
+        self.check_interval = check_interval
+        self._questions = {}
+        self._version = None
+        self._checked_at = float('-inf')
+        self._lock = threading.Lock()
+
+    def get(self, question_id):
+        with self._lock:
+            fresh = time.monotonic() - self._checked_at < self.check_interval
+            question = self._questions.get(question_id) if fresh else None
+        if question is not None:
+            return question
+        with get_db_connection() as conn:
+            version = get_question_bank_version(conn)
+            with self._lock:
+                if version != self._version:
+                    self._questions.clear()
+                    self._version = version
+                self._checked_at = time.monotonic()
+                question = self._questions.get(question_id)
+            if question is not None:
+                return question
+            question = load_question(conn, question_id)
+        if question is not None:
+            with self._lock:
+                if version == self._version:
+                    self._questions[question_id] = question
+        return question
+
+    def invalidate(self):
+        with self._lock:
+            self._questions.clear()
+            self._version = None
+            self._checked_at = float('-inf')
+
+
+question_cache = QuestionCache()
+
+
+def save_question(question):
+    """Creates or replaces a question and invalidates every cached copy of the bank."""
+    with get_db_connection() as conn:
+        write_question(conn, question)
+        conn.execute("UPDATE question_bank_version SET version = version + 1 WHERE id = 1")
+        conn.commit()
+    question_cache.invalidate()
@@ -0,0 +1,124 @@
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+
+from fastapi import Request, Response
+
+from db_pool import get_db_connection
+from json_rows import dumps
+from metrics import CACHE_LOOKUPS
+
+# Size limits for the in-process cache (per uvicorn worker)
+MAX_ENTRIES = int(os.environ.get('RESPONSE_CACHE_MAX_ENTRIES', 512))
+MAX_BYTES = int(os.environ.get('RESPONSE_CACHE_MAX_BYTES', 64 * 1024 * 1024))
+
+
+def get_data_version(conn):
+    """
+    Returns the data-version stamp written by the ingestion pipeline
+    (database/database.py bumps it every time it reloads the profile tables).
+    """
+    try:
+        row = conn.execute("SELECT version FROM data_version WHERE id = 1").fetchone()
+    except Exception:
+        # Table not created yet (older database): treat as a single, never-changing version
+        return 0
+    return row[0] if row else 0
+
+
+class CacheEntry:
+    __slots__ = ("version", "body", "etag")
+
+    def __init__(self, version, body):
+        self.version = version
+        self.body = body
+        self.etag = f'"v{version}-{hashlib.sha1(body).hexdigest()[:20]}"'
+
+
+class ResponseCache:
+    """
+    LRU cache of serialized JSON responses, keyed by request and data version.
+    Entries built for another data version are dropped as soon as a new
+    version is seen, so ingestion invalidates everything at once.
+    """
+    def __init__(self, max_entries=MAX_ENTRIES, max_bytes=MAX_BYTES):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._version = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, version):
+        with self._lock:
+            self._observe_version(version)
+            entry = self._entries.get(key)
+            if entry is None or entry.version != version:
+                self.misses += 1
+                CACHE_LOOKUPS.inc("miss")
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            CACHE_LOOKUPS.inc("hit")
+            return entry
+
+    def put(self, key, version, body):
+        entry = CacheEntry(version, body)
+        with self._lock:
+            self._observe_version(version)
+            if version != self._version or len(body) > self.max_bytes:
+                # Built from stale data or too large to keep: serve it once, don't cache it
+                return entry
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= len(old.body)
+            self._entries[key] = entry
+            self._bytes += len(body)
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= len(evicted.body)
+        return entry
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def _observe_version(self, version):
+        if version != self._version:
+            self._entries.clear()
+            self._bytes = 0
+            self._version = version
+
+
+response_cache = ResponseCache()
+
+
+def etag_matches(request: Request, etag):
+    """Checks the If-None-Match header (which may list several tags) against etag."""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    candidates = [tag.strip() for tag in header.split(",")]
+    return "*" in candidates or any(tag.removeprefix("W/") == etag for tag in candidates)
+
+
+def cached_json_response(request: Request, key, build):
+    """
+    Serves the JSON payload produced by build() from the cache when the data
+    version is unchanged, and answers 304 when the client already holds it.
+    """
+    with get_db_connection() as conn:
+        version = get_data_version(conn)
+    entry = response_cache.get(key, version)
+    if entry is None:
+        body = dumps(build())
+        entry = response_cache.put(key, version, body)
+
+    headers = {"ETag": entry.etag, "Cache-Control": "no-cache"}
+    if etag_matches(request, entry.etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=entry.body, media_type="application/json", headers=headers)
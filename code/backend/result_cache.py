@@ -0,0 +1,89 @@
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+
+from metrics import EXECUTION_CACHE_LOOKUPS
+
+# Memoized sandbox results for "Run" clicks (per uvicorn worker)
+RESULT_CACHE_MAX_ENTRIES = int(os.environ.get('RESULT_CACHE_MAX_ENTRIES', 2048))
+# Results whose captured stdout is larger than this are not kept
+RESULT_CACHE_MAX_STDOUT = int(os.environ.get('RESULT_CACHE_MAX_STDOUT', 64 * 1024))
+
+# Outcomes that depend only on the code and the test cases. Limits and
+# crashes also depend on how loaded the machine was, so they are re-run.
+CACHEABLE_STATUSES = {"accepted", "wrong_answer", "runtime_error", "no_solution", "syntax_error"}
+
+
+def normalize_code(code):
+    """
+    Drops differences that can't change what the code does: line endings,
+    trailing whitespace and trailing blank lines. Line numbers are kept, so
+    tracebacks in a cached result still point at the right lines.
+    """
+    lines = [line.rstrip() for line in code.replace("\r\n", "\n").replace("\r", "\n").split("\n")]
+    return "\n".join(lines).rstrip("\n")
+
+
+def code_hash(code):
+    return hashlib.sha256(normalize_code(code).encode()).hexdigest()
+
+
+def suite_version(test_cases):
+    """Content hash of a question's test cases; changes whenever the tests do."""
+    return hashlib.sha1(json.dumps(test_cases, sort_keys=True).encode()).hexdigest()
+
+
+class ResultCache:
+    """
+    LRU cache of sandbox results keyed by (code hash, question id, test-suite
+    version). When a question's test suite changes, the entries built for its
+    old suite are dropped on the next lookup for that question.
+    """
+    def __init__(self, max_entries=RESULT_CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._suites = {}
+        self._lock = threading.Lock()
+
+    def get(self, code, question_id, version):
+        key = (code_hash(code), question_id, version)
+        with self._lock:
+            self._observe_suite(question_id, version)
+            result = self._entries.get(key)
+            if result is None:
+                EXECUTION_CACHE_LOOKUPS.inc("miss")
+                return None
+            self._entries.move_to_end(key)
+        EXECUTION_CACHE_LOOKUPS.inc("hit")
+        return result
+
+    def put(self, code, question_id, version, result):
+        if result.get("status") not in CACHEABLE_STATUSES or len(result.get("stdout") or "") > RESULT_CACHE_MAX_STDOUT:
+            return
+        key = (code_hash(code), question_id, version)
+        with self._lock:
+            if self._suites.get(question_id) != version:
+                # The suite changed while this result was being computed
+                return
+            self._entries[key] = result
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._suites.clear()
+
+    def _observe_suite(self, question_id, version):
+        if self._suites.get(question_id) == version:
+            return
+        if question_id in self._suites:
+            for key in [k for k in self._entries if k[1] == question_id]:
+                del self._entries[key]
+        self._suites[question_id] = version
+
+
+result_cache = ResultCache()
@@ -0,0 +1,311 @@
+import asyncio
+import heapq
+import itertools
+import json
+import os
+import queue
+import signal
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from metrics import ADMISSION_REJECTED, ADMISSION_WAIT, ADMISSION_WAITING, CODE_EXECUTION, SANDBOX_WAIT
+
+# Pool and per-submission limits
+POOL_SIZE = int(os.environ.get('SANDBOX_WORKERS', os.cpu_count() or 2))
+CPU_TIME_LIMIT_S = float(os.environ.get('SANDBOX_CPU_LIMIT_S', 5))
+WALL_TIME_LIMIT_S = float(os.environ.get('SANDBOX_WALL_LIMIT_S', 10))
+MEMORY_LIMIT_MB = int(os.environ.get('SANDBOX_MEMORY_LIMIT_MB', 256))
+# A worker runs this many submissions before it is replaced. The default of 1
+# means candidate code can never leave state behind for the next candidate.
+MAX_TASKS_PER_WORKER = int(os.environ.get('SANDBOX_MAX_TASKS_PER_WORKER', 1))
+
+# Admission control: at most POOL_SIZE jobs are handed to workers at a time
+# and the rest wait (without holding a thread) in priority order. Runs from
+# the editor are turned away with a "busy" reply beyond SANDBOX_MAX_QUEUED_RUNS
+# waiting jobs; submissions are always admitted and wait their turn.
+MAX_QUEUED_RUNS = int(os.environ.get('SANDBOX_MAX_QUEUED_RUNS', 32))
+# Queue priorities (lower runs first). Submissions, and the complexity
+# profiling of accepted ones, are served by their original submit time.
+PRIORITY_SUBMISSION = 0
+PRIORITY_RUN = 1
+
+RSS_POLL_INTERVAL_S = 0.05
+PAGE_SIZE = os.sysconf('SC_PAGE_SIZE') if hasattr(os, 'sysconf') else 4096
+WORKER_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'sandbox_worker.py')
+
+
+def _rss_bytes(pid):
+    try:
+        with open(f'/proc/{pid}/statm') as f:
+            return int(f.read().split()[1]) * PAGE_SIZE
+    except (OSError, IndexError, ValueError):
+        return 0
+
+
+class _Worker:
+    """A worker process plus a thread that collects its replies."""
+    def __init__(self):
+        self.process = subprocess.Popen(
+            [sys.executable, WORKER_SCRIPT],
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+            text=True, encoding='utf-8'
+        )
+        self.replies = queue.Queue()
+        self.tasks = 0
+        threading.Thread(target=self._read_replies, daemon=True).start()
+
+    def _read_replies(self):
+        for line in self.process.stdout:
+            try:
+                self.replies.put(json.loads(line))
+            except ValueError:
+                self.replies.put({"status": "crashed", "message": "worker sent an invalid reply"})
+        self.replies.put(None)  # EOF: the worker exited
+
+    def send(self, job):
+        self.process.stdin.write(json.dumps(job) + "\n")
+        self.process.stdin.flush()
+
+    def is_alive(self):
+        return self.process.poll() is None
+
+    def kill(self):
+        if self.is_alive():
+            self.process.kill()
+        try:
+            self.process.wait(timeout=1)
+        except subprocess.TimeoutExpired:
+            pass
+        for stream in (self.process.stdin, self.process.stdout):
+            try:
+                stream.close()
+            except OSError:
+                pass
+
+
+class SandboxBusy(Exception):
+    """Raised when a low-priority job finds the admission queue full."""
+    def __init__(self, waiting):
+        super().__init__(f"{waiting} jobs are waiting for a sandbox worker")
+        self.waiting = waiting
+
+
+class AdmissionQueue:
+    """
+    Admits at most `slots` jobs at once, on the event loop. Waiting jobs are
+    ordered by (priority, submitted_at, arrival), so a burst of submissions
+    is served oldest first and ahead of editor runs.
+    """
+    def __init__(self, slots, max_queued_runs=MAX_QUEUED_RUNS):
+        self.slots = slots
+        self.max_queued_runs = max_queued_runs
+        self._running = 0
+        self._waiting = []
+        self._arrivals = itertools.count()
+
+    @property
+    def waiting(self):
+        return len(self._waiting)
+
+    async def acquire(self, priority, submitted_at):
+        label = "submission" if priority == PRIORITY_SUBMISSION else "run"
+        if self._running < self.slots and not self._waiting:
+            self._running += 1
+            ADMISSION_WAIT.observe(0, label)
+            return
+        if priority > PRIORITY_SUBMISSION and len(self._waiting) >= self.max_queued_runs:
+            ADMISSION_REJECTED.inc()
+            raise SandboxBusy(len(self._waiting))
+        entry = (priority, submitted_at, next(self._arrivals), asyncio.get_running_loop().create_future())
+        heapq.heappush(self._waiting, entry)
+        ADMISSION_WAITING.inc()
+        queued = time.perf_counter()
+        try:
+            await entry[3]
+            ADMISSION_WAIT.observe(time.perf_counter() - queued, label)
+        except asyncio.CancelledError:
+            if entry[3].done() and not entry[3].cancelled():
+                # The slot was handed over just as the wait was cancelled; pass it on
+                self.release()
+            elif entry in self._waiting:
+                self._waiting.remove(entry)
+                heapq.heapify(self._waiting)
+                ADMISSION_WAITING.dec()
+            raise
+
+    def release(self):
+        """Hands the slot to the first waiting job, or frees it."""
+        while self._waiting:
+            future = heapq.heappop(self._waiting)[3]
+            ADMISSION_WAITING.dec()
+            if not future.done():
+                future.set_result(None)
+                return
+        self._running -= 1
+
+
+class SandboxPool:
+    """
+    Pre-forked pool of worker processes that run candidate code.
+    Each submission gets its own CPU-time, wall-clock and memory limits, and
+    runs in a separate process so it can neither block the API server nor
+    see another submission's output.
+    """
+    def __init__(self, size=POOL_SIZE, max_tasks_per_worker=MAX_TASKS_PER_WORKER):
+        self.size = size
+        self.max_tasks_per_worker = max_tasks_per_worker
+        self._idle = queue.Queue()
+        self._lock = threading.Lock()
+        self._started = False
+        self._closed = False
+        # Jobs queue in the admission queue; only admitted ones reach these threads,
+        # so waiting never holds FastAPI's own thread pool
+        self.admission = AdmissionQueue(size)
+        self._dispatcher = ThreadPoolExecutor(max_workers=max(4, size * 2), thread_name_prefix="sandbox")
+
+    def start(self):
+        with self._lock:
+            if self._started:
+                return
+            for _ in range(self.size):
+                self._idle.put(_Worker())
+            self._started = True
+            self._closed = False
+
+    def shutdown(self):
+        with self._lock:
+            self._closed = True
+            self._started = False
+        while True:
+            try:
+                worker = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            worker.kill()
+
+    def _replace(self, worker):
+        """Kills a worker and pre-forks its replacement in the background."""
+        worker.kill()
+
+        def spawn():
+            if not self._closed:
+                self._idle.put(_Worker())
+        threading.Thread(target=spawn, daemon=True).start()
+
+    def _acquire(self):
+        while True:
+            worker = self._idle.get()
+            if worker.is_alive():
+                return worker
+            self._replace(worker)
+
+    def execute(self, code, test_cases, cpu_limit_s=CPU_TIME_LIMIT_S,
+                wall_limit_s=WALL_TIME_LIMIT_S, memory_limit_mb=MEMORY_LIMIT_MB, on_progress=None):
+        """
+        Runs a submission in a worker and blocks until it finishes or hits a limit.
+        on_progress, if given, is called (in the waiting thread) with each test
+        case's {"case", "passed", "wall_ms", "cpu_ms", "peak_kb"} as it completes.
+        """
+        job = {
+            "code": code,
+            "test_cases": test_cases,
+            "cpu_limit_s": cpu_limit_s,
+            "memory_limit_mb": memory_limit_mb,
+            "progress": on_progress is not None,
+        }
+        return self._run(job, wall_limit_s, memory_limit_mb, len(test_cases), on_progress)
+
+    def profile(self, code, generator, sizes, size_timeout_s, wall_limit_s, memory_limit_mb=MEMORY_LIMIT_MB):
+        """
+        Times an already accepted solution on generated inputs of each size
+        (see complexity.py). Returns the worker's {"status", "timings"} reply.
+        """
+        job = {
+            "kind": "profile",
+            "code": code,
+            "generator": generator,
+            "sizes": sizes,
+            "size_timeout_s": size_timeout_s,
+            "cpu_limit_s": wall_limit_s,
+            "memory_limit_mb": memory_limit_mb,
+        }
+        return self._run(job, wall_limit_s, memory_limit_mb, 0)
+
+    def _run(self, job, wall_limit_s, memory_limit_mb, total, on_progress=None):
+        self.start()
+        kind = job.get("kind", "run")
+        queued = time.perf_counter()
+        worker = self._acquire()
+        started = time.perf_counter()
+        SANDBOX_WAIT.observe(started - queued, kind)
+        healthy = False
+        result = {"status": "crashed"}
+        try:
+            worker.send(job)
+            result = self._wait(worker, wall_limit_s, memory_limit_mb, total, on_progress)
+            healthy = result.get("status") not in ("time_limit", "memory_limit", "crashed")
+            return result
+        except OSError as e:
+            result = {"status": "crashed", "message": str(e), "passed": 0, "total": total, "stdout": ""}
+            return result
+        finally:
+            CODE_EXECUTION.observe(time.perf_counter() - started, kind, result.get("status", "unknown"))
+            worker.tasks += 1
+            if healthy and worker.tasks < self.max_tasks_per_worker:
+                self._idle.put(worker)
+            else:
+                self._replace(worker)
+
+    def _wait(self, worker, wall_limit_s, memory_limit_mb, total, on_progress=None):
+        """Waits for the worker's reply while enforcing the wall-clock and RSS limits."""
+        deadline = time.monotonic() + wall_limit_s
+        memory_limit = memory_limit_mb * 1024 * 1024
+        while True:
+            try:
+                reply = worker.replies.get(timeout=RSS_POLL_INTERVAL_S)
+            except queue.Empty:
+                if time.monotonic() > deadline:
+                    return {"status": "time_limit", "limit": "wall", "passed": 0, "total": total, "stdout": ""}
+                if _rss_bytes(worker.process.pid) > memory_limit:
+                    return {"status": "memory_limit", "passed": 0, "total": total, "stdout": ""}
+                continue
+
+            if reply is not None and "progress" in reply:
+                if on_progress is not None:
+                    on_progress(reply["progress"])
+                continue
+            if reply is not None:
+                return reply
+            # The worker died mid-job; SIGXCPU from RLIMIT_CPU means it ran out of CPU time
+            code = worker.process.wait()
+            if code == -getattr(signal, 'SIGXCPU', 24):
+                return {"status": "time_limit", "limit": "cpu", "passed": 0, "total": total, "stdout": ""}
+            return {"status": "crashed", "message": f"worker exited with code {code}", "passed": 0,
+                    "total": total, "stdout": ""}
+
+    async def _admitted(self, priority, submitted_at, call):
+        await self.admission.acquire(priority, time.time() if submitted_at is None else submitted_at)
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._dispatcher, call)
+        finally:
+            self.admission.release()
+
+    async def execute_async(self, code, test_cases, priority=PRIORITY_RUN, submitted_at=None, **limits):
+        """
+        Awaitable version of execute() for async endpoints. Waits its turn in
+        the admission queue first; raises SandboxBusy if a run finds it full.
+        """
+        return await self._admitted(priority, submitted_at, lambda: self.execute(code, test_cases, **limits))
+
+    async def profile_async(self, code, generator, sizes, size_timeout_s, wall_limit_s,
+                            priority=PRIORITY_SUBMISSION, submitted_at=None):
+        """Awaitable version of profile()."""
+        return await self._admitted(
+            priority, submitted_at, lambda: self.profile(code, generator, sizes, size_timeout_s, wall_limit_s)
+        )
+
+
+sandbox_pool = SandboxPool()
@@ -0,0 +1,248 @@
+import copy
+import io
+import json
+import os
+import random
+import signal
+import sys
+import time
+from contextlib import redirect_stdout, redirect_stderr
+
+try:
+    import resource  # POSIX only; CPU/address-space limits are skipped on Windows
+except ImportError:
+    resource = None
+
+# Worker process of the sandbox pool (see sandbox.py). Kept apart from the
+# pool so a fresh worker only imports what running candidate code needs;
+# with one submission per worker, its startup is paid on every submission.
+
+MAX_OUTPUT_CHARS = 10000
+PAGE_SIZE = os.sysconf('SC_PAGE_SIZE') if hasattr(os, 'sysconf') else 4096
+
+
+def _apply_limits(cpu_limit_s, memory_limit_mb):
+    """Caps the CPU time and address space the next job may use in this worker."""
+    if resource is None:
+        return
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    cpu_used = usage.ru_utime + usage.ru_stime
+    # RLIMIT_CPU counts the whole process lifetime, so the budget is added to what is already used.
+    # Only soft limits are lowered (SIGXCPU terminates the worker), so a reused
+    # worker can raise them again for its next job.
+    _, cpu_hard = resource.getrlimit(resource.RLIMIT_CPU)
+    resource.setrlimit(resource.RLIMIT_CPU, (int(cpu_used + cpu_limit_s) + 1, cpu_hard))
+    # Address space is a backstop only; the parent enforces the RSS cap itself.
+    _, as_hard = resource.getrlimit(resource.RLIMIT_AS)
+    address_space = _current_vm_bytes() + 2 * memory_limit_mb * 1024 * 1024
+    if as_hard != resource.RLIM_INFINITY:
+        address_space = min(address_space, as_hard)
+    resource.setrlimit(resource.RLIMIT_AS, (address_space, as_hard))
+
+
+def _current_vm_bytes():
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[0]) * PAGE_SIZE
+    except OSError:
+        return 0
+
+
+def _reset_peak_rss():
+    """
+    Resets the process's peak resident set size (VmHWM) to its current RSS.
+    Linux only (4.0+); returns False where it isn't supported.
+    """
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+        return True
+    except OSError:
+        return False
+
+
+def _rss_kb(field):
+    """A /proc/self/status memory field (VmRSS, VmHWM) in KB."""
+    with open('/proc/self/status') as f:
+        for line in f:
+            if line.startswith(field + ':'):
+                return int(line.split()[1])
+    return 0
+
+
+def _truncate(text, limit=MAX_OUTPUT_CHARS):
+    return text if len(text) <= limit else text[:limit] + "\n... (output truncated)"
+
+
+def _run_job(job, report=None):
+    """
+    Executes the candidate's code and runs 'solution' against each test case.
+    Returns a plain dict so it can be sent back over the pipe. If given,
+    report is called with each test case's outcome as soon as it is known.
+    """
+    _apply_limits(job["cpu_limit_s"], job["memory_limit_mb"])
+
+    stdout = io.StringIO()
+    namespace = {"__name__": "__solution__"}
+    result = {"status": "accepted", "passed": 0, "total": len(job["test_cases"]), "metrics": []}
+
+    with redirect_stdout(stdout), redirect_stderr(stdout):
+        try:
+            exec(compile(job["code"], "<solution>", "exec"), namespace)
+        except SyntaxError as e:
+            result.update(status="syntax_error", message=f"{e.msg} at line {e.lineno}")
+        except MemoryError:
+            result.update(status="memory_limit")
+        except BaseException as e:
+            result.update(status="exec_error", message=f"{type(e).__name__}: {e}")
+
+        func = namespace.get("solution")
+        if result["status"] == "accepted" and not callable(func):
+            result.update(status="no_solution")
+
+        if result["status"] == "accepted":
+            for i, case in enumerate(job["test_cases"]):
+                args = copy.deepcopy(case["args"])
+                # Peak memory is the rise of the peak RSS over the RSS before the call, so
+                # the one timed call is measured without tracing; None where unsupported
+                rss_before = _rss_kb('VmRSS') if _reset_peak_rss() else None
+                cpu_start = time.process_time()
+                wall_start = time.perf_counter()
+                try:
+                    got = func(*args)
+                    error = None
+                except MemoryError:
+                    error = "memory_limit"
+                except BaseException as e:
+                    error = e
+                wall_ms = (time.perf_counter() - wall_start) * 1000
+                cpu_ms = (time.process_time() - cpu_start) * 1000
+                peak_kb = max(0, _rss_kb('VmHWM') - rss_before) if rss_before is not None else None
+                metric = {"case": i, "wall_ms": wall_ms, "cpu_ms": cpu_ms, "peak_kb": peak_kb}
+                result["metrics"].append(metric)
+
+                if error == "memory_limit":
+                    result.update(status="memory_limit", case=i)
+                elif error is not None:
+                    result.update(status="runtime_error", case=i, message=f"{type(error).__name__}: {error}")
+                elif got != case["expected"]:
+                    result.update(status="wrong_answer", case=i, got=_truncate(repr(got), 2000))
+                else:
+                    result["passed"] += 1
+
+                if report is not None:
+                    report(dict(metric, passed=result["status"] == "accepted"))
+                if result["status"] != "accepted":
+                    break
+
+    result["stdout"] = _truncate(stdout.getvalue())
+    if resource is not None:
+        # ru_maxrss is in KB on Linux (bytes on macOS)
+        max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        result["max_rss_kb"] = max_rss / 1024 if sys.platform == "darwin" else max_rss
+    return result
+
+
+class _SizeTimeout(BaseException):
+    """Raised by SIGALRM when one profiling size runs past its timeout."""
+
+
+def _on_alarm(signum, frame):
+    raise _SizeTimeout()
+
+
+def _set_alarm(seconds):
+    # No interval timers on Windows; there only the job's wall-clock limit applies
+    if hasattr(signal, 'setitimer'):
+        signal.setitimer(signal.ITIMER_REAL, seconds)
+
+
+def _run_profile(job):
+    """
+    Times an accepted solution on generated inputs of growing size.
+    Stops at the first size that exceeds the per-size timeout or fails.
+    """
+    from complexity import INPUT_GENERATORS, REPEATS  # sibling module; this script's dir is on sys.path
+
+    _apply_limits(job["cpu_limit_s"], job["memory_limit_mb"])
+    generator = INPUT_GENERATORS[job["generator"]]
+    namespace = {"__name__": "__solution__"}
+    timings = []
+
+    # Prints at large sizes are thrown away rather than buffered
+    with open(os.devnull, 'w') as sink, redirect_stdout(sink), redirect_stderr(sink):
+        try:
+            exec(compile(job["code"], "<solution>", "exec"), namespace)
+            func = namespace["solution"]
+        except BaseException as e:
+            return {"status": "exec_error", "message": f"{type(e).__name__}: {e}", "timings": timings}
+
+        if hasattr(signal, 'SIGALRM'):
+            signal.signal(signal.SIGALRM, _on_alarm)
+        for n in job["sizes"]:
+            rng = random.Random(n)
+            best = None
+            try:
+                for _ in range(REPEATS):
+                    args = generator(n, rng)
+                    _set_alarm(job["size_timeout_s"])
+                    start = time.perf_counter()
+                    try:
+                        func(*args)
+                    finally:
+                        elapsed = time.perf_counter() - start
+                        _set_alarm(0)
+                    best = elapsed if best is None else min(best, elapsed)
+                    if elapsed > job["size_timeout_s"] / 10:
+                        break  # slow enough that one run is representative
+            except _SizeTimeout:
+                timings.append({"n": n, "timed_out": True})
+                break
+            except MemoryError:
+                timings.append({"n": n, "error": "memory_limit"})
+                break
+            except BaseException as e:
+                timings.append({"n": n, "error": f"{type(e).__name__}: {e}"})
+                break
+            timings.append({"n": n, "ms": best * 1000})
+
+    return {"status": "profiled", "timings": timings}
+
+
+def _worker_main():
+    """
+    Worker loop: reads one JSON job per line on stdin and answers with one JSON line.
+    The protocol pipes are moved off fds 0/1 first, so nothing the candidate's
+    code prints or reads can touch them.
+    """
+    # The parent handles Ctrl+C and shuts the pool down
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    jobs = os.fdopen(os.dup(0), 'r', encoding='utf-8')
+    replies = os.fdopen(os.dup(1), 'w', encoding='utf-8')
+    devnull = os.open(os.devnull, os.O_RDWR)
+    os.dup2(devnull, 0)
+    os.dup2(devnull, 1)
+    sys.stdin = open(os.devnull)
+    sys.stdout = open(os.devnull, 'w')
+
+    def report(event):
+        # Progress lines are told apart from the final reply by their "progress" key
+        replies.write(json.dumps({"progress": event}) + "\n")
+        replies.flush()
+
+    for line in jobs:
+        job = json.loads(line)
+        try:
+            if job.get("kind") == "profile":
+                reply = _run_profile(job)
+            else:
+                reply = _run_job(job, report if job.get("progress") else None)
+        except BaseException as e:
+            reply = {"status": "exec_error", "message": f"{type(e).__name__}: {e}", "passed": 0,
+                     "total": len(job.get("test_cases", [])), "stdout": ""}
+        replies.write(json.dumps(reply) + "\n")
+        replies.flush()
+
+
+if __name__ == "__main__":
+    _worker_main()
@@ -0,0 +1,80 @@
+import sqlite3
+
+# Secondary indexes of the HushHush database.
+# OPERATIONAL_INDEXES live in database.db (created by setup_db.py and
+# migrate_db.py); PROFILE_INDEXES live in the profile snapshot built by
+# database/database.py. check_query_plans.py verifies that every backend
+# query can use them.
+
+# (index name, table, columns, unique)
+OPERATIONAL_INDEXES = [
+    # /recruiter_assignments/{username} and /my_assignments/{username}
+    ("idx_assignments_recruiter", "assignments", ["recruiter_id"], False),
+    ("idx_assignments_candidate", "assignments", ["candidate_username"], False),
+    # Outbox sender: due messages in order
+    ("idx_email_outbox_due", "email_outbox", ["status", "next_attempt_at"], False),
+    # /submit_solution: the job already running for an assignment
+    ("idx_submission_jobs_assignment", "submission_jobs", ["assignment_id"], False),
+    # Question bank (see question_bank.py): /questions?difficulty=..., and the
+    # tags of one question (tag lookups use question_tags' primary key)
+    ("idx_questions_difficulty", "questions", ["difficulty"], False),
+    ("idx_question_tags_question", "question_tags", ["question_id"], False),
+]
+
+# Platform username columns, plus every column /candidates/{platform} can sort
+# or filter on with a range (the keyset pagination walks these indexes).
+# The ux_ indexes are the upsert keys database.py loads the profiles by.
+PROFILE_INDEXES = [
+    ("ux_Git_hub_username", "Git_hub", ["username"], True),
+    ("idx_Git_hub_followers", "Git_hub", ["followers"], False),
+    ("idx_Git_hub_total_stars", "Git_hub", ["total_stars"], False),
+    ("idx_Git_hub_total_forks", "Git_hub", ["total_forks"], False),
+    ("idx_Git_hub_public_repos", "Git_hub", ["public_repos"], False),
+    ("idx_Git_hub_following", "Git_hub", ["following"], False),
+
+    ("ux_Leet_code_username", "Leet_code", ["Username"], True),
+    ("idx_Leet_code_ranking", "Leet_code", ["Ranking"], False),
+    ("idx_Leet_code_reputation", "Leet_code", ["Reputation"], False),
+    ("idx_Leet_code_all_solved", "Leet_code", ["All_Solved"], False),
+    ("idx_Leet_code_hard_solved", "Leet_code", ["Hard_Solved"], False),
+    ("idx_Leet_code_medium_solved", "Leet_code", ["Medium_Solved"], False),
+    ("idx_Leet_code_easy_solved", "Leet_code", ["Easy_Solved"], False),
+
+    ("ux_Stack_overflow_user_id", "Stack_overflow", ["user_id"], True),
+    ("idx_Stack_overflow_name", "Stack_overflow", ["name"], False),
+    ("idx_Stack_overflow_reputation", "Stack_overflow", ["reputation"], False),
+    ("idx_Stack_overflow_gold", "Stack_overflow", ["gold"], False),
+    ("idx_Stack_overflow_silver", "Stack_overflow", ["silver"], False),
+    ("idx_Stack_overflow_bronze", "Stack_overflow", ["bronze"], False),
+
+    ("idx_top_github_username", "top_github", ["username"], False),
+    ("idx_top_leetcode_username", "top_leetcode", ["username"], False),
+    ("idx_top_stackoverflow_username", "top_stackoverflow", ["username"], False),
+]
+
+
+def create_indexes(conn, indexes):
+    """
+    Creates the given indexes if they don't exist yet. Indexes on tables or
+    columns missing from this database are skipped and reported.
+    Returns the names of the indexes that are in place.
+    """
+    created = []
+    for name, table, columns, unique in indexes:
+        existing = {row[1].lower() for row in conn.execute(f'PRAGMA table_info("{table}")')}
+        missing = [c for c in columns if c.lower() not in existing]
+        if not existing:
+            print(f"Skipping index {name}: no table {table}")
+            continue
+        if missing:
+            print(f"Skipping index {name}: {table} has no column(s) {', '.join(missing)}")
+            continue
+        column_list = ", ".join(f'"{c}"' for c in columns)
+        try:
+            conn.execute(f'CREATE {"UNIQUE " if unique else ""}INDEX IF NOT EXISTS "{name}" ON "{table}" ({column_list})')
+        except sqlite3.IntegrityError as e:
+            print(f"Skipping index {name}: {e}")
+            continue
+        created.append(name)
+    conn.commit()
+    return created
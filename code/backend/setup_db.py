@@ -1,8 +1,28 @@
 import sqlite3
 import os
 
-# Path to the database
-DB_PATH = os.path.join(os.path.dirname(__file__), '../database/database.db')
+# Path to the database (shared with the API, honours HUSHHUSH_DB_PATH)
+from db_pool import DB_PATH
+from schema import OPERATIONAL_INDEXES, create_indexes
+from question_bank import seed_questions
+from submission_jobs import SUBMISSION_JOBS_SCHEMA
+
+EMAIL_OUTBOX_SCHEMA = '''
+CREATE TABLE IF NOT EXISTS email_outbox (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    assignment_id INTEGER,
+    recipient TEXT NOT NULL,
+    subject TEXT NOT NULL,
+    body TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending' CHECK(status IN ('pending', 'sending', 'sent', 'failed')),
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt_at REAL NOT NULL,
+    claimed_at REAL,
+    sent_at REAL,
+    last_error TEXT,
+    created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+)
+'''
 
 def setup_users_table():
     print(f"Connecting to database at {DB_PATH}")
@@ -32,6 +52,23 @@ def setup_users_table():
     )
     ''')
 
+    # Create email outbox table (filled by /assign_question, drained by the backend's sender thread)
+    cursor.execute(EMAIL_OUTBOX_SCHEMA)
+
+    # Create submission jobs table (see submission_jobs.py)
+    cursor.execute(SUBMISSION_JOBS_SCHEMA)
+
+    # Create data version table (bumped by database/database.py on every ingestion,
+    # used by the backend to invalidate its response cache)
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS data_version (
+        id INTEGER PRIMARY KEY CHECK(id = 1),
+        version INTEGER NOT NULL,
+        updated_at DATETIME DEFAULT CURRENT_TIMESTAMP
+    )
+    ''')
+    cursor.execute("INSERT OR IGNORE INTO data_version (id, version) VALUES (1, 1)")
+
     # Insert dummy users if they don't exist
     users = [
         ('student1', 'password123', 'Candidate'),
@@ -46,6 +83,12 @@ def setup_users_table():
             print(f"User {username} already exists")
 
     conn.commit()
+
+    # Question bank tables, seeded from questions.json when empty
+    seed_questions(conn)
+
+    # Secondary indexes (see schema.py)
+    create_indexes(conn, OPERATIONAL_INDEXES)
     conn.close()
     print("Users table setup completed.")
 
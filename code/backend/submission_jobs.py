@@ -0,0 +1,130 @@
+import json
+import os
+import time
+import uuid
+
+from db_pool import get_db_connection
+
+# Submissions run as background jobs: /submit_solution stores a job and
+# returns its id at once, the sandbox reports each test case as it finishes,
+# and clients follow along by polling /submission_jobs/{id} or through its
+# server-sent events stream. Job state lives in the database so any uvicorn
+# worker can answer for a job another worker is running.
+
+# A queued or running job not updated for this long is taken to be lost
+# (its worker restarted) and reported as failed; the candidate can resubmit.
+# Workers touch their jobs every JOB_STALE_S / 3 while they wait in the queue.
+JOB_STALE_S = float(os.environ.get('SUBMISSION_JOB_STALE_S', 600))
+# How often the events stream checks the job for news
+JOB_POLL_INTERVAL_S = float(os.environ.get('SUBMISSION_JOB_POLL_INTERVAL_S', 0.25))
+# Comment lines sent on an idle events stream so proxies don't close it
+JOB_HEARTBEAT_S = 15
+
+SUBMISSION_JOBS_SCHEMA = '''
+CREATE TABLE IF NOT EXISTS submission_jobs (
+    id TEXT PRIMARY KEY,
+    assignment_id INTEGER NOT NULL,
+    username TEXT NOT NULL,
+    question_id INTEGER NOT NULL,
+    code TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'queued' CHECK(status IN ('queued', 'running', 'completed', 'failed')),
+    total INTEGER NOT NULL DEFAULT 0,
+    progress TEXT NOT NULL DEFAULT '[]',
+    result TEXT,
+    error TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+)
+'''
+
+FINISHED = ('completed', 'failed')
+
+
+def create_job(assignment_id, username, question_id, code, submitted_at):
+    """
+    Stores a queued job for the assignment, submitted at the given epoch time.
+    Returns (job id, True), or (id of the job already queued or running for
+    it, False) when the candidate clicked submit twice.
+    """
+    now = submitted_at
+    with get_db_connection() as conn:
+        conn.execute("BEGIN IMMEDIATE")
+        row = conn.execute(
+            "SELECT id FROM submission_jobs WHERE assignment_id = ? AND status IN ('queued', 'running') AND updated_at > ?",
+            (assignment_id, now - JOB_STALE_S)
+        ).fetchone()
+        if row is not None:
+            conn.commit()
+            return row[0], False
+        job_id = uuid.uuid4().hex
+        conn.execute(
+            "INSERT INTO submission_jobs (id, assignment_id, username, question_id, code, created_at, updated_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (job_id, assignment_id, username, question_id, code, now, now)
+        )
+        conn.commit()
+    return job_id, True
+
+
+def touch_jobs(job_ids):
+    """Marks jobs that are still waiting or running in this worker as alive."""
+    with get_db_connection() as conn:
+        conn.executemany("UPDATE submission_jobs SET updated_at = ? WHERE id = ? AND status IN ('queued', 'running')",
+                         [(time.time(), job_id) for job_id in job_ids])
+        conn.commit()
+
+
+def start_job(job_id, total):
+    with get_db_connection() as conn:
+        conn.execute("UPDATE submission_jobs SET status = 'running', total = ?, updated_at = ? WHERE id = ?",
+                     (total, time.time(), job_id))
+        conn.commit()
+
+
+def record_progress(job_id, event):
+    """Appends one test case's outcome to the job (called from the sandbox dispatcher thread)."""
+    with get_db_connection() as conn:
+        conn.execute(
+            "UPDATE submission_jobs SET progress = json_insert(progress, '$[#]', json(?)), updated_at = ? WHERE id = ?",
+            (json.dumps(event), time.time(), job_id)
+        )
+        conn.commit()
+
+
+def finish_job(job_id, result=None, error=None):
+    """Marks the job completed with its result, or failed with an error message."""
+    status = 'failed' if error else 'completed'
+    with get_db_connection() as conn:
+        conn.execute(
+            "UPDATE submission_jobs SET status = ?, result = ?, error = ?, updated_at = ? WHERE id = ?",
+            (status, json.dumps(result) if result is not None else None, error, time.time(), job_id)
+        )
+        conn.commit()
+
+
+def get_job(job_id):
+    """The job as a dict (without the code), or None. Lost jobs are marked failed on the way."""
+    with get_db_connection() as conn:
+        row = conn.execute(
+            "SELECT id, assignment_id, username, question_id, status, total, progress, result, error, created_at, updated_at "
+            "FROM submission_jobs WHERE id = ?", (job_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        job = dict(row)
+        if job["status"] not in FINISHED and job["updated_at"] < time.time() - JOB_STALE_S:
+            job["status"], job["error"] = 'failed', "The submission was interrupted. Please submit again."
+            conn.execute(
+                "UPDATE submission_jobs SET status = 'failed', error = ? WHERE id = ? AND updated_at = ?",
+                (job["error"], job_id, job["updated_at"])
+            )
+            conn.commit()
+    job["progress"] = json.loads(job["progress"])
+    job["result"] = json.loads(job["result"]) if job["result"] else None
+    return job
+
+
+def sse_event(event, data, event_id=None):
+    """One server-sent event carrying data as JSON."""
+    head = f"id: {event_id}\n" if event_id is not None else ""
+    return f"{head}event: {event}\ndata: {json.dumps(data)}\n\n".encode()
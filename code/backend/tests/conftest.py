@@ -0,0 +1,50 @@
+import os
+import sqlite3
+import sys
+import tempfile
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+RECRUITER = ("recruiter1", "admin123")
+CANDIDATE = ("student1", "password123")
+
+
+@pytest.fixture(scope="session")
+def backend():
+    """The backend app on a scratch copy of the database (no mail is sent)."""
+    from check_query_plans import copy_database
+
+    workdir = tempfile.mkdtemp(prefix="backend_tests_")
+    # Point the backend at the copy before it is imported
+    os.environ["HUSHHUSH_DB_PATH"] = copy_database(workdir)
+    os.environ["SMTP_HOST"], os.environ["SMTP_PORT"], os.environ["SMTP_STARTTLS"] = "127.0.0.1", "1", "0"
+    os.environ.setdefault("SANDBOX_WORKERS", "1")
+    sys.modules.pop("db_pool", None)
+
+    from db_pool import current_snapshot_path
+    from schema import PROFILE_INDEXES, create_indexes
+    from setup_db import setup_users_table
+    from migrate_db import migrate_assignments_table
+    setup_users_table()
+    migrate_assignments_table()
+    # Before database.py has published a snapshot the profile tables are still
+    # in database.db, without the indexes and statistics the snapshot gets
+    profiles = sqlite3.connect(current_snapshot_path() or os.environ["HUSHHUSH_DB_PATH"])
+    create_indexes(profiles, PROFILE_INDEXES)
+    for table in {table for _, table, _, _ in PROFILE_INDEXES}:
+        profiles.execute(f'ANALYZE "{table}"')
+    profiles.commit()
+    profiles.close()
+
+    import main
+    return main
+
+
+@pytest.fixture(scope="session")
+def client(backend):
+    from fastapi.testclient import TestClient
+
+    with TestClient(backend.app) as client:
+        yield client
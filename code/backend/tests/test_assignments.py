@@ -0,0 +1,34 @@
+def _bulk(client, rows):
+    response = client.post("/assign_questions/bulk", json={"recruiter_username": "recruiter1", "assignments": rows})
+    assert response.status_code == 200
+    return response.json()
+
+
+def test_bulk_assignment_ids_match_rows(client):
+    question_id = client.get("/questions").json()[0]["id"]
+    rows = [{"candidate_username": f"bulk_ids{i}", "question_id": question_id,
+             "candidate_password": f"pw{i}", "email": f"bulk_ids{i}@example.com"} for i in range(3)]
+
+    body = _bulk(client, rows)
+
+    assert body["created"] == 3
+    for i, result in enumerate(body["results"]):
+        assert result["status"] == "success" and result["account"] == "created"
+        assignments = client.get(f"/my_assignments/bulk_ids{i}").json()
+        assert [a["id"] for a in assignments] == [result["assignment_id"]]
+
+
+def test_bulk_assignment_rejects_repeated_candidate(client):
+    question_id = client.get("/questions").json()[0]["id"]
+    rows = [{"candidate_username": "bulk_twice", "question_id": question_id,
+             "candidate_password": password, "email": "bulk_twice@example.com"} for password in ("first", "second")]
+
+    body = _bulk(client, rows)
+
+    assert body["created"] == 1
+    assert body["results"][0]["status"] == "success"
+    assert body["results"][0]["account"] == "created"
+    assert body["results"][1]["status"] == "error"
+    # The account keeps the password sent in the (only) invitation
+    login = client.post("/login/Candidate", json={"username": "bulk_twice", "password": "first"})
+    assert login.status_code == 200
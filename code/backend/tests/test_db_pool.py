@@ -0,0 +1,35 @@
+import os
+import sqlite3
+
+
+def test_pool_switches_to_rebuilt_snapshot(backend, tmp_path, monkeypatch):
+    import db_pool
+
+    def publish(name, value):
+        building = tmp_path / (name + ".building")
+        conn = sqlite3.connect(building)
+        conn.execute("CREATE TABLE marker (value INTEGER)")
+        conn.execute("INSERT INTO marker VALUES (?)", (value,))
+        conn.commit()
+        conn.close()
+        os.replace(building, tmp_path / name)
+        (tmp_path / "profiles_current").write_text(name)
+
+    def marker():
+        with pool.connection() as conn:
+            return conn.execute("SELECT value FROM marker").fetchone()[0]
+
+    monkeypatch.setattr(db_pool, "SNAPSHOT_POINTER", str(tmp_path / "profiles_current"))
+    pool = db_pool.ConnectionPool(str(tmp_path / "database.db"))
+    try:
+        publish("profiles_a.db", 1)
+        assert marker() == 1
+        publish("profiles_b.db", 2)
+        assert marker() == 2
+        # Two more runs while this connection is idle: the second rebuilds
+        # the file it last read under the same name
+        publish("profiles_a.db", 3)
+        publish("profiles_b.db", 4)
+        assert marker() == 4
+    finally:
+        pool.close_all()
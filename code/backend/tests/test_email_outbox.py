@@ -0,0 +1,13 @@
+def test_a_claimed_message_is_not_claimed_again(backend):
+    from db_pool import get_db_connection
+    from email_outbox import OutboxSender, queue_invitation_email
+
+    with get_db_connection() as conn:
+        queue_invitation_email(conn, None, "outbox_once", "outbox_once@example.com", "pw")
+        conn.commit()
+
+    first = [m for m in OutboxSender()._claim_batch() if m["recipient"] == "outbox_once@example.com"]
+    second = [m for m in OutboxSender()._claim_batch() if m["recipient"] == "outbox_once@example.com"]
+
+    assert len(first) == 1
+    assert second == []
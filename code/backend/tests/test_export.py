@@ -0,0 +1,24 @@
+def test_export_opens_its_connection_only_when_streamed(client, monkeypatch):
+    import main
+
+    opened = []
+    dedicated_connection = main.pool.dedicated_connection
+
+    def counting_connection():
+        opened.append(True)
+        return dedicated_connection()
+
+    monkeypatch.setattr(main.pool, "dedicated_connection", counting_connection)
+
+    # A response that is never sent holds no connection
+    main.export_candidates("GitHub", fmt="csv", fields="username", supplied_filters={})
+    assert opened == []
+
+    response = client.get("/export/GitHub", params={"format": "csv", "fields": "username"})
+    assert response.status_code == 200
+    assert response.text.splitlines()[0] == "username"
+    assert len(response.text.splitlines()) > 1
+    assert opened == [True]
+
+    assert client.get("/export/GitHub", params={"fields": "nope"}).status_code == 400
+    assert opened == [True]
@@ -0,0 +1,17 @@
+import pytest
+
+
+@pytest.mark.parametrize("query_string, headers, expected", [
+    (b"profile=1", [], True),
+    (b"page=2&profile=1", [], True),
+    (b"myprofile=1", [], False),
+    (b"profile=10", [], False),
+    (b"profile=0", [], False),
+    (b"", [(b"x-profile", b"1")], True),
+    (b"", [], False),
+])
+def test_profiling_requested(backend, query_string, headers, expected):
+    import profiling
+
+    scope = {"type": "http", "query_string": query_string, "headers": headers}
+    assert profiling.profiling_requested(scope) is expected
@@ -0,0 +1,7 @@
+from check_query_plans import check_plans, traced_queries
+
+
+def test_no_full_table_scans(client):
+    failures, _ = check_plans(traced_queries(client))
+    assert not failures, "full table scans (add an index in schema.py):\n" + "\n".join(
+        f"  {detail}: {sql}" for sql, detail in failures)
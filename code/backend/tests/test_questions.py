@@ -0,0 +1,43 @@
+from conftest import CANDIDATE, RECRUITER
+
+
+def _definition(client, question_id):
+    question = client.get(f"/questions/{question_id}").json()
+    return {k: v for k, v in question.items() if k != "id"}
+
+
+def test_put_question_requires_recruiter(client):
+    question_id = client.get("/questions").json()[0]["id"]
+    definition = _definition(client, question_id)
+    tampered = dict(definition, test_cases=[{"args": [], "expected": None}])
+
+    assert client.put(f"/questions/{question_id}", json=tampered).status_code == 401
+    assert client.put(f"/questions/{question_id}", json=tampered, auth=CANDIDATE).status_code == 403
+    assert _definition(client, question_id) == definition
+
+    response = client.put(f"/questions/{question_id}", json=definition, auth=RECRUITER)
+    assert response.status_code == 200
+    assert _definition(client, question_id) == definition
+
+
+def test_question_edit_reaches_other_workers_without_bumping_data_version(client):
+    from db_pool import get_db_connection
+    from question_bank import QuestionCache, question_cache
+    from response_cache import get_data_version
+
+    question_id = client.get("/questions").json()[0]["id"]
+    definition = _definition(client, question_id)
+    other_worker = QuestionCache(check_interval=0)
+    other_worker.get(question_id)
+    with get_db_connection() as conn:
+        data_version = get_data_version(conn)
+
+    edited = dict(definition, title=definition["title"] + " (edited)")
+    try:
+        assert client.put(f"/questions/{question_id}", json=edited, auth=RECRUITER).status_code == 200
+        assert question_cache.get(question_id)["title"] == edited["title"]
+        assert other_worker.get(question_id)["title"] == edited["title"]
+        with get_db_connection() as conn:
+            assert get_data_version(conn) == data_version
+    finally:
+        client.put(f"/questions/{question_id}", json=definition, auth=RECRUITER)
@@ -0,0 +1,43 @@
+import json
+
+import pytest
+
+from sandbox import SandboxPool
+
+
+@pytest.fixture
+def pool():
+    pool = SandboxPool(size=1)
+    yield pool
+    pool.shutdown()
+
+
+def test_each_case_runs_once(pool):
+    code = "def solution(n):\n    print('hi')\n    return [0] * n\n"
+    cases = [{"args": [n], "expected": [0] * n} for n in (1, 10, 100000)]
+
+    result = pool.execute(code, cases)
+
+    assert result["status"] == "accepted"
+    assert result["stdout"].split() == ["hi"] * len(cases)
+    assert all(m["peak_kb"] is not None for m in result["metrics"])
+    # The 100000-element list is allocated during the timed call
+    assert result["metrics"][2]["peak_kb"] > 100000 * 8 / 1024
+
+
+def test_profile_uses_the_generator_matching_the_question(pool):
+    from complexity import input_generator_for
+    from question_bank import QUESTIONS_SEED_PATH
+
+    with open(QUESTIONS_SEED_PATH, encoding="utf-8") as f:
+        question = next(q for q in json.load(f) if q["title"] == "Maximum Subarray")
+    generator = input_generator_for(question)
+    code = "def solution(nums):\n    return max(nums)\n"
+
+    result = pool.profile(code, generator, [256, 512], 1.0, 20)
+
+    assert result["status"] == "profiled"
+    assert [t["n"] for t in result["timings"]] == [256, 512]
+    # Replaced by a question whose tests take other arguments: no profiling
+    replaced = dict(question, test_cases=[{"args": ["(]"], "expected": False}])
+    assert input_generator_for(replaced) is None
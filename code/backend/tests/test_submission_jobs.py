@@ -0,0 +1,11 @@
+import asyncio
+
+
+def test_job_events_end_when_job_is_gone(backend):
+    async def collect():
+        return [event async for event in backend.job_events("no-such-job", 0)]
+
+    events = asyncio.run(collect())
+
+    assert len(events) == 1
+    assert events[0].startswith(b"event: failed\n")
@@ -1,6 +1,11 @@
 import pandas as pd
 import sqlite3
 import os
+import sys
+
+# Index definitions are shared with the backend (code/backend/schema.py)
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'backend'))
+from schema import PROFILE_INDEXES, create_indexes
 
 # Define paths to your CSV files
 csv_files = {
@@ -9,6 +14,184 @@ csv_files = {
     'Stack_overflow': r"../Profile_Data/StackOverflow-20K-Basedata (1).csv"
 }
 
+# Define paths to shortlisted candidates CSV files
+shortlisted_files = {
+    'top_github': r"../ML/Shortlisted_candidates/github_shortlisted_candidates.csv",
+    'top_leetcode': r"../ML/Shortlisted_candidates/leetcode_shortlisted_candidates.csv",
+    'top_stackoverflow': r"../ML/Shortlisted_candidates/stackoverflow_shortlisted_candidates.csv"
+}
+
+# Primary key of each profile table. Profiles are upserted by this key, so a
+# pipeline run only rewrites the rows that actually changed.
+# (SQLite column names are case-insensitive, so 'user_id' also matches a 'User_ID' CSV column)
+PRIMARY_KEYS = {
+    'Git_hub': 'username',
+    'Leet_code': 'Username',
+    'Stack_overflow': 'user_id'
+}
+
+# Rows written per transaction
+CHUNK_SIZE = 1000
+
+
+def table_columns(conn, table_name):
+    return [row[1] for row in conn.execute(f'PRAGMA table_info("{table_name}")')]
+
+
+def prepare_table(conn, table_name, df, key):
+    """
+    Creates the table if needed and makes sure it can be upserted on `key`:
+    adds any new CSV columns and a unique index on the key (dropping
+    duplicate keys left behind by older full-replace loads).
+    """
+    columns = table_columns(conn, table_name)
+    if not columns:
+        conn.execute(pd.io.sql.get_schema(df, table_name, keys=key, con=conn))
+        return
+
+    existing = {c.lower() for c in columns}
+    for column in df.columns:
+        if column.lower() not in existing:
+            if pd.api.types.is_integer_dtype(df[column]):
+                sql_type = 'INTEGER'
+            elif pd.api.types.is_float_dtype(df[column]):
+                sql_type = 'REAL'
+            else:
+                sql_type = 'TEXT'
+            conn.execute(f'ALTER TABLE "{table_name}" ADD COLUMN "{column}" {sql_type}')
+            print(f"  Added column '{column}' to '{table_name}'")
+
+    conn.execute(f'DELETE FROM "{table_name}" WHERE rowid NOT IN (SELECT MAX(rowid) FROM "{table_name}" GROUP BY "{key}")')
+    conn.execute(f'CREATE UNIQUE INDEX IF NOT EXISTS "ux_{table_name}_{key.lower()}" ON "{table_name}" ("{key}")')
+    conn.commit()
+
+
+def upsert_table(conn, table_name, df, key):
+    """
+    Loads df into table_name incrementally: new keys are inserted, changed
+    rows updated and rows whose key is no longer in the CSV deleted, in
+    chunked transactions. Returns a dict of counts.
+    """
+    # Match the declared key to the CSV's spelling of it
+    column = next((c for c in df.columns if c.lower() == key.lower()), None)
+    if column is None:
+        raise ValueError(f"primary key column '{key}' missing from the '{table_name}' CSV")
+    key = column
+    df = df[df[key].notna()].drop_duplicates(subset=key, keep='last')
+
+    prepare_table(conn, table_name, df, key)
+
+    columns = list(df.columns)
+    quoted = ", ".join(f'"{c}"' for c in columns)
+    # NaN -> None and numpy scalars -> Python values, so rows compare equal to what SQLite returns
+    rows = df.astype(object).where(pd.notnull(df), None).itertuples(index=False, name=None)
+    key_index = columns.index(key)
+
+    stored = {row[key_index]: row for row in conn.execute(f'SELECT {quoted} FROM "{table_name}"')}
+    inserts, updates, unchanged = [], [], 0
+    for row in rows:
+        current = stored.pop(row[key_index], None)
+        if current is None:
+            inserts.append(row)
+        elif current != row:
+            updates.append(row)
+        else:
+            unchanged += 1
+    # Whatever is left in `stored` is no longer in the CSV
+    deleted = [(k,) for k in stored]
+
+    upsert_sql = (
+        f'INSERT INTO "{table_name}" ({quoted}) VALUES ({", ".join("?" * len(columns))}) '
+        f'ON CONFLICT("{key}") DO UPDATE SET '
+        + ", ".join(f'"{c}" = excluded."{c}"' for c in columns if c != key)
+    )
+    changed = inserts + updates
+    for start in range(0, len(changed), CHUNK_SIZE):
+        with conn:
+            conn.executemany(upsert_sql, changed[start:start + CHUNK_SIZE])
+    for start in range(0, len(deleted), CHUNK_SIZE):
+        with conn:
+            conn.executemany(f'DELETE FROM "{table_name}" WHERE "{key}" = ?', deleted[start:start + CHUNK_SIZE])
+
+    return {"inserted": len(inserts), "updated": len(updates), "unchanged": unchanged, "deleted": len(deleted)}
+
+
+# The profile and shortlist tables are published as a separate snapshot
+# database. Snapshots alternate between two files next to database.db: each
+# run rebuilds the one not being served and then atomically repoints
+# 'profiles_current' at it; the backend switches over between requests, so
+# readers never see a half-loaded table. The previous snapshot stays intact
+# for requests that started before the swap. Both files and the pointer are
+# committed with database.db, so a checkout has the candidate tables.
+SNAPSHOT_POINTER = 'profiles_current'
+SNAPSHOT_FILES = ('profiles_a.db', 'profiles_b.db')
+
+def current_snapshot():
+    """File name of the snapshot the backend is serving, or None."""
+    try:
+        with open(SNAPSHOT_POINTER, encoding='utf-8') as f:
+            name = f.read().strip()
+    except FileNotFoundError:
+        return None
+    return name if name and os.path.exists(name) else None
+
+
+def seed_snapshot(snapshot, sources, tables):
+    """
+    Copies tables (with their rowids and indexes) into the new snapshot so
+    the load below stays incremental. Each table comes from the first of
+    sources (the previous snapshot, then database.db) that has it; a table
+    whose CSV is missing is thereby carried over unchanged.
+    """
+    seeded = {}
+    for i, source_path in enumerate(sources):
+        schema = f"source{i}"
+        snapshot.execute(f"ATTACH DATABASE ? AS {schema}", (source_path,))
+        pending = [t for t in tables if t not in seeded]
+        objects = snapshot.execute(
+            f"SELECT type, name, tbl_name, sql FROM {schema}.sqlite_master "
+            "WHERE tbl_name IN ({}) AND sql IS NOT NULL ORDER BY type = 'index'".format(",".join("?" * len(pending))),
+            pending
+        ).fetchall()
+        for kind, name, tbl_name, sql in objects:
+            snapshot.execute(sql)
+            if kind == 'table':
+                # Keep the rowids: the backend's pagination cursors refer to them
+                columns = ", ".join(f'"{c}"' for c in table_columns(snapshot, name))
+                snapshot.execute(f'INSERT INTO "{name}" (rowid, {columns}) SELECT rowid, {columns} FROM {schema}."{name}"')
+                seeded[name] = source_path
+        snapshot.commit()
+        snapshot.execute(f"DETACH DATABASE {schema}")
+    return seeded
+
+
+def finish_snapshot(snapshot):
+    """Adds the query indexes and planner statistics, then makes the file ready to serve."""
+    create_indexes(snapshot, PROFILE_INDEXES)
+    snapshot.execute("ANALYZE")
+    snapshot.commit()
+    # Back to a normal rollback journal for readers
+    snapshot.execute("PRAGMA journal_mode = DELETE")
+
+
+def publish_snapshot(name):
+    """Points the backend at the new snapshot (atomic rename) and removes leftovers of older layouts."""
+    with open(SNAPSHOT_POINTER + '.tmp', 'w', encoding='utf-8') as f:
+        f.write(name)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(SNAPSHOT_POINTER + '.tmp', SNAPSHOT_POINTER)
+
+    # Timestamped snapshots written before the two-file layout
+    for old in os.listdir('.'):
+        if old.startswith('profiles_') and old.endswith('.db') and old not in SNAPSHOT_FILES:
+            try:
+                os.remove(old)
+            except OSError as e:
+                # Still open somewhere (e.g. on Windows); removed on a later run
+                print(f"Could not remove old snapshot '{old}': {e}")
+
+
 # Create a connection to SQLite database
 # If the database doesn't exist, it will be created
 db_name = 'database.db'
@@ -16,6 +199,24 @@ conn = sqlite3.connect(db_name)
 
 print(f"Database '{db_name}' created/connected successfully!")
 
+# Build the new snapshot under a temporary name, with journaling off: if the
+# build fails the file is simply discarded
+snapshot_tables = list(csv_files) + list(shortlisted_files)
+previous_snapshot = current_snapshot()
+# Rebuild the file the backend is not serving
+snapshot_name = next(f for f in SNAPSHOT_FILES if f != previous_snapshot)
+# Remove snapshots left half-built by interrupted runs
+for stale in os.listdir('.'):
+    if stale.endswith('.db.building'):
+        os.remove(stale)
+building_name = snapshot_name + '.building'
+snapshot = sqlite3.connect(building_name)
+snapshot.execute("PRAGMA journal_mode = OFF")
+snapshot.execute("PRAGMA synchronous = OFF")
+seeded = seed_snapshot(snapshot, [p for p in (previous_snapshot, db_name) if p], snapshot_tables)
+print(f"Building snapshot '{snapshot_name}': "
+      + ", ".join(f"{table} seeded from '{source}'" for table, source in seeded.items()))
+
 # Dictionary to store DataFrames
 dataframes = {}
 
@@ -26,24 +227,18 @@ for table_name, csv_path in csv_files.items():
         df = pd.read_csv(csv_path)
         dataframes[table_name] = df
         
-        # Store DataFrame in SQLite database
-        # if_exists options: 'fail', 'replace', 'append'
-        df.to_sql(table_name, conn, if_exists='replace', index=False)
-        
-        print(f"Table '{table_name}' created with {len(df)} rows and {len(df.columns)} columns")
+        # Upsert into the SQLite database, touching only rows that changed
+        counts = upsert_table(snapshot, table_name, df, PRIMARY_KEYS[table_name])
+
+        print(f"Table '{table_name}' loaded from {len(df)} rows: "
+              f"{counts['inserted']} inserted, {counts['updated']} updated, "
+              f"{counts['unchanged']} unchanged, {counts['deleted']} deleted")
         
     except FileNotFoundError:
-        print(f"Error: File '{csv_path}' not found!")
+        print(f"Error: File '{csv_path}' not found! Keeping the existing '{table_name}' rows")
     except Exception as e:
         print(f"Error loading '{csv_path}': {str(e)}")
 
-# Define paths to shortlisted candidates CSV files
-shortlisted_files = {
-    'top_github': r"../ML/Shortlisted_candidates/github_shortlisted_candidates.csv",
-    'top_leetcode': r"../ML/Shortlisted_candidates/leetcode_shortlisted_candidates.csv",
-    'top_stackoverflow': r"../ML/Shortlisted_candidates/stackoverflow_shortlisted_candidates.csv"
-}
-
 # Load shortlisted candidates into separate tables
 for table_name, csv_path in shortlisted_files.items():
     try:
@@ -60,18 +255,52 @@ for table_name, csv_path in shortlisted_files.items():
         df = df.loc[:, ~df.columns.duplicated()]
 
         # Store in separate tables
-        df.to_sql(table_name, conn, if_exists='replace', index=False)
+        df.to_sql(table_name, snapshot, if_exists='replace', index=False)
         print(f"Table '{table_name}' created with {len(df)} rows")
         
     except FileNotFoundError:
-        print(f"Error: File '{csv_path}' not found!")
+        print(f"Error: File '{csv_path}' not found! Keeping the existing '{table_name}' rows")
     except Exception as e:
         print(f"Error loading '{csv_path}': {str(e)}")
 
-print(f"\nAll CSV files loaded into database '{db_name}'")
+finish_snapshot(snapshot)
+snapshot.close()
+os.replace(building_name, snapshot_name)
+publish_snapshot(snapshot_name)
+print(f"\nAll CSV files loaded into snapshot '{snapshot_name}', now live")
 
-# Get list of all tables in the database
-cursor = conn.cursor()
+# The profile tables now live in the (committed) snapshot; drop the copies in
+# database.db so unqualified table names resolve to the attached snapshot.
+# A table the snapshot lacks (no CSV and nothing to seed it from) is kept.
+snapshot = sqlite3.connect(snapshot_name)
+published = {name for (name,) in snapshot.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+snapshot.close()
+for table_name in snapshot_tables:
+    if table_name in published:
+        conn.execute(f'DROP TABLE IF EXISTS "{table_name}"')
+    else:
+        print(f"Keeping '{table_name}' in '{db_name}': the snapshot has no such table")
+conn.commit()
+
+# Bump the data version so the backend drops its cached responses
+conn.execute("""
+CREATE TABLE IF NOT EXISTS data_version (
+    id INTEGER PRIMARY KEY CHECK(id = 1),
+    version INTEGER NOT NULL,
+    updated_at DATETIME DEFAULT CURRENT_TIMESTAMP
+)
+""")
+conn.execute("""
+INSERT INTO data_version (id, version) VALUES (1, 1)
+ON CONFLICT(id) DO UPDATE SET version = version + 1, updated_at = CURRENT_TIMESTAMP
+""")
+conn.commit()
+version = conn.execute("SELECT version FROM data_version WHERE id = 1").fetchone()[0]
+print(f"Data version bumped to {version}")
+
+# Get list of all tables in the snapshot
+snapshot = sqlite3.connect(snapshot_name)
+cursor = snapshot.cursor()
 cursor.execute("SELECT name FROM sqlite_master WHERE type='table';")
 tables = cursor.fetchall()
 
@@ -91,7 +320,7 @@ if tables:
     print("="*60)
     
     query = f"SELECT * FROM {table_to_query} LIMIT 5"
-    sample_data = pd.read_sql_query(query, conn)
+    sample_data = pd.read_sql_query(query, snapshot)
     print(sample_data)
     
     # Show column info
@@ -99,12 +328,13 @@ if tables:
     print(f"COLUMN INFORMATION:")
     print("="*60)
     query_info = f"PRAGMA table_info({table_to_query})"
-    table_info = pd.read_sql_query(query_info, conn)
+    table_info = pd.read_sql_query(query_info, snapshot)
     print(table_info[['name', 'type']])
 
 # ============================================
 # STEP 6: Close Connection
 # ============================================
+snapshot.close()
 conn.close()
 print(f"\nDatabase connection closed successfully!")
 